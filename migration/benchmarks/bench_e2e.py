@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+End-to-end benchmark: the migration tools against a seeded stand-in server.
+
+Seeds the stand-in server (fake_tb.py) with synthetic customers, projects,
+measurements and VR devices, plus the projects of copy_telemetry_keys.py,
+and runs the tools as from the command line, one after the other on the
+same data:
+
+    scan                      tb_migration.py scan
+    copy_telemetry_keys       copy_telemetry_keys.py --execute
+    migrate-all               tb_migration.py migrate-all --execute
+    fix_telemetry_types       fix_telemetry_types.py --execute
+
+(copy_telemetry_keys runs before migrate-all, which would otherwise already
+have written the new keys of its projects.)
+
+Reports per scenario: wall time, requests and requests/s, points read and
+written (counted by the server), points/s and peak RSS of the tool.
+
+The server and every scenario run in their own process, so each tool starts
+with fresh module state (config from env, cache, metrics) and its memory is
+measured without the server's.
+
+Usage:
+    python benchmarks/bench_e2e.py [--customers N] [--points N] [--latency MS]
+                                   [--error-rate F] [--concurrency N]
+                                   [--scenarios scan,migrate-all,...] [--json FILE]
+"""
+
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import resource
+import tempfile
+import contextlib
+import multiprocessing
+import logging.handlers
+from pathlib import Path
+
+MIGRATION_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(MIGRATION_DIR))
+
+from fake_tb import FakeThingsBoard, start_server, base_url  # noqa: E402
+
+SCENARIOS = ['scan', 'copy_telemetry_keys', 'migrate-all', 'fix_telemetry_types']
+
+COUNTERS = ['requests', 'errors_injected', 'points_read', 'points_written', 'bytes_sent', 'bytes_received']
+
+
+def serve(conn, args):
+    """Child process: seed and run the stand-in server, answer counter requests"""
+    from copy_telemetry_keys import PROJECTS_TO_FIX
+
+    tb = FakeThingsBoard(latency_ms=args.latency, error_rate=args.error_rate)
+    tb.seed(customers=args.customers, points_per_key=args.points, named_projects=PROJECTS_TO_FIX)
+    server = start_server(tb)
+    conn.send({
+        'url': base_url(server),
+        'series': len(tb.timeseries),
+        'points': sum(len(series) for series in tb.timeseries.values()),
+    })
+    while conn.recv() == 'counters':
+        conn.send({name: getattr(tb, name) for name in COUNTERS})
+    server.shutdown()
+
+
+def run_tool(conn, scenario: str, url: str, args, work_dir: str):
+    """Child process: run one tool like from the command line"""
+    os.environ.update({
+        'TB_BASE_URL': url,
+        'TB_USERNAME': 'bench',
+        'TB_PASSWORD': 'bench',
+        'TB_RATE_LIMIT': '0',
+        'TB_METRICS_DIR': work_dir,
+        'TB_INVENTORY_DB': str(Path(work_dir) / 'inventory.db'),
+    })
+    # Log into the work dir, not into logs/migration.log (setup_logging() keeps an existing handler)
+    logging.getLogger('migration').addHandler(
+        logging.handlers.RotatingFileHandler(Path(work_dir) / 'migration.log', encoding='utf-8'))
+
+    if scenario in ('scan', 'migrate-all'):
+        import tb_migration
+        tb_migration.BACKUP_DIR = Path(work_dir) / 'backups'
+        tb_migration.MIGRATION_LOG = Path(work_dir) / 'migration_log.json'
+        argv = ['tb_migration.py', scenario] + (['--execute'] if scenario == 'migrate-all' else [])
+        if args.concurrency:
+            argv += ['--concurrency', str(args.concurrency)]
+        main = tb_migration.main
+    elif scenario == 'copy_telemetry_keys':
+        import copy_telemetry_keys
+        argv, main = ['copy_telemetry_keys.py', '--execute'], copy_telemetry_keys.main
+    else:
+        import fix_telemetry_types
+        argv, main = ['fix_telemetry_types.py', '--execute'], fix_telemetry_types.main
+
+    sys.argv = argv
+    error = None
+    start = time.perf_counter()
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        try:
+            main()
+        except SystemExit as e:
+            if e.code:
+                error = f"exit code {e.code}"
+        except Exception as e:
+            error = repr(e)
+    seconds = time.perf_counter() - start
+
+    # ru_maxrss is in KiB on Linux
+    conn.send({
+        'seconds': seconds,
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'error': error,
+    })
+
+
+def run_scenario(scenario: str, url: str, args, server_conn, work_dir: str) -> dict:
+    server_conn.send('counters')
+    before = server_conn.recv()
+
+    conn, child_conn = multiprocessing.Pipe()
+    tool = multiprocessing.Process(target=run_tool, args=(child_conn, scenario, url, args, work_dir))
+    tool.start()
+    result = conn.recv()
+    tool.join()
+
+    server_conn.send('counters')
+    after = server_conn.recv()
+
+    result.update({name: after[name] - before[name] for name in COUNTERS})
+    seconds = result['seconds'] or 1e-9
+    result['scenario'] = scenario
+    result['requests_per_s'] = result['requests'] / seconds
+    result['points_per_s'] = (result['points_read'] + result['points_written']) / seconds
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--customers', type=int, default=2, help='synthetic customers (2 projects each)')
+    parser.add_argument('--points', type=int, default=50000, help='points per series')
+    parser.add_argument('--latency', type=float, default=2, help='server latency per request in ms')
+    parser.add_argument('--error-rate', type=float, default=0, help='fraction of requests answered with 429/503')
+    parser.add_argument('--concurrency', type=int, default=0, help='async engine for scan/migrate-all')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS), help='comma-separated subset, in this order')
+    parser.add_argument('--json', help='also write the results to this file')
+    args = parser.parse_args()
+
+    scenarios = [s for s in args.scenarios.split(',') if s]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    server_conn, child_conn = multiprocessing.Pipe()
+    server = multiprocessing.Process(target=serve, args=(child_conn, args), daemon=True)
+    server.start()
+    info = server_conn.recv()
+    print(f"🧪 Stand-in server: {info['url']}")
+    print(f"   {info['series']} series, {info['points']:,} points, latency {args.latency:g} ms, "
+          f"error rate {args.error_rate:g}, concurrency {args.concurrency or 'sync'}\n")
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix='bench_e2e_') as work_dir:
+        print(f"   {'Scenario':<22} {'Time':>8} {'Requests':>9} {'Req/s':>7} {'Read':>11} "
+              f"{'Written':>11} {'Points/s':>10} {'Peak RSS':>9}")
+        for scenario in scenarios:
+            r = run_scenario(scenario, info['url'], args, server_conn, work_dir)
+            results.append(r)
+            print(f"   {scenario:<22} {r['seconds']:>7.1f}s {r['requests']:>9} {r['requests_per_s']:>7.0f} "
+                  f"{r['points_read']:>11,} {r['points_written']:>11,} {r['points_per_s']:>10,.0f} "
+                  f"{r['peak_rss_mb']:>7.0f}MB" + (f"  ❌ {r['error']}" if r['error'] else ''))
+
+    server_conn.send('stop')
+    server.join()
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'settings': vars(args), 'server': info, 'results': results}, f, indent=2)
+        print(f"\n   Results: {args.json}")
+
+
+if __name__ == '__main__':
+    main()
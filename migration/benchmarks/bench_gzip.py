@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Benchmark: telemetry read + write over a bandwidth-limited link, with and
+without gzip.
+
+"before" = TB_COMPRESSION=off (plain JSON both ways)
+"after"  = TB_COMPRESSION=gzip (gzip responses, gzip POST bodies)
+
+The stand-in server limits body transfers to `bandwidth_mbit` and compresses
+responses / accepts compressed request bodies. A last run against a server
+that rejects gzip request bodies checks the fallback.
+
+Usage:
+    python benchmarks/bench_gzip.py [points] [bandwidth_mbit]
+"""
+
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fake_tb import FakeThingsBoard, start_server, base_url  # noqa: E402
+from tb_client import ThingsBoardAPI, create_session  # noqa: E402
+from tb_migration import MigrationTool  # noqa: E402
+
+KEY = 'CHC_S_TemperatureFlow'
+
+
+def run(points: int, bandwidth_mbit: float, compression: str, gzip_requests: bool = True) -> dict:
+    tb = FakeThingsBoard(bandwidth_kbps=bandwidth_mbit * 1000, gzip_responses=True, gzip_requests=gzip_requests)
+    source_id = tb.add_device('BENCH_PF1')['id']['id']
+    target_id = tb.add_asset('BENCH_M', 'Measurement')['id']['id']
+    tb.add_series(source_id, KEY, points)
+    server = start_server(tb)
+
+    tool = MigrationTool()
+    tool.api = ThingsBoardAPI(base_url=base_url(server), username='u', password='p',
+                              session=create_session(), compression=compression)
+    tool.api.login()
+
+    start = time.perf_counter()
+    data = tool._read_telemetry(source_id, 'DEVICE', KEY)
+    read_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    tool._write_telemetry(target_id, 'ASSET', 'T_flow_C', data)
+    write_s = time.perf_counter() - start
+
+    written = tb.timeseries[(target_id, 'T_flow_C')]
+    assert len(written) == points, f"{len(written)} of {points} points written"
+    server.shutdown()
+    return {'read_s': read_s, 'write_s': write_s, 'sent': tb.bytes_sent, 'received': tb.bytes_received,
+            'gzip_writes': tool.api.gzip_writes}
+
+
+def main():
+    points = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    bandwidth_mbit = float(sys.argv[2]) if len(sys.argv) > 2 else 20
+    print(f"🧪 {points} points read + written over {bandwidth_mbit:g} Mbit/s\n")
+
+    results = {}
+    for label, compression, gzip_requests in [
+        ('before (off)', 'off', True),
+        ('after  (gzip)', 'gzip', True),
+        ('fallback (server rejects gzip bodies)', 'gzip', False),
+    ]:
+        r = run(points, bandwidth_mbit, compression, gzip_requests)
+        results[label] = r
+        print(f"   {label}: read {r['read_s']:.2f}s ({r['sent'] / 1e6:.1f} MB down), "
+              f"write {r['write_s']:.2f}s ({r['received'] / 1e6:.1f} MB up), "
+              f"gzip bodies at end: {r['gzip_writes']}")
+
+    before, after = results['before (off)'], results['after  (gzip)']
+    print(f"\n   Speedup: read {before['read_s'] / after['read_s']:.1f}x, "
+          f"write {before['write_s'] / after['write_s']:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+Benchmark: memory of a telemetry series, list of tuples vs. columnar Series.
+
+"before" = list of (ts, value) tuples, values converted with float()
+"after"  = Series (tb_series.py): int64 timestamps, float64 values
+
+For each size, the points are built from string values (as ThingsBoard
+sends them) in pages of 10000, then converted (÷1000, like CHC_S_VolumeFlow)
+and cut into write batches. Reports the memory held by the series, the peak
+Python memory (tracemalloc) of read + conversion, and the time.
+
+Checks first that a read → write round trip keeps type and value of every
+point: values of all kinds are stored in the stand-in server (fake_tb.py),
+read back as ThingsBoard strings into a Series and sent as a write payload.
+Numeric text in other forms ('1500.50', ' 7 ') must be read as numbers.
+
+Usage:
+    python benchmarks/bench_series.py [sizes, e.g. 100000,1000000]
+"""
+
+import sys
+import json
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fake_tb import Series as ServerSeries  # noqa: E402
+from tb_series import Series  # noqa: E402
+
+START_TS = 1704067200000
+PAGE_SIZE = 10000
+WRITE_BATCH_SIZE = 1000
+
+
+def pages(points: int):
+    """Pages of (ts, value) as decoded from a response, values as strings"""
+    for start in range(0, points, PAGE_SIZE):
+        yield [(START_TS + i * 60000, str(round(20 + (i % 600) / 10, 1))) for i in range(start, min(points, start + PAGE_SIZE))]
+
+
+def read_list(points: int) -> list:
+    series = []
+    for page in pages(points):
+        series.extend((ts, float(val)) for ts, val in page)
+    return series
+
+
+def read_series(points: int) -> Series:
+    series = Series()
+    for page in pages(points):
+        for ts, val in page:
+            series.append(ts, val)
+    return series
+
+
+def convert_list(series: list) -> list:
+    return [(ts, val / 1000) for ts, val in series]
+
+
+def convert_series(series: Series) -> Series:
+    return series.map(lambda val: val / 1000)
+
+
+def write_batches(series) -> int:
+    """Points in the write payloads (built batch by batch, like _write_telemetry)"""
+    count = 0
+    for i in range(0, len(series), WRITE_BATCH_SIZE):
+        count += len([{'ts': ts, 'values': {'Vdot_m3h': val}} for ts, val in series[i:i + WRITE_BATCH_SIZE]])
+    return count
+
+
+# Values as stored by ThingsBoard (LONG, DOUBLE, STRING, JSON)
+ROUND_TRIP_VALUES = [
+    21.5, 0.1, -3.25, 1e-05, 1.5e+300, 123, 0, -7, 2 ** 53, 2 ** 53 + 1, 2 ** 63 - 1, 1.0, 1e+16,
+    'NaN', 'Infinity', '-Infinity', '0x10', 'abc', '', '{"a": 1}',
+]
+
+# DOUBLE values as ThingsBoard (Java Double.toString) sends them
+JAVA_DOUBLES = {'1.0E-4': 0.0001, '1.2345678E7': 12345678.0, '-3.0E-10': -3e-10, '1.0E16': 1e16, '21.5': 21.5}
+
+# Numeric text not in canonical form, read as float() parses it (int without decimal point)
+NON_CANONICAL = {'1500.50': 1500.5, '1.50': 1.5, '1500.0': 1500.0, '1e3': 1000.0, ' 1500': 1500, ' 7 ': 7,
+                 '007': 7, '1_000': 1000, '-0': 0}
+
+
+def check_round_trip():
+    """Stored value → ThingsBoard string → Series → JSON payload gives the stored value back"""
+    server = ServerSeries()
+    for i, value in enumerate(ROUND_TRIP_VALUES):
+        server.write(START_TS + i, value)
+    series = Series((point['ts'], point['value']) for point in server.read(START_TS, START_TS + len(ROUND_TRIP_VALUES), 100))
+    written = json.loads(json.dumps([{'ts': ts, 'values': {'key': val}} for ts, val in series], allow_nan=False))
+    for value, point in zip(ROUND_TRIP_VALUES, written):
+        result = point['values']['key']
+        assert type(result) is type(value) and result == value, f"{value!r} written as {result!r}"
+
+    for text, number in {**JAVA_DOUBLES, **NON_CANONICAL}.items():
+        (_, value), = Series([(START_TS, text)])
+        assert type(value) is type(number) and value == number, f"{text!r} read as {value!r}"
+    print(f"   Round trip: {len(ROUND_TRIP_VALUES) + len(JAVA_DOUBLES) + len(NON_CANONICAL)} values, "
+          f"type and value kept\n")
+
+
+def measure(read, convert, points: int) -> dict:
+    tracemalloc.start()
+    start = time.perf_counter()
+    series = read(points)
+    held, _ = tracemalloc.get_traced_memory()
+    converted = convert(series)
+    _, peak = tracemalloc.get_traced_memory()
+    written = write_batches(converted)
+    seconds = time.perf_counter() - start
+    tracemalloc.stop()
+    assert written == points
+    return {'held': held, 'peak': peak, 'seconds': seconds, 'series': converted}
+
+
+def main():
+    sizes = [int(s) for s in sys.argv[1].split(',')] if len(sys.argv) > 1 else [100000, 1000000]
+    check_round_trip()
+
+    for size in sizes:
+        before = measure(read_list, convert_list, size)
+        after = measure(read_series, convert_series, size)
+        assert after['series'] == before['series'], "series differ"
+
+        print(f"   {size:>9} points")
+        for label, result in [('before (list of tuples)', before), ('after  (Series)       ', after)]:
+            print(f"      {label}: held {result['held'] / 1024 / 1024:7.1f} MiB, "
+                  f"peak {result['peak'] / 1024 / 1024:7.1f} MiB, {result['seconds']:6.2f} s")
+        print(f"      Series memory: {before['held'] / after['held']:.1f}x lower, "
+              f"peak: {before['peak'] / after['peak']:.1f}x lower, time: {before['seconds'] / after['seconds']:.2f}x\n")
+
+
+if __name__ == '__main__':
+    main()
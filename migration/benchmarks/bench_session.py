@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Benchmark: _read_telemetry page fetches with vs. without pooled session.
+
+"before" = one requests.get() per call (new TCP connection each time)
+"after"  = shared keep-alive session from tb_client
+
+The stand-in adds `connect_ms` per new connection to emulate the TCP + TLS
+handshake against the ThingsBoard cloud (no TLS on localhost).
+
+Usage:
+    python benchmarks/bench_session.py [reads] [points_per_key] [connect_ms]
+"""
+
+import sys
+import time
+import requests
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fake_tb import FakeThingsBoard, start_server, base_url  # noqa: E402
+from tb_client import ThingsBoardAPI, STREAM_CHUNK_SIZE, create_session  # noqa: E402
+from tb_migration import MigrationTool  # noqa: E402
+from tb_stream import iter_timeseries  # noqa: E402
+
+
+class UnpooledThingsBoardAPI(ThingsBoardAPI):
+    """Previous behaviour: module-level requests.get, no connection reuse"""
+
+    def stream_timeseries(self, endpoint: str, params: dict = None):
+        response = requests.get(f"{self.base_url}{endpoint}", headers=self._headers(), params=params, stream=True)
+        response.raise_for_status()
+        with response:
+            yield from iter_timeseries(response.iter_content(chunk_size=STREAM_CHUNK_SIZE))
+
+
+def run(api: ThingsBoardAPI, device_id: str, reads: int) -> tuple:
+    """Read the same key `reads` times, returns (seconds, pages, points)"""
+    tool = MigrationTool()
+    tool.api = api
+    pages = 0
+    points = 0
+
+    original_stream = api.stream_timeseries
+
+    def counting_stream(endpoint, params=None):
+        nonlocal pages
+        pages += 1
+        return original_stream(endpoint, params)
+
+    api.stream_timeseries = counting_stream
+    start = time.perf_counter()
+    for _ in range(reads):
+        points += len(tool._read_telemetry(device_id, 'DEVICE', 'CHC_S_TemperatureFlow'))
+    return time.perf_counter() - start, pages, points
+
+
+def main():
+    reads = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    points_per_key = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+    connect_ms = float(sys.argv[3]) if len(sys.argv) > 3 else 30
+
+    tb = FakeThingsBoard(connect_latency_ms=connect_ms)
+    device_id = tb.add_device('BENCH_PF1')['id']['id']
+    tb.add_series(device_id, 'CHC_S_TemperatureFlow', points_per_key)
+    server = start_server(tb)
+    url = base_url(server)
+    print(f"🧪 Stand-in server: {url} ({points_per_key} points/key, {reads} reads, "
+          f"{connect_ms:g} ms/connect)\n")
+
+    results = {}
+    for label, api in [
+        ('before (requests.get)', UnpooledThingsBoardAPI(base_url=url, username='u', password='p')),
+        ('after  (pooled session)', ThingsBoardAPI(base_url=url, username='u', password='p',
+                                                    session=create_session())),
+    ]:
+        api.login()
+        run(api, device_id, 1)  # warm-up
+        seconds, pages, points = run(api, device_id, reads)
+        results[label] = seconds
+        print(f"   {label}: {seconds:.3f}s, {pages} pages, "
+              f"{seconds / pages * 1000:.2f} ms/page, {points / seconds:,.0f} points/s")
+
+    server.shutdown()
+    before, after = results.values()
+    print(f"\n   Speedup: {before / after:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
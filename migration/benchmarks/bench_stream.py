@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Benchmark: decoding one /values/timeseries page, response.json() vs. streaming.
+
+"before" = response.json() + list of {'ts', 'value'} dicts → (ts, value) tuples
+"after"  = ThingsBoardAPI.stream_timeseries (tb_stream.py), tuples built
+           while the response is received
+
+Reports time per page and peak Python memory (tracemalloc) while decoding,
+for several page sizes. The stand-in server runs in a child process so that
+its memory is not counted.
+
+Usage:
+    python benchmarks/bench_stream.py [pages] [page_sizes, e.g. 10000,50000]
+"""
+
+import sys
+import time
+import tracemalloc
+import multiprocessing
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from fake_tb import FakeThingsBoard, start_server, base_url  # noqa: E402
+from tb_client import ThingsBoardAPI, create_session  # noqa: E402
+
+KEY = 'CHC_S_TemperatureFlow'
+
+
+def to_number(val):
+    try:
+        return float(val)
+    except (ValueError, TypeError):
+        return val
+
+
+def read_json(api: ThingsBoardAPI, endpoint: str, params: dict) -> list:
+    result = api.get(endpoint, params=params)
+    return [(point['ts'], to_number(point['value'])) for point in result[KEY]]
+
+
+def read_stream(api: ThingsBoardAPI, endpoint: str, params: dict) -> list:
+    return [(ts, to_number(val)) for key, ts, val in api.stream_timeseries(endpoint, params=params)]
+
+
+def measure(read, api: ThingsBoardAPI, endpoint: str, params: dict, pages: int) -> tuple:
+    """Returns (seconds per page, peak bytes, points)"""
+    read(api, endpoint, params)  # warm-up
+    start = time.perf_counter()
+    for _ in range(pages):
+        points = read(api, endpoint, params)
+    seconds = (time.perf_counter() - start) / pages
+
+    tracemalloc.start()
+    points = read(api, endpoint, params)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds, peak, points
+
+
+def serve(conn, points: int):
+    """Child process: run the stand-in server until told to stop"""
+    tb = FakeThingsBoard()
+    device_id = tb.add_device('BENCH_PF1')['id']['id']
+    tb.add_series(device_id, KEY, points)
+    server = start_server(tb)
+    conn.send((base_url(server), device_id))
+    conn.recv()
+    server.shutdown()
+
+
+def main():
+    pages = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    page_sizes = [int(s) for s in sys.argv[2].split(',')] if len(sys.argv) > 2 else [10000, 50000, 100000]
+
+    conn, child_conn = multiprocessing.Pipe()
+    server = multiprocessing.Process(target=serve, args=(child_conn, max(page_sizes)), daemon=True)
+    server.start()
+    url, device_id = conn.recv()
+    print(f"🧪 Stand-in server: {url} ({pages} pages per size)\n")
+
+    api = ThingsBoardAPI(base_url=url, username='u', password='p', session=create_session())
+    api.login()
+    endpoint = f"/api/plugins/telemetry/DEVICE/{device_id}/values/timeseries"
+
+    for size in page_sizes:
+        params = {'keys': KEY, 'startTs': 0, 'endTs': int(time.time() * 1000), 'limit': size, 'orderBy': 'ASC'}
+        before = measure(read_json, api, endpoint, params, pages)
+        after = measure(read_stream, api, endpoint, params, pages)
+        assert before[2] == after[2], "decoded points differ"
+
+        print(f"   {size:>7} points/page")
+        for label, (seconds, peak, _) in [('before (response.json)', before), ('after  (streaming)', after)]:
+            print(f"      {label}: {seconds * 1000:7.1f} ms/page, peak {peak / 1024 / 1024:6.1f} MiB")
+        print(f"      Peak memory: {before[1] / after[1]:.1f}x lower, time: {before[0] / after[0]:.2f}x\n")
+
+    conn.send('stop')
+    server.join()
+
+
+if __name__ == '__main__':
+    main()
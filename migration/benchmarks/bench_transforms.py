@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Benchmark: unit conversion of one series, per-point Python vs. vectorized.
+
+"per point (list)"   = [(ts, converter(val)) for ts, val in telemetry] on a
+                       list of tuples (the conversion before tb_transforms.py)
+"per point (Series)" = Series.map(converter), one Python call per point
+"vectorized"         = Transform.apply (tb_transforms.py), NumPy operations
+                       on the float64 value array of the Series
+
+Also times the key map lookup per measurement: building the dict from the
+base/heating/cooling maps each time vs. the compiled table.
+
+Checks first that every numeric value is converted, whatever form its text
+has ('1500.50', ' 1500') and also integers beyond float64 precision.
+
+Usage:
+    python benchmarks/bench_transforms.py [sizes, e.g. 10000,1000000] [repeats]
+"""
+
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from tb_series import Series  # noqa: E402
+from tb_transforms import TELEMETRY_TRANSFORMS, get_key_map  # noqa: E402
+
+START_TS = 1704067200000
+KEY = 'CHC_S_VolumeFlow'
+
+
+def converter(x):
+    return float(x) / 1000  # l/h → m³/h, as before
+
+
+def build_key_map(installation_type: str) -> dict:
+    """The key map as it was built per measurement before"""
+    key_map = {rule['source']: rule['target'] for rule in TELEMETRY_TRANSFORMS
+               if 'installation' not in rule and 'device' not in rule}
+    key_map.update({rule['source']: rule['target'] for rule in TELEMETRY_TRANSFORMS
+                    if rule.get('installation') == installation_type})
+    return key_map
+
+
+def check_conversion(transform):
+    """Numeric text of any form is converted like float(x) / 1000, other values are kept"""
+    values = ['1500', '1500.50', '1.50', '1500.0', '2000', ' 1500', '1e3', '9007199254740993', 'abc', '{"a": 1}']
+    result = [val for _, val in transform.apply(Series(enumerate(values)))]
+    expected = [float(val) / 1000 for val in values[:-2]] + values[-2:]
+    assert result == expected, f"converted {result}, expected {expected}"
+    print(f"   Conversion: {len(values)} values of all forms converted\n")
+
+
+def best_of(repeats: int, func, *args) -> tuple:
+    """(best seconds, result)"""
+    best, result = None, None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func(*args)
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return best, result
+
+
+def main():
+    sizes = [int(s) for s in sys.argv[1].split(',')] if len(sys.argv) > 1 else [10000, 100000, 1000000]
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    transform = get_key_map('heating')[KEY]
+    check_conversion(transform)
+
+    for size in sizes:
+        points = [(START_TS + i * 60000, round(200 + (i % 6000) / 10, 1) * 10) for i in range(size)]
+        series = Series(points)
+
+        per_point, expected = best_of(repeats, lambda: [(ts, converter(val)) for ts, val in points])
+        mapped, result_map = best_of(repeats, series.map, converter)
+        vectorized, result_vec = best_of(repeats, transform.apply, series)
+        assert result_map == expected and result_vec == expected, "converted values differ"
+
+        print(f"   {size:>9} points ({KEY} ÷1000)")
+        for label, seconds in [('per point (list)  ', per_point), ('per point (Series)', mapped),
+                               ('vectorized        ', vectorized)]:
+            print(f"      {label}: {seconds * 1000:9.2f} ms, {size / seconds / 1e6:8.1f} M points/s")
+        print(f"      Vectorized: {per_point / vectorized:.0f}x faster than per point (list)\n")
+
+    measurements = 10000
+    rebuilt, _ = best_of(repeats, lambda: [build_key_map('heating') for _ in range(measurements)])
+    compiled, _ = best_of(repeats, lambda: [get_key_map('heating') for _ in range(measurements)])
+    print(f"   Key map for {measurements} measurements")
+    print(f"      rebuilt per measurement: {rebuilt * 1000:7.2f} ms")
+    print(f"      compiled table         : {compiled * 1000:7.2f} ms ({rebuilt / compiled:.0f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,645 @@
+#!/usr/bin/env python3
+"""
+Local ThingsBoard stand-in server for benchmarks.
+
+Serves the REST endpoints used by the migration tools from in-memory data,
+over HTTP/1.1 with keep-alive (like a real ThingsBoard behind nginx):
+auth, customers, assets, devices, relations, relation queries (direction
+FROM), entity data queries (asset type filters), attributes, timeseries keys, timeseries values and timeseries
+writes.
+
+Usage:
+    python benchmarks/fake_tb.py [port]      # Run standalone with demo data (default: 8089)
+"""
+
+import re
+import sys
+import gzip
+import json
+import time
+import uuid
+import base64
+import random
+import bisect
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+# Synthetic series default: one point per minute starting 2024-01-01
+SERIES_START_TS = 1704067200000
+SERIES_INTERVAL_MS = 60 * 1000
+
+
+def _tb_string(value) -> str:
+    """ThingsBoard returns timeseries values as strings (useStrictDataTypes=false)"""
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return str(value)
+
+
+class Series:
+    """Timeseries of one key: synthetic points (generated on read) plus written points"""
+
+    def __init__(self, count: int = 0, start_ts: int = SERIES_START_TS, interval_ms: int = SERIES_INTERVAL_MS,
+                 base: float = 20.0):
+        self.count = count
+        self.start_ts = start_ts
+        self.interval_ms = interval_ms
+        self.base = base
+        self.written = {}  # ts -> value
+        self._written_ts = []  # sorted keys of self.written (rebuilt lazily)
+        self._dirty = False
+        self.lock = threading.Lock()
+
+    def synthetic_value(self, i: int) -> float:
+        return round(self.base + (i % 600) / 10, 1)
+
+    def write(self, ts: int, value):
+        with self.lock:
+            if ts not in self.written:
+                self._dirty = True
+            self.written[ts] = value
+
+    def __len__(self) -> int:
+        return self.count + len(self.written)
+
+    def read(self, start_ts: int, end_ts: int, limit: int, descending: bool = False) -> list:
+        """Up to `limit` points in [start_ts, end_ts], written points override synthetic ones"""
+        first = max(0, -(-(start_ts - self.start_ts) // self.interval_ms))
+        last = min(self.count - 1, (end_ts - self.start_ts) // self.interval_ms)
+        synthetic = range(last, first - 1, -1) if descending else range(first, last + 1)
+        with self.lock:
+            if self._dirty:
+                self._written_ts = sorted(self.written)
+                self._dirty = False
+            # Rebuilds replace the list, so this reference stays consistent
+            written_ts = self._written_ts
+        lo = bisect.bisect_left(written_ts, start_ts)
+        hi = bisect.bisect_right(written_ts, end_ts)
+
+        if lo == hi:
+            return [
+                {'ts': self.start_ts + i * self.interval_ms, 'value': str(self.synthetic_value(i))}
+                for i in synthetic[:limit]
+            ]
+
+        # Merge synthetic and written timestamps, O(limit) per page
+        step = -1 if descending else 1
+        w, w_end = (hi - 1, lo - 1) if descending else (lo, hi)
+        synthetic = iter(synthetic)
+        s = next(synthetic, None)
+        points = []
+        while len(points) < limit:
+            s_ts = self.start_ts + s * self.interval_ms if s is not None else None
+            w_ts = written_ts[w] if w != w_end else None
+            if w_ts is None and s_ts is None:
+                break
+            if w_ts is not None and (s_ts is None or (w_ts >= s_ts if descending else w_ts <= s_ts)):
+                points.append({'ts': w_ts, 'value': _tb_string(self.written[w_ts])})
+                if w_ts == s_ts:
+                    s = next(synthetic, None)
+                w += step
+            else:
+                points.append({'ts': s_ts, 'value': str(self.synthetic_value(s))})
+                s = next(synthetic, None)
+        return points
+
+
+def _entity_id(entity_type: str, id_: str = None) -> dict:
+    return {'entityType': entity_type, 'id': id_ or str(uuid.uuid4())}
+
+
+def _page(items: list, params: dict) -> dict:
+    """ThingsBoard PageData response"""
+    page_size = int(params.get('pageSize', 10))
+    page = int(params.get('page', 0))
+    text = params.get('textSearch', '').lower()
+    if text:
+        items = [i for i in items if text in i['name'].lower()]
+    total_pages = -(-len(items) // page_size)
+    return {
+        'data': items[page * page_size:(page + 1) * page_size],
+        'totalPages': total_pages,
+        'totalElements': len(items),
+        'hasNext': page + 1 < total_pages,
+    }
+
+
+class FakeThingsBoard:
+    """In-memory ThingsBoard data"""
+
+    def __init__(self, latency_ms: float = 0, connect_latency_ms: float = 0, token_ttl: float = 9000,
+                 error_rate: float = 0, retry_after: float = None, bandwidth_kbps: float = 0,
+                 gzip_responses: bool = False, gzip_requests: bool = False):
+        # Delay per API call (server time + round trip)
+        self.latency_ms = latency_ms
+        # Delay per new TCP connection, emulates TCP + TLS handshake over WAN
+        self.connect_latency_ms = connect_latency_ms
+        self.token_ttl = token_ttl
+        # Fraction of API calls answered with 429/503 (Retry-After if given)
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        # Link speed for request/response bodies in kbit/s (0 = unlimited), emulates the WAN uplink
+        self.bandwidth_kbps = bandwidth_kbps
+        # Compress responses >= 1 KiB if the client accepts gzip (like server.compression in Spring Boot)
+        self.gzip_responses = gzip_responses
+        # Accept gzip request bodies (stock ThingsBoard does not: 400)
+        self.gzip_requests = gzip_requests
+
+        self.customers = []
+        self.customers_by_id = {}
+        self.assets = {}
+        self.devices = {}
+        self.relations = []
+        self.relations_by_entity = {}  # ('from'|'to', entity_id) -> [relation]
+        self.attributes = {}  # (entity_id, scope) -> {key: {'value', 'lastUpdateTs'}}
+        self.timeseries = {}  # (entity_id, key) -> Series
+        self.series_by_entity = {}  # entity_id -> {key: Series}
+        self.lock = threading.Lock()
+
+        self.logins = 0
+        self.refreshes = 0
+        self.errors_injected = 0
+        self.requests = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.points_read = 0
+        self.points_written = 0
+
+    # -------------------------------------------------------------------------
+    # Data setup
+    # -------------------------------------------------------------------------
+
+    def add_customer(self, name: str) -> dict:
+        customer = {'id': _entity_id('CUSTOMER'), 'name': name, 'title': name}
+        self.customers.append(customer)
+        self.customers_by_id[customer['id']['id']] = customer
+        return customer
+
+    def add_asset(self, name: str, asset_type: str, customer: dict = None, attributes: dict = None) -> dict:
+        asset = {
+            'id': _entity_id('ASSET'),
+            'name': name,
+            'type': asset_type,
+            'label': None,
+            'customerId': customer['id'] if customer else _entity_id('CUSTOMER', '13814000-1dd2-11b2-8080-808080808080'),
+            'createdTime': int(time.time() * 1000),
+        }
+        self.assets[asset['id']['id']] = asset
+        if attributes:
+            self.set_attributes(asset['id']['id'], 'SERVER_SCOPE', attributes)
+        return asset
+
+    def add_device(self, name: str, device_type: str = 'default', customer: dict = None) -> dict:
+        device = {
+            'id': _entity_id('DEVICE'),
+            'name': name,
+            'type': device_type,
+            'customerId': customer['id'] if customer else None,
+            'createdTime': int(time.time() * 1000),
+        }
+        self.devices[device['id']['id']] = device
+        return device
+
+    def add_relation(self, from_entity: dict, to_entity: dict, relation_type: str):
+        relation = {
+            'from': from_entity['id'],
+            'to': to_entity['id'],
+            'type': relation_type,
+            'typeGroup': 'COMMON',
+        }
+        self.relations.append(relation)
+        self.relations_by_entity.setdefault(('from', from_entity['id']['id']), []).append(relation)
+        self.relations_by_entity.setdefault(('to', to_entity['id']['id']), []).append(relation)
+
+    def add_series(self, entity_id: str, key: str, count: int = 0, **kwargs) -> Series:
+        series = Series(count, **kwargs)
+        with self.lock:
+            self.timeseries[(entity_id, key)] = series
+            self.series_by_entity.setdefault(entity_id, {})[key] = series
+        return series
+
+    def set_attributes(self, entity_id: str, scope: str, values: dict):
+        now = int(time.time() * 1000)
+        with self.lock:
+            attrs = self.attributes.setdefault((entity_id, scope), {})
+            for key, value in values.items():
+                attrs[key] = {'value': value, 'lastUpdateTs': now}
+
+    def seed(self, customers: int = 3, projects_per_customer: int = 2, measurements_per_project: int = 3,
+             vr_devices_per_measurement: int = 2, points_per_key: int = 10000, seed: int = 42,
+             named_projects: tuple = ()):
+        """Create synthetic customers, projects, measurements, VR devices and series
+
+        Odd measurements have VR devices (old layout) carrying the CHC_* keys, the
+        others carry CHC_* keys directly on the measurement. `named_projects` are
+        added to an extra customer with CHC_* keys (including CHC_S_TemperatureDiff)
+        on all measurements, like the projects handled by copy_telemetry_keys.py.
+        """
+        rnd = random.Random(seed)
+        chc_keys = ['CHC_S_TemperatureFlow', 'CHC_S_TemperatureReturn', 'CHC_S_VolumeFlow',
+                    'CHC_S_Power_Heating', 'CHC_M_Energy_Heating']
+        for c in range(1, customers + 1):
+            customer = self.add_customer(f"Customer {c}")
+            for p in range(1, projects_per_customer + 1):
+                project_name = f"C{c}P{p}"
+                project = self.add_asset(project_name, 'Project', customer, {'standardOutsideTemperature': -12})
+                for m in range(1, measurements_per_project + 1):
+                    measurement = self.add_asset(f"{project_name}_{m}", 'Measurement', customer, {
+                        'installationType': 'heating',
+                        'locationName': f"Room {m}",
+                        'deltaT': 5,
+                        'nominalFlow': 2.5,
+                        'sensorLabel1': 'Supply',
+                    })
+                    self.add_relation(project, measurement, 'Owns')
+                    if m % 2:
+                        for v in range(1, vr_devices_per_measurement + 1):
+                            suffix = '_PF1' if v == 1 else f"_TS{v - 1}"
+                            device = self.add_device(f"{project_name}_{m}{suffix}", 'VR', customer)
+                            self.add_relation(measurement, device, 'Measurement VR')
+                            for key in (chc_keys if v == 1 else ['temperature']):
+                                self.add_series(device['id']['id'], key, points_per_key, base=rnd.uniform(5, 60))
+                    else:
+                        for key in chc_keys:
+                            self.add_series(measurement['id']['id'], key, points_per_key, base=rnd.uniform(5, 60))
+
+        if named_projects:
+            customer = self.add_customer("Direct Customer")
+            for project_name in named_projects:
+                project = self.add_asset(project_name, 'Project', customer, {'standardOutsideTemperature': -12})
+                for m in range(1, measurements_per_project + 1):
+                    measurement = self.add_asset(f"{project_name}_{m}", 'Measurement', customer, {
+                        'installationType': 'heating',
+                    })
+                    self.add_relation(project, measurement, 'Owns')
+                    for key in chc_keys + ['CHC_S_TemperatureDiff']:
+                        self.add_series(measurement['id']['id'], key, points_per_key, base=rnd.uniform(5, 60))
+        return self
+
+    # -------------------------------------------------------------------------
+    # Auth
+    # -------------------------------------------------------------------------
+
+    def issue_tokens(self) -> dict:
+        """Unsigned JWT-shaped access/refresh tokens with an 'exp' claim"""
+        def jwt(exp: float, kind: str) -> str:
+            payload = json.dumps({'exp': exp, 'typ': kind}).encode()
+            return 'e30.' + base64.urlsafe_b64encode(payload).decode().rstrip('=') + '.sig'
+        now = time.time()
+        return {
+            'token': jwt(now + self.token_ttl, 'access'),
+            'refreshToken': jwt(now + 7 * 24 * 3600, 'refresh'),
+        }
+
+    def token_valid(self, authorization: str) -> bool:
+        """Check an 'Authorization: Bearer <jwt>' header against its expiry"""
+        try:
+            payload = authorization.split(' ', 1)[1].split('.')[1]
+            claims = json.loads(base64.urlsafe_b64decode(payload + '=' * (-len(payload) % 4)))
+            return claims['typ'] == 'access' and claims['exp'] > time.time()
+        except Exception:
+            return False
+
+    # -------------------------------------------------------------------------
+    # Queries
+    # -------------------------------------------------------------------------
+
+    def entity(self, entity_type: str, entity_id: str) -> dict:
+        return (self.assets if entity_type == 'ASSET' else self.devices).get(entity_id)
+
+    def find_relations(self, params: dict) -> list:
+        if 'fromId' in params:
+            side, entity_id = 'from', params['fromId']
+        else:
+            side, entity_id = 'to', params.get('toId')
+        relation_type = params.get('relationType')
+        return [
+            r for r in self.relations_by_entity.get((side, entity_id), [])
+            if relation_type is None or r['type'] == relation_type
+        ]
+
+    def query_relations(self, query: dict) -> list:
+        """POST /api/relations (relations query, direction FROM)"""
+        parameters = query.get('parameters') or {}
+        if parameters.get('direction', 'FROM') != 'FROM':
+            return {'status': 400, 'message': 'Only direction FROM is supported'}, 400
+        filters = query.get('filters') or []
+
+        def matches(rel) -> bool:
+            return not filters or any(
+                f.get('relationType') in (None, rel['type'])
+                and (not f.get('entityTypes') or rel['to']['entityType'] in f['entityTypes'])
+                for f in filters
+            )
+
+        result = []
+        seen = {parameters['rootId']}
+        level = [parameters['rootId']]
+        for depth in range(1, int(parameters.get('maxLevel') or 1) + 1):
+            next_level = []
+            for entity_id in level:
+                for rel in self.relations_by_entity.get(('from', entity_id), []):
+                    if not matches(rel):
+                        continue
+                    if not parameters.get('fetchLastLevelOnly') or depth == parameters.get('maxLevel'):
+                        result.append(rel)
+                    if rel['to']['id'] not in seen:
+                        seen.add(rel['to']['id'])
+                        next_level.append(rel['to']['id'])
+            level = next_level
+        return result
+
+    def entity_field(self, entity: dict, key: str):
+        """Value of an ENTITY_FIELD key of the Entity Data Query API"""
+        customer = self.customers_by_id.get((entity.get('customerId') or {}).get('id'))
+        if key == 'ownerName':
+            return customer['title'] if customer else 'Tenant'
+        if key == 'ownerType':
+            return 'CUSTOMER' if customer else 'TENANT'
+        if key == 'ownerId':
+            return customer['id']['id'] if customer else None
+        return entity.get(key)
+
+    def query_entities(self, query: dict) -> dict:
+        """POST /api/entitiesQuery/find for asset type and asset list filters"""
+        entity_filter = query.get('entityFilter') or {}
+        if entity_filter.get('type') == 'assetType':
+            types = set(entity_filter.get('assetTypes') or [entity_filter.get('assetType')])
+            name_filter = (entity_filter.get('assetNameFilter') or '').lower()
+            entities = [a for a in list(self.assets.values())
+                        if a['type'] in types and a['name'].lower().startswith(name_filter)]
+        elif entity_filter.get('type') == 'entityList' and entity_filter.get('entityType') == 'ASSET':
+            entities = [self.assets[i] for i in dict.fromkeys(entity_filter.get('entityList') or []) if i in self.assets]
+        else:
+            return {'status': 400, 'message': f"Unsupported entity filter {entity_filter.get('type')}"}, 400
+
+        page_link = query.get('pageLink') or {}
+        sort_order = page_link.get('sortOrder')
+        if sort_order:
+            sort_key = sort_order['key']['key']
+            entities.sort(key=lambda e: (self.entity_field(e, sort_key) is None, self.entity_field(e, sort_key) or 0),
+                          reverse=sort_order.get('direction') == 'DESC')
+
+        page = _page(entities, {'page': page_link.get('page', 0), 'pageSize': page_link.get('pageSize', 10)})
+        data = []
+        for entity in page['data']:
+            latest = {'ENTITY_FIELD': {}}
+            for key in query.get('entityFields') or []:
+                value = self.entity_field(entity, key['key'])
+                latest['ENTITY_FIELD'][key['key']] = {'ts': 0, 'value': '' if value is None else str(value)}
+            for key in query.get('latestValues') or []:
+                scope = {'SERVER_ATTRIBUTE': 'SERVER_SCOPE', 'SHARED_ATTRIBUTE': 'SHARED_SCOPE'}.get(key['type'])
+                attr = self.attributes.get((entity['id']['id'], scope), {}).get(key['key'])
+                latest.setdefault(key['type'], {})[key['key']] = {
+                    'ts': attr['lastUpdateTs'] if attr else 0,
+                    'value': '' if attr is None else _tb_string(attr['value']),
+                }
+            data.append({'entityId': entity['id'], 'latest': latest, 'timeseries': {}})
+        return {**page, 'data': data}
+
+    def timeseries_keys(self, entity_id: str) -> list:
+        return [key for key, series in list(self.series_by_entity.get(entity_id, {}).items()) if len(series)]
+
+    def read_timeseries(self, entity_id: str, params: dict) -> dict:
+        result = {}
+        for key in params.get('keys', '').split(','):
+            series = self.timeseries.get((entity_id, key))
+            if series is None:
+                continue
+            points = series.read(int(params.get('startTs', 0)), int(params.get('endTs', 2 ** 62)),
+                                 int(params.get('limit', 100)), params.get('orderBy') == 'DESC')
+            if points:
+                result[key] = points
+                self.points_read += len(points)
+        return result
+
+    def write_timeseries(self, entity_id: str, body):
+        for entry in body if isinstance(body, list) else [body]:
+            ts = entry.get('ts', int(time.time() * 1000))
+            for key, value in entry.get('values', {}).items():
+                series = self.timeseries.get((entity_id, key)) or self._get_or_add_series(entity_id, key)
+                series.write(ts, value)
+                self.points_written += 1
+
+    def _get_or_add_series(self, entity_id: str, key: str) -> Series:
+        with self.lock:
+            series = self.timeseries.get((entity_id, key))
+        return series or self.add_series(entity_id, key)
+
+
+# =============================================================================
+# HTTP layer
+# =============================================================================
+
+ROUTES_GET = [
+    (re.compile(r'^/api/customers$'), 'get_customers'),
+    (re.compile(r'^/api/customer/([^/]+)/assets$'), 'get_customer_assets'),
+    (re.compile(r'^/api/tenant/assets$'), 'get_tenant_assets'),
+    (re.compile(r'^/api/relations$'), 'get_relations'),
+    (re.compile(r'^/api/(asset|device)s$'), 'get_entities_by_ids'),
+    (re.compile(r'^/api/(asset|device)/([^/]+)$'), 'get_entity'),
+    (re.compile(r'^/api/plugins/telemetry/(ASSET|DEVICE)/([^/]+)/values/attributes/(\w+)$'), 'get_attributes'),
+    (re.compile(r'^/api/plugins/telemetry/(ASSET|DEVICE)/([^/]+)/keys/timeseries$'), 'get_timeseries_keys'),
+    (re.compile(r'^/api/plugins/telemetry/(ASSET|DEVICE)/([^/]+)/values/timeseries$'), 'get_timeseries'),
+]
+
+ROUTES_POST = [
+    (re.compile(r'^/api/plugins/telemetry/(ASSET|DEVICE)/([^/]+)/attributes/(\w+)$'), 'post_attributes'),
+    (re.compile(r'^/api/plugins/telemetry/(ASSET|DEVICE)/([^/]+)/timeseries/\w+$'), 'post_timeseries'),
+    (re.compile(r'^/api/asset$'), 'post_asset'),
+    (re.compile(r'^/api/entitiesQuery/find$'), 'post_entities_query'),
+    (re.compile(r'^/api/relations$'), 'post_relations_query'),
+]
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True  # headers and body are separate writes
+    tb: FakeThingsBoard = None
+
+    def setup(self):
+        super().setup()
+        if self.tb.connect_latency_ms:
+            time.sleep(self.tb.connect_latency_ms / 1000)
+
+    def log_message(self, format, *args):
+        pass
+
+    def _transfer(self, size: int):
+        """Account a body transfer and sleep for it on a limited link"""
+        if self.tb.bandwidth_kbps:
+            time.sleep(size * 8 / (self.tb.bandwidth_kbps * 1000))
+
+    def _send_json(self, data, status: int = 200, headers: dict = None):
+        body = json.dumps(data).encode('utf-8') if data is not None else b''
+        headers = dict(headers or {})
+        if self.tb.gzip_responses and len(body) >= 1024 and 'gzip' in self.headers.get('Accept-Encoding', ''):
+            body = gzip.compress(body, compresslevel=5)
+            headers['Content-Encoding'] = 'gzip'
+        self._transfer(len(body))
+        self.tb.bytes_sent += len(body)
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_body(self):
+        """Request body as JSON, raises ValueError if it cannot be decoded"""
+        length = int(self.headers.get('Content-Length') or 0)
+        raw = self.rfile.read(length) if length else b''
+        self._transfer(len(raw))
+        self.tb.bytes_received += len(raw)
+        if self.headers.get('Content-Encoding') == 'gzip':
+            if not self.tb.gzip_requests:
+                raise ValueError('Content-Encoding gzip not supported')
+            raw = gzip.decompress(raw)
+        return json.loads(raw) if raw else None
+
+    def _inject_error(self) -> bool:
+        if not self.tb.error_rate or random.random() >= self.tb.error_rate:
+            return False
+        self.tb.errors_injected += 1
+        status = random.choice([429, 503])
+        headers = {'Retry-After': str(self.tb.retry_after)} if self.tb.retry_after is not None else None
+        self._send_json({'status': status, 'message': 'Injected error'}, status, headers)
+        return True
+
+    def _authorized(self) -> bool:
+        if self.tb.token_valid(self.headers.get('Authorization', '')):
+            return True
+        self._send_json({'status': 401, 'message': 'Token has expired', 'errorCode': 11}, 401)
+        return False
+
+    def _dispatch(self, routes: list, body=None):
+        if self.tb.latency_ms:
+            time.sleep(self.tb.latency_ms / 1000)
+        url = urlparse(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        for pattern, name in routes:
+            match = pattern.match(url.path)
+            if match:
+                result = getattr(self, name)(*match.groups(), params=params, body=body)
+                if isinstance(result, tuple):
+                    self._send_json(*result)
+                else:
+                    self._send_json(result)
+                return
+        self._send_json({'status': 404, 'message': 'Not found'}, 404)
+
+    def do_POST(self):
+        path = urlparse(self.path).path
+        try:
+            body = self._read_body()
+        except ValueError as e:
+            self._send_json({'status': 400, 'message': f'Invalid request body: {e}', 'errorCode': 31}, 400)
+            return
+        if path == '/api/auth/login':
+            self.tb.logins += 1
+            self._send_json(self.tb.issue_tokens())
+        elif path == '/api/auth/token':
+            self.tb.refreshes += 1
+            self._send_json(self.tb.issue_tokens())
+        elif self._authorized() and not self._inject_error():
+            self.tb.requests += 1
+            self._dispatch(ROUTES_POST, body)
+
+    def do_GET(self):
+        if self._authorized() and not self._inject_error():
+            self.tb.requests += 1
+            self._dispatch(ROUTES_GET)
+
+    # -------------------------------------------------------------------------
+    # Endpoints
+    # -------------------------------------------------------------------------
+
+    def get_customers(self, params, body):
+        return _page(self.tb.customers, params)
+
+    def get_customer_assets(self, customer_id, params, body):
+        asset_type = params.get('type')
+        assets = [a for a in self.tb.assets.values()
+                  if a['customerId']['id'] == customer_id and (not asset_type or a['type'] == asset_type)]
+        return _page(assets, params)
+
+    def get_tenant_assets(self, params, body):
+        asset_type = params.get('type')
+        assets = [a for a in self.tb.assets.values() if not asset_type or a['type'] == asset_type]
+        return _page(assets, params)
+
+    def get_relations(self, params, body):
+        return self.tb.find_relations(params)
+
+    def get_entities_by_ids(self, kind, params, body):
+        ids = params.get(f"{kind}Ids")
+        if not ids:
+            return {'status': 400, 'message': f"Required parameter '{kind}Ids' is not present"}, 400
+        entities = (self.tb.entity(kind.upper(), entity_id) for entity_id in ids.split(','))
+        return [entity for entity in entities if entity is not None]
+
+    def get_entity(self, kind, entity_id, params, body):
+        entity = self.tb.entity(kind.upper(), entity_id)
+        if entity is None:
+            return {'status': 404, 'message': f"{kind} not found"}, 404
+        return entity
+
+    def get_attributes(self, entity_type, entity_id, scope, params, body):
+        attrs = self.tb.attributes.get((entity_id, scope), {})
+        return [{'key': k, 'value': v['value'], 'lastUpdateTs': v['lastUpdateTs']} for k, v in attrs.items()]
+
+    def get_timeseries_keys(self, entity_type, entity_id, params, body):
+        return self.tb.timeseries_keys(entity_id)
+
+    def get_timeseries(self, entity_type, entity_id, params, body):
+        return self.tb.read_timeseries(entity_id, params)
+
+    def post_attributes(self, entity_type, entity_id, scope, params, body):
+        self.tb.set_attributes(entity_id, scope, body or {})
+        return None
+
+    def post_timeseries(self, entity_type, entity_id, params, body):
+        self.tb.write_timeseries(entity_id, body)
+        return None
+
+    def post_relations_query(self, params, body):
+        return self.tb.query_relations(body or {})
+
+    def post_entities_query(self, params, body):
+        return self.tb.query_entities(body or {})
+
+    def post_asset(self, params, body):
+        asset = self.tb.assets.get(body['id']['id'])
+        if asset is None:
+            return {'status': 404, 'message': 'asset not found'}, 404
+        asset.update(body)
+        return asset
+
+
+def start_server(tb: FakeThingsBoard = None, port: int = 0) -> ThreadingHTTPServer:
+    """Start the stand-in server in a background thread, returns the server (see server_address)"""
+    handler = type('BoundHandler', (Handler,), {'tb': tb or FakeThingsBoard().seed()})
+    server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def base_url(server: ThreadingHTTPServer) -> str:
+    """Base URL of a running stand-in server"""
+    host, port = server.server_address[:2]
+    return f"http://{host}:{port}"
+
+
+if __name__ == '__main__':
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8089
+    server = start_server(port=port)
+    print(f"🧪 Fake ThingsBoard running on {base_url(server)} (Ctrl+C to stop)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -9,155 +9,32 @@ Usage:
     python copy_telemetry_keys.py --execute    # Actually copy
 """
 
-import os
 import sys
-import json
-import requests
-from datetime import datetime
-from pathlib import Path
-from dotenv import load_dotenv
 
-# Load .env from parent directory
-load_dotenv(Path(__file__).parent.parent / '.env')
-
-# Configuration
-TB_BASE_URL = os.getenv('TB_BASE_URL', '').rstrip('/')
-TB_USERNAME = os.getenv('TB_USERNAME')
-TB_PASSWORD = os.getenv('TB_PASSWORD')
+from tb_client import ThingsBoardAPI, ThingsBoardError, TB_BASE_URL, write_run_report
+from tb_inventory import find_assets_by_names, get_assets_by_ids, load_inventory
+from tb_metrics import phase
+from tb_series import Series
+from tb_telemetry import first_timestamps, now_ms, read_telemetry as read_series
+from tb_transforms import get_key_map
 
 # Projects to process (hardcoded)
 PROJECTS_TO_FIX = ['PKE_5', 'PKE_6', 'WBS_9', 'EPI_4']
 
-# Telemetry key mapping
-TELEMETRY_KEY_MAP_BASE = {
-    'CHC_S_TemperatureFlow': 'T_flow_C',
-    'CHC_S_TemperatureReturn': 'T_return_C',
-    'CHC_S_TemperatureDiff': 'dT_K',
-    'CHC_S_VolumeFlow': 'Vdot_m3h',  # Needs ÷1000
-    'CHC_S_Velocity': 'v_ms',
-    'CHC_M_Volume': 'V_m3',
-}
-
-TELEMETRY_KEY_MAP_HEATING = {
-    'CHC_S_Power_Heating': 'P_th_kW',
-    'CHC_M_Energy_Heating': 'E_th_kWh',
-}
-
-TELEMETRY_KEY_MAP_COOLING = {
-    'CHC_S_Power_Cooling': 'P_th_kW',
-    'CHC_M_Energy_Cooling': 'E_th_kWh',
-}
-
-# Keys that need conversion
-CONVERSIONS = {
-    'CHC_S_VolumeFlow': lambda x: float(x) / 1000,  # l/h → m³/h
-}
-
-
-class ThingsBoardAPI:
-    def __init__(self):
-        self.base_url = TB_BASE_URL
-        self.token = None
-
-    def login(self) -> bool:
-        url = f"{self.base_url}/api/auth/login"
-        try:
-            response = requests.post(url, json={
-                "username": TB_USERNAME,
-                "password": TB_PASSWORD
-            })
-            response.raise_for_status()
-            self.token = response.json().get('token')
-            return True
-        except Exception as e:
-            print(f"❌ Login failed: {e}")
-            return False
-
-    def _headers(self):
-        return {
-            "Authorization": f"Bearer {self.token}",
-            "Content-Type": "application/json"
-        }
-
-    def get(self, endpoint, params=None):
-        try:
-            response = requests.get(
-                f"{self.base_url}{endpoint}",
-                headers=self._headers(),
-                params=params
-            )
-            response.raise_for_status()
-            return response.json()
-        except Exception as e:
-            print(f"   ❌ GET {endpoint}: {e}")
-            return None
-
-    def post(self, endpoint, data=None):
-        try:
-            response = requests.post(
-                f"{self.base_url}{endpoint}",
-                headers=self._headers(),
-                json=data
-            )
-            response.raise_for_status()
-            return True
-        except Exception as e:
-            print(f"   ❌ POST {endpoint}: {e}")
-            return False
-
-
-def get_key_map(installation_type: str) -> dict:
-    """Get telemetry key map based on installation type"""
-    key_map = TELEMETRY_KEY_MAP_BASE.copy()
-    if installation_type == 'cooling':
-        key_map.update(TELEMETRY_KEY_MAP_COOLING)
-    else:
-        key_map.update(TELEMETRY_KEY_MAP_HEATING)
-    return key_map
-
-
-def read_telemetry(api, entity_id: str, key: str) -> list:
-    """Read all telemetry data for a key, returns [(ts, value), ...]"""
-    all_data = []
-    start_ts = 0
-    end_ts = int(datetime.now().timestamp() * 1000)
-    limit = 10000
-
-    while True:
-        result = api.get(
-            f"/api/plugins/telemetry/ASSET/{entity_id}/values/timeseries",
-            params={
-                'keys': key,
-                'startTs': start_ts,
-                'endTs': end_ts,
-                'limit': limit,
-                'orderBy': 'ASC'
-            }
-        )
-
-        if not result or key not in result:
-            break
-
-        data = result[key]
-        if not data:
-            break
-
-        for point in data:
-            val = point['value']
-            try:
-                val = float(val)
-            except (ValueError, TypeError):
-                pass
-            all_data.append((point['ts'], val))
 
-        if len(data) < limit:
-            break
+@phase('telemetry_read')
+def read_telemetry(api, entity_id: str, key: str, start_ts: int = None, end_ts: int = None) -> Series:
+    """Read telemetry data for a key (default: all), returns a Series of (ts, value) (tb_telemetry.py)"""
+    return read_series(api, 'ASSET', entity_id, key, start_ts, end_ts)
 
-        start_ts = data[-1]['ts'] + 1
 
-    return all_data
+@phase('telemetry_read')
+def first_points(api, entity_id: str, keys: list) -> dict:
+    """{key: timestamp of its first point} of the keys with data (one request)"""
+    return first_timestamps(api, 'ASSET', entity_id, keys, 0, now_ms())
 
 
+@phase('telemetry_write')
 def write_telemetry(api, entity_id: str, key: str, data: list) -> bool:
     """Write telemetry data in batches"""
     if not data:
@@ -207,71 +84,62 @@ def write_telemetry(api, entity_id: str, key: str, data: list) -> bool:
             for ts, val in batch
         ]
 
-        if not api.post(
+        if api.post(
             f"/api/plugins/telemetry/ASSET/{entity_id}/timeseries/ANY",
             telemetry_batch
-        ):
+        ) is None:
             success = False
 
     return success
 
 
-def find_project_measurements(api, project_name: str) -> list:
-    """Find all measurements for a project"""
-    # Get all customers
-    customers = []
-    page = 0
-    while True:
-        result = api.get("/api/customers", params={"pageSize": 100, "page": page})
-        if not result or not result.get('data'):
-            break
-        customers.extend(result['data'])
-        if not result.get('hasNext'):
-            break
-        page += 1
-
-    # Find project
-    project = None
-    for customer in customers:
-        customer_id = customer['id']['id']
-        assets = api.get(f"/api/customer/{customer_id}/assets", params={
-            "pageSize": 100, "page": 0, "type": "Project"
-        })
-        if assets and assets.get('data'):
-            for asset in assets['data']:
-                if asset['name'] == project_name:
-                    project = asset
-                    break
-        if project:
-            break
-
-    if not project:
-        return []
+@phase('scan')
+def load_assets(api) -> list:
+    """All Projects and Measurements of the tenant (tb_inventory.py)"""
+    return load_inventory(api)
 
-    # Get measurements via relations
-    project_id = project['id']['id']
-    relations = api.get("/api/relations", params={
-        "fromId": project_id,
-        "fromType": "ASSET"
-    })
 
-    if not relations:
-        return []
+@phase('scan')
+def find_projects_measurements(api, project_names: list) -> dict:
+    """{project name: measurements} for all projects, found in one pass (no tenant scan)
 
-    measurement_ids = [
-        rel['to']['id'] for rel in relations
-        if rel.get('to', {}).get('entityType') == 'ASSET'
-        and rel.get('type') == 'Owns'
-    ]
+    The projects are looked up with one paged name query, the measurements
+    they own are loaded in bulk with their attributes. Projects not found
+    map to [].
+    """
+    index = find_assets_by_names(api, 'Project', project_names, attributes=[])
+    if index is None:
+        # Name lookup not available, search the inventory
+        index = {}
+        for a in load_assets(api):
+            if a['type'] == 'Project' and a['name'] in project_names:
+                index.setdefault(a['name'], []).append(a)
 
-    # Get measurement details
-    measurements = []
-    for m_id in measurement_ids:
-        m = api.get(f"/api/asset/{m_id}")
-        if m and m.get('type') == 'Measurement':
-            measurements.append(m)
+    # Get measurements via relations
+    measurement_ids = {}  # project name -> ids
+    for project_name in project_names:
+        if not index.get(project_name):
+            continue
+        relations = api.get("/api/relations", params={
+            "fromId": index[project_name][0]['id']['id'],
+            "fromType": "ASSET"
+        })
+        measurement_ids[project_name] = [
+            rel['to']['id'] for rel in relations or []
+            if rel.get('to', {}).get('entityType') == 'ASSET'
+            and rel.get('type') == 'Owns'
+        ]
 
-    return measurements
+    # Measurement details with their attributes, all projects in one query
+    measurements = {
+        m['id']['id']: m
+        for m in get_assets_by_ids(api, list(dict.fromkeys(i for ids in measurement_ids.values() for i in ids)))
+        if m.get('type') == 'Measurement'
+    }
+    return {
+        project_name: [measurements[i] for i in measurement_ids.get(project_name, []) if i in measurements]
+        for project_name in project_names
+    }
 
 
 def process_measurement(api, measurement: dict, dry_run: bool) -> dict:
@@ -281,15 +149,19 @@ def process_measurement(api, measurement: dict, dry_run: bool) -> dict:
 
     stats = {'name': m_name, 'keys_copied': 0, 'points_copied': 0, 'errors': []}
 
-    # Get installation type
-    attrs = api.get(f"/api/plugins/telemetry/ASSET/{m_id}/values/attributes/SERVER_SCOPE")
+    # Get installation type (loaded with the inventory, unless it came from the fallback listing)
     installation_type = 'heating'
-    if attrs:
-        for attr in attrs:
-            if attr.get('key') == 'installationType':
-                installation_type = attr.get('value', 'heating')
-                break
+    if measurement.get('attributes') is not None:
+        installation_type = measurement['attributes'].get('installationType', 'heating')
+    else:
+        attrs = api.get(f"/api/plugins/telemetry/ASSET/{m_id}/values/attributes/SERVER_SCOPE")
+        if attrs:
+            for attr in attrs:
+                if attr.get('key') == 'installationType':
+                    installation_type = attr.get('value', 'heating')
+                    break
 
+    # Shared transform table (tb_transforms.py), keys on the measurement itself
     key_map = get_key_map(installation_type)
 
     # Get existing telemetry keys
@@ -315,41 +187,36 @@ def process_measurement(api, measurement: dict, dry_run: bool) -> dict:
 
     # Copy each key
     for old_key in keys_to_copy:
-        new_key = key_map[old_key]
+        transform = key_map[old_key]
+        new_key = transform.target
 
-        # Read old CHC_* data
+        # First points of both keys - the overlap check needs no series
         print(f"         📖 Reading {old_key}...", end="", flush=True)
-        old_data = read_telemetry(api, m_id, old_key)
+        probe_keys = [old_key, new_key] if new_key in existing_keys else [old_key]
+        first = first_points(api, m_id, probe_keys)
 
-        if not old_data:
+        if old_key not in first:
             print(" (empty)")
             continue
 
-        old_count = len(old_data)
-        old_min_ts = min(d[0] for d in old_data)
-        old_max_ts = max(d[0] for d in old_data)
-
-        # Check if new key already has data
-        if new_key in existing_keys:
-            new_data = read_telemetry(api, m_id, new_key)
-            if new_data:
-                new_min_ts = min(d[0] for d in new_data)
-                # Only copy data OLDER than what's already there
-                data_to_copy = [(ts, val) for ts, val in old_data if ts < new_min_ts]
-                if not data_to_copy:
-                    print(f" {old_count} pts, new key already covers this period")
-                    continue
-                print(f" {old_count} pts, copying {len(data_to_copy)} older points → {new_key}", end="")
-                old_data = data_to_copy
-            else:
-                print(f" {old_count} pts → {new_key}", end="")
+        # Only copy data OLDER than what's already there
+        new_min_ts = first.get(new_key)
+        if new_min_ts is not None and first[old_key] >= new_min_ts:
+            print(" new key already covers this period")
+            continue
+
+        old_data = read_telemetry(api, m_id, old_key, first[old_key],
+                                  new_min_ts - 1 if new_min_ts is not None else None)
+        if not old_data:
+            print(" (empty)")
+            continue
+        if new_min_ts is not None:
+            print(f" copying {len(old_data)} older points → {new_key}", end="")
         else:
-            print(f" {old_count} pts → {new_key}", end="")
+            print(f" {len(old_data)} pts → {new_key}", end="")
 
         # Apply conversion if needed
-        if old_key in CONVERSIONS:
-            converter = CONVERSIONS[old_key]
-            old_data = [(ts, converter(val)) for ts, val in old_data]
+        old_data = transform.apply(old_data)
 
         if dry_run:
             print(" [DRY RUN]")
@@ -365,20 +232,8 @@ def process_measurement(api, measurement: dict, dry_run: bool) -> dict:
     return stats
 
 
-def main():
-    dry_run = '--execute' not in sys.argv
-
-    print(f"\n{'='*70}")
-    print(f"{'[DRY RUN] ' if dry_run else ''}COPY CHC_* TELEMETRY KEYS")
-    print(f"{'='*70}")
-    print(f"\nProjects: {', '.join(PROJECTS_TO_FIX)}\n")
-
-    api = ThingsBoardAPI()
-    print(f"🔌 Connecting to {TB_BASE_URL}...")
-    if not api.login():
-        sys.exit(1)
-    print("✅ Connected\n")
-
+def _run(api: ThingsBoardAPI, dry_run: bool):
+    """Copy the old keys of all PROJECTS_TO_FIX, then print the summary"""
     total_stats = {
         'projects': 0,
         'measurements': 0,
@@ -387,18 +242,15 @@ def main():
         'errors': []
     }
 
+    print("📊 Loading projects and measurements...")
+    project_measurements = find_projects_measurements(api, PROJECTS_TO_FIX)
+
     for project_name in PROJECTS_TO_FIX:
         print(f"\n{'='*60}")
         print(f"PROJECT: {project_name}")
         print(f"{'='*60}")
 
-        # Refresh token for each project
-        if total_stats['projects'] > 0:
-            print("🔑 Refreshing token...")
-            if not api.login():
-                print("⚠️  Token refresh failed")
-
-        measurements = find_project_measurements(api, project_name)
+        measurements = project_measurements[project_name]
 
         if not measurements:
             print(f"   ❌ No measurements found")
@@ -409,7 +261,12 @@ def main():
 
         for m in measurements:
             print(f"   📍 {m['name']}")
-            stats = process_measurement(api, m, dry_run)
+            try:
+                stats = process_measurement(api, m, dry_run)
+            except ThingsBoardError as e:
+                print(f"\n      ❌ {e}")
+                total_stats['errors'].append(f"{m['name']}: {e}")
+                continue
             total_stats['measurements'] += 1
             total_stats['keys_copied'] += stats['keys_copied']
             total_stats['points_copied'] += stats['points_copied']
@@ -424,6 +281,8 @@ def main():
     print(f"   Keys copied: {total_stats['keys_copied']}")
     print(f"   Data points copied: {total_stats['points_copied']}")
 
+    print(f"   API cache: {api.cache.summary()}")
+
     if total_stats['errors']:
         print(f"   Errors: {len(total_stats['errors'])}")
         for err in total_stats['errors']:
@@ -436,5 +295,25 @@ def main():
         print(f"\n✅ Done!")
 
 
+def main():
+    dry_run = '--execute' not in sys.argv
+
+    print(f"\n{'='*70}")
+    print(f"{'[DRY RUN] ' if dry_run else ''}COPY CHC_* TELEMETRY KEYS")
+    print(f"{'='*70}")
+    print(f"\nProjects: {', '.join(PROJECTS_TO_FIX)}\n")
+
+    api = ThingsBoardAPI()
+    print(f"🔌 Connecting to {TB_BASE_URL}...")
+    if not api.login():
+        sys.exit(1)
+    print("✅ Connected\n")
+
+    try:
+        _run(api, dry_run)
+    finally:
+        write_run_report(api, 'copy_telemetry_keys', 'dry-run' if dry_run else 'execute')
+
+
 if __name__ == '__main__':
     main()
@@ -10,20 +10,12 @@ Usage:
     python fix_telemetry_types.py --execute    # Actually fix
 """
 
-import os
 import sys
-import requests
-from datetime import datetime
-from pathlib import Path
-from dotenv import load_dotenv
 
-# Load .env from parent directory
-load_dotenv(Path(__file__).parent.parent / '.env')
-
-# Configuration
-TB_BASE_URL = os.getenv('TB_BASE_URL', '').rstrip('/')
-TB_USERNAME = os.getenv('TB_USERNAME')
-TB_PASSWORD = os.getenv('TB_PASSWORD')
+from tb_client import ThingsBoardAPI, ThingsBoardError, TB_BASE_URL, write_run_report
+from tb_inventory import load_inventory
+from tb_metrics import phase
+from tb_telemetry import read_telemetry as read_series, read_telemetry_keys as read_series_keys
 
 # Keys to fix (these should be numbers)
 KEYS_TO_FIX = [
@@ -38,57 +30,6 @@ KEYS_TO_FIX = [
 ]
 
 
-class ThingsBoardAPI:
-    def __init__(self):
-        self.base_url = TB_BASE_URL
-        self.token = None
-
-    def login(self) -> bool:
-        url = f"{self.base_url}/api/auth/login"
-        try:
-            response = requests.post(url, json={
-                "username": TB_USERNAME,
-                "password": TB_PASSWORD
-            })
-            response.raise_for_status()
-            self.token = response.json().get('token')
-            return True
-        except Exception as e:
-            print(f"❌ Login failed: {e}")
-            return False
-
-    def _headers(self):
-        return {
-            "Authorization": f"Bearer {self.token}",
-            "Content-Type": "application/json"
-        }
-
-    def get(self, endpoint, params=None):
-        try:
-            response = requests.get(
-                f"{self.base_url}{endpoint}",
-                headers=self._headers(),
-                params=params
-            )
-            response.raise_for_status()
-            return response.json()
-        except Exception as e:
-            return None
-
-    def post(self, endpoint, data=None):
-        try:
-            response = requests.post(
-                f"{self.base_url}{endpoint}",
-                headers=self._headers(),
-                json=data
-            )
-            response.raise_for_status()
-            return True
-        except Exception as e:
-            print(f"   ❌ POST {endpoint}: {e}")
-            return False
-
-
 def preserve_type(v):
     """Preserve original type, convert numeric strings back to numbers."""
     if isinstance(v, bool):
@@ -119,43 +60,19 @@ def preserve_type(v):
     return v
 
 
+@phase('telemetry_read')
 def read_telemetry(api, entity_id: str, key: str) -> list:
-    """Read all telemetry data for a key, returns [(ts, value), ...]"""
-    all_data = []
-    start_ts = 0
-    end_ts = int(datetime.now().timestamp() * 1000)
-    limit = 10000
-
-    while True:
-        result = api.get(
-            f"/api/plugins/telemetry/ASSET/{entity_id}/values/timeseries",
-            params={
-                'keys': key,
-                'startTs': start_ts,
-                'endTs': end_ts,
-                'limit': limit,
-                'orderBy': 'ASC'
-            }
-        )
-
-        if not result or key not in result:
-            break
-
-        data = result[key]
-        if not data:
-            break
+    """Read all telemetry data for a key, returns [(ts, value), ...] (tb_telemetry.py)"""
+    return read_series(api, 'ASSET', entity_id, key, numeric=False)
 
-        for point in data:
-            all_data.append((point['ts'], point['value']))
 
-        if len(data) < limit:
-            break
-
-        start_ts = data[-1]['ts'] + 1
-
-    return all_data
+@phase('telemetry_read')
+def read_telemetry_keys(api, entity_id: str, keys: list) -> dict:
+    """Read several keys together (one request per page), returns {key: [(ts, value), ...]}"""
+    return read_series_keys(api, 'ASSET', entity_id, keys, numeric=False)
 
 
+@phase('telemetry_write')
 def write_telemetry(api, entity_id: str, key: str, data: list) -> bool:
     """Write telemetry data with correct types"""
     if not data:
@@ -171,37 +88,19 @@ def write_telemetry(api, entity_id: str, key: str, data: list) -> bool:
             for ts, val in batch
         ]
 
-        if not api.post(
+        if api.post(
             f"/api/plugins/telemetry/ASSET/{entity_id}/timeseries/ANY",
             telemetry_batch
-        ):
+        ) is None:
             success = False
 
     return success
 
 
+@phase('scan')
 def get_all_measurements(api) -> list:
-    """Get all Measurement assets"""
-    measurements = []
-    page = 0
-
-    while True:
-        resp = api.get(f"/api/tenant/assets", params={
-            "pageSize": 100,
-            "page": page,
-            "type": "Measurement"
-        })
-
-        if not resp or not resp.get('data'):
-            break
-
-        measurements.extend(resp['data'])
-
-        if not resp.get('hasNext'):
-            break
-        page += 1
-
-    return measurements
+    """Get all Measurement assets (tb_inventory.py)"""
+    return load_inventory(api, ['Measurement'], attributes=[], customers_only=False)
 
 
 def fix_measurement(api, measurement: dict, dry_run: bool) -> dict:
@@ -260,8 +159,8 @@ def fix_measurement(api, measurement: dict, dry_run: bool) -> dict:
 
         # Otherwise calculate from T_flow_C - T_return_C
         elif 'T_flow_C' in existing_keys and 'T_return_C' in existing_keys:
-            t_flow = read_telemetry(api, m_id, 'T_flow_C')
-            t_return = read_telemetry(api, m_id, 'T_return_C')
+            temperatures = read_telemetry_keys(api, m_id, ['T_flow_C', 'T_return_C'])
+            t_flow, t_return = temperatures['T_flow_C'], temperatures['T_return_C']
 
             if t_flow and t_return:
                 # Create dict for fast lookup
@@ -290,19 +189,8 @@ def fix_measurement(api, measurement: dict, dry_run: bool) -> dict:
     return stats
 
 
-def main():
-    dry_run = '--execute' not in sys.argv
-
-    print(f"\n{'='*70}")
-    print(f"{'[DRY RUN] ' if dry_run else ''}FIX TELEMETRY TYPES & ADD dT_K")
-    print(f"{'='*70}\n")
-
-    api = ThingsBoardAPI()
-    print(f"🔌 Connecting to {TB_BASE_URL}...")
-    if not api.login():
-        sys.exit(1)
-    print("✅ Connected\n")
-
+def _run(api: ThingsBoardAPI, dry_run: bool):
+    """Fix all measurements, then print the summary"""
     # Get all measurements
     print("📊 Loading all measurements...")
     measurements = get_all_measurements(api)
@@ -314,19 +202,20 @@ def main():
         'keys_fixed': 0,
         'points_fixed': 0,
         'dT_added': 0,
+        'errors': [],
     }
 
     # Process each measurement
     for i, m in enumerate(measurements, 1):
-        # Refresh token every 50 measurements
-        if i > 1 and i % 50 == 0:
-            print(f"\n🔑 Refreshing token...")
-            api.login()
-
         m_name = m['name']
         print(f"\n[{i}/{len(measurements)}] {m_name}")
 
-        stats = fix_measurement(api, m, dry_run)
+        try:
+            stats = fix_measurement(api, m, dry_run)
+        except ThingsBoardError as e:
+            print(f"\n      ❌ {e}")
+            total_stats['errors'].append(f"{m_name}: {e}")
+            continue
         total_stats['measurements_processed'] += 1
 
         if stats['keys_fixed'] > 0 or stats['dT_added']:
@@ -346,6 +235,13 @@ def main():
     print(f"   Data points fixed: {total_stats['points_fixed']}")
     print(f"   dT_K added: {total_stats['dT_added']}")
 
+    print(f"   API cache: {api.cache.summary()}")
+
+    if total_stats['errors']:
+        print(f"   Errors: {len(total_stats['errors'])}")
+        for err in total_stats['errors']:
+            print(f"      ❌ {err}")
+
     if dry_run:
         print(f"\n⚠️  This was a DRY RUN. No changes were made.")
         print(f"   Run with --execute to apply changes.")
@@ -353,5 +249,24 @@ def main():
         print(f"\n✅ Done!")
 
 
+def main():
+    dry_run = '--execute' not in sys.argv
+
+    print(f"\n{'='*70}")
+    print(f"{'[DRY RUN] ' if dry_run else ''}FIX TELEMETRY TYPES & ADD dT_K")
+    print(f"{'='*70}\n")
+
+    api = ThingsBoardAPI()
+    print(f"🔌 Connecting to {TB_BASE_URL}...")
+    if not api.login():
+        sys.exit(1)
+    print("✅ Connected\n")
+
+    try:
+        _run(api, dry_run)
+    finally:
+        write_run_report(api, 'fix_telemetry_types', 'dry-run' if dry_run else 'execute')
+
+
 if __name__ == '__main__':
     main()
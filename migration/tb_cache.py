@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+ECO Smart Diagnostics - Response Cache for read-only ThingsBoard lookups
+
+Bounded LRU cache with TTL in front of ThingsBoardAPI.get for entity,
+attribute, key and relation lookups (never for timeseries values or page
+listings). Asset/device listing pages and multi-id lookups prime the
+per-entity lookups, so an entity found by a scan is not fetched again. Writes through the client keep
+it coherent:
+- attribute POSTs are merged into cached attribute lists of that entity
+- timeseries writes/deletes only drop the cached key list of that entity
+- saving an entity (POST /api/asset) only drops its cached entity lookup
+- any other POST/DELETE drops all cached entries of the entities involved
+
+Returned values are copies, so callers may modify them (e.g. _set_entity_label).
+
+SingleFlight lets concurrent identical GETs share one in-flight request (e.g.
+the same VR device looked up from a project and from several measurements
+while scanning with --concurrency). It works for all GETs, also with the
+cache disabled; writes to an entity detach in-flight GETs that refer to it,
+so later callers do not get a response read before the write. Such a
+response is not cached either: every write bumps a write generation, and
+put() skips responses of entities written since their GET started.
+
+Configuration (.env):
+    TB_CACHE_SIZE    Max. cached responses (default: 10000, 0 = disabled)
+    TB_CACHE_TTL     Seconds a cached response stays valid (default: 300)
+"""
+
+import os
+import re
+import copy
+import time
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+TB_CACHE_SIZE = int(os.getenv('TB_CACHE_SIZE', '10000'))
+TB_CACHE_TTL = float(os.getenv('TB_CACHE_TTL', '300'))
+
+# Read-only lookups that may be served from cache
+CACHEABLE_ENDPOINTS = [
+    re.compile(r'^/api/(asset|device|customer)/[^/]+$'),
+    re.compile(r'^/api/plugins/telemetry/\w+/[^/]+/values/attributes(/\w+)?$'),
+    re.compile(r'^/api/plugins/telemetry/\w+/[^/]+/keys/(timeseries|attributes)$'),
+    re.compile(r'^/api/relations$'),
+]
+
+# Entity listings whose items are the same objects /api/{asset|device}/{id} returns
+# (pages, or plain lists for the multi-id lookups /api/assets?assetIds=..., /api/devices?deviceIds=...)
+ENTITY_LISTING_RE = re.compile(r'^/api/((customer/[^/]+|tenant)/)?(assets|devices)$')
+
+ATTRIBUTES_WRITE_RE = re.compile(r'^/api/plugins/telemetry/\w+/([^/]+)/attributes/(\w+)$')
+ENTITY_SAVE_RE = re.compile(r'^/api/(asset|device|customer)$')
+TIMESERIES_WRITE_RE = re.compile(r'^/api/plugins/telemetry/\w+/([^/]+)/timeseries/')
+UUID_RE = re.compile(r'[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}')
+
+# Returned by get() on a miss (None is a valid cached response)
+MISSING = object()
+
+
+def written_entity_ids(endpoint: str, data=None) -> set:
+    """Entity ids a POST/DELETE refers to (in the path or as data['id']['id'])"""
+    entity_ids = set(UUID_RE.findall(endpoint))
+    entity_id = data.get('id') if isinstance(data, dict) else None
+    entity_id = entity_id.get('id') if isinstance(entity_id, dict) else None
+    if entity_id:
+        entity_ids.add(entity_id)
+    return entity_ids
+
+
+class ResponseCache:
+    """Thread-safe LRU cache with TTL and per-entity invalidation"""
+
+    def __init__(self, max_entries: int = TB_CACHE_SIZE, ttl: float = TB_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.enabled = max_entries > 0 and ttl > 0
+        self.entries = OrderedDict()  # key -> (expires_at, value, entity_ids)
+        self.by_entity = {}  # entity_id -> {keys}
+        self.generation = 0  # writes seen so far
+        self.written = {}  # entity_id (None: writes without one) -> generation of its last write
+        self.lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def cacheable(endpoint: str) -> bool:
+        return any(pattern.match(endpoint) for pattern in CACHEABLE_ENDPOINTS)
+
+    @staticmethod
+    def make_key(base_url: str, endpoint: str, params: Optional[dict]) -> tuple:
+        return base_url, endpoint, tuple(sorted((params or {}).items()))
+
+    def get(self, key: tuple):
+        """Cached value (a copy) or MISSING"""
+        if not self.enabled:
+            return MISSING
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return MISSING
+            self.entries.move_to_end(key)
+            self.hits += 1
+            value = entry[1]
+        return copy.deepcopy(value)
+
+    def put(self, key: tuple, value, since: int = None):
+        """Cache a response; with since (generation when its GET started), not if its entities were written since"""
+        if not self.enabled:
+            return
+        value = copy.deepcopy(value)
+        entity_ids = set(UUID_RE.findall(key[1] + ' ' + ' '.join(str(v) for _, v in key[2])))
+        with self.lock:
+            if since is not None and any(self.written.get(entity_id, 0) > since
+                                         for entity_id in entity_ids | {None}):
+                return
+            if key in self.entries:
+                self._remove(key)
+            self.entries[key] = (time.monotonic() + self.ttl, value, entity_ids)
+            for entity_id in entity_ids:
+                self.by_entity.setdefault(entity_id, set()).add(key)
+            while len(self.entries) > self.max_entries:
+                self._remove(next(iter(self.entries)))
+                self.evictions += 1
+
+    def prime_from_listing(self, base_url: str, endpoint: str, result, since: int = None):
+        """Cache the entities of an asset/device listing as single lookups"""
+        if not self.enabled or not ENTITY_LISTING_RE.match(endpoint):
+            return
+        entities = result.get('data') if isinstance(result, dict) else result
+        if not isinstance(entities, list):
+            return
+        for entity in entities:
+            entity_id = entity.get('id', {})
+            if entity_id.get('entityType') in ('ASSET', 'DEVICE') and entity_id.get('id'):
+                path = f"/api/{entity_id['entityType'].lower()}/{entity_id['id']}"
+                self.put(self.make_key(base_url, path, None), entity, since)
+
+    def on_write(self, endpoint: str, data=None, applied: bool = True):
+        """Keep the cache coherent after a POST/DELETE to `endpoint`
+
+        A write that failed (`applied=False`) may still have been partially
+        applied, so all cached responses of the entities involved are dropped.
+        """
+        if not self.enabled:
+            return
+        entity_id = data.get('id') if isinstance(data, dict) else None
+        entity_id = entity_id.get('id') if isinstance(entity_id, dict) else None
+
+        with self.lock:
+            self.generation += 1
+            for written_id in written_entity_ids(endpoint, data) or {None}:
+                self.written[written_id] = self.generation
+
+        if applied:
+            match = ATTRIBUTES_WRITE_RE.match(endpoint)
+            if match and isinstance(data, dict):
+                self._merge_attributes(match.group(1), match.group(2), data)
+                return
+            match = TIMESERIES_WRITE_RE.match(endpoint)
+            if match:
+                self._invalidate_matching(match.group(1), '/keys/timeseries')
+                return
+            match = ENTITY_SAVE_RE.match(endpoint)
+            if match and entity_id:
+                self._invalidate_matching(entity_id, f"/api/{match.group(1)}/")
+                return
+
+        for entity_id in written_entity_ids(endpoint, data):
+            self.invalidate_entity(entity_id)
+
+    def invalidate_entity(self, entity_id: str):
+        """Drop all cached responses that refer to an entity"""
+        with self.lock:
+            for key in list(self.by_entity.get(entity_id, ())):
+                self._remove(key)
+                self.invalidations += 1
+
+    def _invalidate_matching(self, entity_id: str, fragment: str):
+        with self.lock:
+            for key in list(self.by_entity.get(entity_id, ())):
+                if fragment in key[1]:
+                    self._remove(key)
+                    self.invalidations += 1
+
+    def _merge_attributes(self, entity_id: str, scope: str, values: dict):
+        """Apply written attribute values to cached attribute lists of the entity"""
+        now = int(time.time() * 1000)
+        with self.lock:
+            for key in list(self.by_entity.get(entity_id, ())):
+                endpoint = key[1]
+                if endpoint.endswith(f"/values/attributes/{scope}") and isinstance(self.entries[key][1], list):
+                    attrs = [a for a in self.entries[key][1] if a.get('key') not in values]
+                    attrs.extend({'key': k, 'value': copy.deepcopy(v), 'lastUpdateTs': now} for k, v in values.items())
+                    expires_at, _, entity_ids = self.entries[key]
+                    self.entries[key] = (expires_at, attrs, entity_ids)
+                elif '/values/attributes' in endpoint or '/keys/attributes' in endpoint:
+                    # All-scope lists and key lists: cheaper to re-fetch than to patch
+                    self._remove(key)
+                    self.invalidations += 1
+
+    def _remove(self, key: tuple):
+        _, _, entity_ids = self.entries.pop(key)
+        for entity_id in entity_ids:
+            keys = self.by_entity.get(entity_id)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.by_entity[entity_id]
+
+    def summary(self) -> str:
+        stats = self.stats()
+        return (f"{stats['hits']} hits, {stats['misses']} misses "
+                f"({stats['hit_rate']:.0%}), {stats['invalidations']} invalidated")
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self.entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+        }
+
+
+class _Call:
+    """One in-flight request and the callers waiting for it"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.waiters = 0
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Share one in-flight call between concurrent callers with the same key"""
+
+    def __init__(self):
+        self.calls = {}  # key -> _Call
+        self.lock = threading.Lock()
+        self.shared = 0
+
+    def do(self, key: tuple, func, *args):
+        """Result of func(*args), or of the identical call already in flight (as a copy)"""
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = _Call()
+            else:
+                call.waiters += 1
+                self.shared += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result)
+
+        try:
+            result = func(*args)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self.lock:
+                if self.calls.get(key) is call:
+                    del self.calls[key]
+                waiters = call.waiters
+            if waiters and call.error is None:
+                # The leader's caller may modify its result while waiters copy theirs
+                call.result = copy.deepcopy(result)
+            call.done.set()
+        return result
+
+    def forget(self, entity_ids: set):
+        """Detach in-flight calls referring to these entities, later callers start a new one"""
+        if not entity_ids:
+            return
+        with self.lock:
+            for key in list(self.calls):
+                _, endpoint, params = key
+                if any(entity_id in endpoint or any(entity_id == str(value) for _, value in params)
+                       for entity_id in entity_ids):
+                    del self.calls[key]
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> ResponseCache:
+    """Get the process-wide shared response cache (created on first use)"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache()
+        return _cache
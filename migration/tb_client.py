@@ -0,0 +1,435 @@
+#!/usr/bin/env python3
+"""
+ECO Smart Diagnostics - Shared ThingsBoard REST Client
+
+Used by tb_migration.py, copy_telemetry_keys.py and fix_telemetry_types.py.
+
+All clients share one requests.Session backed by a keep-alive connection pool,
+so consecutive calls reuse open TCP/TLS connections instead of paying a new
+handshake per request.
+
+The JWT is refreshed via /api/auth/token shortly before it expires (falls back
+to a full login if the refresh token is no longer valid). A request that still
+gets a 401 is retried once after re-authentication.
+
+Requests pass through the shared AdaptiveRateLimiter (tb_ratelimit.py). 429,
+5xx and connection errors are retried with bounded exponential backoff (or
+after Retry-After).
+
+Telemetry pages are read with stream_timeseries(), which decodes the response
+while it is received (tb_stream.py) instead of building it in memory first.
+
+Responses are requested gzip-compressed (Accept-Encoding). Compressed request
+bodies are opt-in (TB_COMPRESSION=gzip), since stock ThingsBoard does not
+decode them: larger POST bodies (telemetry batches) are then sent
+gzip-compressed; if the server rejects that (400/415), the body is re-sent
+uncompressed and compression of request bodies is switched off for the rest
+of the run.
+
+Every request is recorded per endpoint and phase in the shared RequestMetrics
+(tb_metrics.py).
+
+Read-only lookups (entities, attributes, keys, relations) are served from the
+shared ResponseCache (tb_cache.py), which POST/DELETE keep coherent. Concurrent
+identical GETs share one in-flight request (SingleFlight, tb_cache.py).
+
+Configuration (.env):
+    TB_BASE_URL      ThingsBoard URL
+    TB_USERNAME      Login user
+    TB_PASSWORD      Login password
+    TB_POOL_SIZE     Max. pooled connections per host (default: 10)
+    TB_TOKEN_REFRESH_MARGIN  Seconds before JWT expiry to refresh (default: 300)
+    TB_MAX_RETRIES   Retries for 429/5xx/connection errors (default: 5)
+    TB_RETRY_BACKOFF Base backoff in seconds, doubled per retry (default: 1)
+    TB_REQUEST_TIMEOUT  Timeout per request in seconds (default: 120)
+    TB_COMPRESSION   reads = responses only, gzip = reads + request bodies, off (default: reads)
+    TB_GZIP_MIN_SIZE Min. POST body size in bytes to compress (default: 1024)
+    Rate limiter settings: see tb_ratelimit.py
+    Cache settings: see tb_cache.py
+    Metrics settings: see tb_metrics.py
+"""
+
+import os
+import gzip
+import json
+import time
+import base64
+import random
+import logging
+import threading
+import requests
+from pathlib import Path
+from typing import Iterator, Optional
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+
+from tb_cache import MISSING, ResponseCache, SingleFlight, get_cache, written_entity_ids
+from tb_metrics import RequestMetrics, get_metrics
+from tb_ratelimit import AdaptiveRateLimiter, get_rate_limiter, parse_retry_after
+from tb_stream import iter_timeseries
+
+# Load .env from parent directory
+load_dotenv(Path(__file__).parent.parent / '.env')
+
+# Configuration
+TB_BASE_URL = os.getenv('TB_BASE_URL', '').rstrip('/')
+TB_USERNAME = os.getenv('TB_USERNAME')
+TB_PASSWORD = os.getenv('TB_PASSWORD')
+TB_POOL_SIZE = int(os.getenv('TB_POOL_SIZE', '10'))
+TB_TOKEN_REFRESH_MARGIN = int(os.getenv('TB_TOKEN_REFRESH_MARGIN', '300'))
+TB_MAX_RETRIES = int(os.getenv('TB_MAX_RETRIES', '5'))
+TB_RETRY_BACKOFF = float(os.getenv('TB_RETRY_BACKOFF', '1'))
+TB_RETRY_BACKOFF_MAX = 60
+TB_REQUEST_TIMEOUT = float(os.getenv('TB_REQUEST_TIMEOUT', '120'))
+TB_COMPRESSION = os.getenv('TB_COMPRESSION', 'reads').lower()
+TB_GZIP_MIN_SIZE = int(os.getenv('TB_GZIP_MIN_SIZE', '1024'))
+
+COMPRESSION_MODES = ('gzip', 'reads', 'off')
+
+# Responses to a gzip request body that mean "not supported"
+GZIP_REJECTED_STATUS_CODES = {400, 415}
+
+# Read size when streaming responses
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Responses that are retried (throttled or transient server errors)
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Shares the logger of tb_migration.py (handlers are configured there)
+log = logging.getLogger('migration')
+log.addHandler(logging.NullHandler())
+
+# =============================================================================
+# Shared Session (keep-alive connection pool)
+# =============================================================================
+_session = None
+_session_lock = threading.Lock()
+
+
+def create_session(pool_size: int = TB_POOL_SIZE) -> requests.Session:
+    """Create a session with a keep-alive connection pool of the given size"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def get_session() -> requests.Session:
+    """Get the process-wide shared session (created on first use)"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = create_session(TB_POOL_SIZE)
+        return _session
+
+
+def wire_bytes(response: requests.Response) -> int:
+    """Bytes of the response body as received (compressed), after it was read"""
+    try:
+        return response.raw.tell()
+    except (AttributeError, OSError):
+        return len(response.content or b'')
+
+
+def jwt_expiry(token: str) -> Optional[float]:
+    """Read the 'exp' claim (unix seconds) from a JWT, without verifying it"""
+    try:
+        payload = token.split('.')[1]
+        payload += '=' * (-len(payload) % 4)
+        return float(json.loads(base64.urlsafe_b64decode(payload))['exp'])
+    except Exception:
+        return None
+
+
+class ThingsBoardError(Exception):
+    """A ThingsBoard request failed (after retries)"""
+
+
+def retry_delay(attempt: int) -> float:
+    """Exponential backoff with jitter for the given retry attempt (0-based)"""
+    return min(TB_RETRY_BACKOFF_MAX, TB_RETRY_BACKOFF * 2 ** attempt) * random.uniform(0.5, 1.0)
+
+
+class ThingsBoardAPI:
+    """ThingsBoard API Client"""
+
+    def __init__(self, base_url: str = None, username: str = None, password: str = None,
+                 session: requests.Session = None, rate_limiter: AdaptiveRateLimiter = None,
+                 cache: ResponseCache = None, metrics: RequestMetrics = None,
+                 compression: str = None):
+        self.base_url = (base_url or TB_BASE_URL).rstrip('/')
+        self.username = username or TB_USERNAME
+        self.password = password or TB_PASSWORD
+        self.session = session or get_session()
+        self.rate_limiter = rate_limiter or get_rate_limiter()
+        self.cache = cache or get_cache()
+        self.metrics = metrics or get_metrics()
+        self.set_compression(compression or TB_COMPRESSION)
+        self.inflight = SingleFlight()
+        self.token = None
+        self.refresh_token = None
+        self.token_expires_at = None
+        self._auth_lock = threading.Lock()
+
+    def login(self) -> bool:
+        """Authenticate and get JWT token"""
+        payload = {"username": self.username, "password": self.password}
+
+        try:
+            response = self._request('POST', '/api/auth/login', authorized=False, json=payload)
+            self._set_tokens(response.json())
+            log.info(f"Login successful for {self.username}")
+            return True
+        except Exception as e:
+            log.error(f"Login failed: {e}")
+            print(f"❌ Login failed: {e}")
+            return False
+
+    def refresh(self) -> bool:
+        """Get a new JWT using the refresh token, falls back to a full login"""
+        if self.refresh_token:
+            try:
+                response = self._request('POST', '/api/auth/token', authorized=False,
+                                         json={"refreshToken": self.refresh_token})
+                self._set_tokens(response.json())
+                log.info("Token refreshed")
+                return True
+            except Exception as e:
+                log.warning(f"Token refresh failed, logging in again: {e}")
+        return self.login()
+
+    def _set_tokens(self, data: dict):
+        """Store tokens from a login/refresh response"""
+        self.token = data.get('token')
+        self.refresh_token = data.get('refreshToken')
+        self.token_expires_at = jwt_expiry(self.token) if self.token else None
+
+    def _ensure_token(self):
+        """Refresh the JWT proactively if it expires within TB_TOKEN_REFRESH_MARGIN"""
+        if self.token_expires_at is None:
+            return
+        if time.time() < self.token_expires_at - TB_TOKEN_REFRESH_MARGIN:
+            return
+        with self._auth_lock:
+            # Another thread may have refreshed while we waited for the lock
+            if time.time() >= self.token_expires_at - TB_TOKEN_REFRESH_MARGIN:
+                self.refresh()
+
+    def _reauthenticate(self, rejected_token: str) -> bool:
+        """Re-authenticate after a 401, unless another thread already did"""
+        with self._auth_lock:
+            if self.token != rejected_token:
+                return True
+            return self.refresh()
+
+    def set_compression(self, mode: str):
+        """gzip = compressed responses and request bodies, reads = responses only, off"""
+        if mode not in COMPRESSION_MODES:
+            raise ValueError(f"Unknown compression mode '{mode}', expected one of {', '.join(COMPRESSION_MODES)}")
+        self.gzip_reads = mode in ('gzip', 'reads')
+        self.gzip_writes = mode == 'gzip'
+
+    def _headers(self, authorized: bool = True) -> dict:
+        """Get authorization headers"""
+        headers = {
+            "Content-Type": "application/json",
+            "Accept-Encoding": "gzip" if self.gzip_reads else "identity",
+        }
+        if authorized:
+            headers["Authorization"] = f"Bearer {self.token}"
+        return headers
+
+    def _request(self, method: str, endpoint: str, headers: dict = None, authorized: bool = True,
+                 **kwargs) -> requests.Response:
+        """Send an authorized, rate-limited request
+
+        Retries once after re-authentication on 401, and up to TB_MAX_RETRIES
+        times on 429/5xx/connection errors. Login and token refresh are sent
+        with authorized=False: no token, no re-authentication.
+        """
+        url = f"{self.base_url}{endpoint}"
+        reauthenticated = not authorized
+        attempt = 0
+
+        while True:
+            if authorized:
+                self._ensure_token()
+            token = self.token
+            self.rate_limiter.acquire()
+            started = time.monotonic()
+            try:
+                response = self.session.request(
+                    method, url, headers={**self._headers(authorized), **(headers or {})}, timeout=TB_REQUEST_TIMEOUT,
+                    **kwargs
+                )
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self.metrics.record(method, endpoint, time.monotonic() - started, error=True)
+                self.rate_limiter.on_throttle(type(e).__name__)
+                if attempt >= TB_MAX_RETRIES:
+                    raise
+                delay = retry_delay(attempt)
+                attempt += 1
+                log.warning(f"{method} {endpoint} failed ({e}), retry {attempt}/{TB_MAX_RETRIES} in {delay:.1f}s")
+                time.sleep(delay)
+                continue
+
+            latency = time.monotonic() - started
+            # Streamed bodies are counted by the reader (stream_timeseries), error bodies are read here
+            streamed = kwargs.get('stream') and response.status_code < 400
+            if not streamed:
+                response.content  # read the body now, so its size on the wire is known
+            self.metrics.record(method, endpoint, latency, error=response.status_code >= 400,
+                                bytes_in=0 if streamed else wire_bytes(response),
+                                bytes_out=len(response.request.body or b''))
+
+            if response.status_code == 401 and not reauthenticated and self._reauthenticate(token):
+                reauthenticated = True
+                log.info(f"{method} {endpoint} returned 401, retrying with new token")
+                continue
+
+            if response.status_code in RETRY_STATUS_CODES:
+                retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                self.rate_limiter.on_throttle(f"HTTP {response.status_code}", retry_after)
+                if attempt < TB_MAX_RETRIES:
+                    # With Retry-After the rate limiter holds back all requests until then
+                    delay = 0 if retry_after is not None else retry_delay(attempt)
+                    attempt += 1
+                    log.warning(f"{method} {endpoint} returned {response.status_code}, "
+                                f"retry {attempt}/{TB_MAX_RETRIES} in {retry_after or delay:.1f}s")
+                    time.sleep(delay)
+                    continue
+            else:
+                self.rate_limiter.on_success(latency)
+
+            response.raise_for_status()
+            return response
+
+    def get(self, endpoint: str, params: dict = None) -> Optional[dict]:
+        """GET request (read-only lookups are served from the cache)
+
+        Concurrent identical GETs share one request and its result.
+        """
+        key = self.cache.make_key(self.base_url, endpoint, params)
+        cacheable = self.cache.enabled and self.cache.cacheable(endpoint)
+        if cacheable:
+            cached = self.cache.get(key)
+            if cached is not MISSING:
+                return cached
+        return self.inflight.do(key, self._get, endpoint, params, key if cacheable else None)
+
+    def _get(self, endpoint: str, params: Optional[dict], cache_key: Optional[tuple]) -> Optional[dict]:
+        # A write during the request makes the response stale, it is then not cached
+        since = self.cache.generation
+        try:
+            result = self._request('GET', endpoint, params=params).json()
+        except Exception as e:
+            log.error(f"GET {endpoint} failed: {e}")
+            print(f"❌ GET {endpoint} failed: {e}")
+            return None
+        if cache_key is not None:
+            self.cache.put(cache_key, result, since)
+        else:
+            self.cache.prime_from_listing(self.base_url, endpoint, result, since)
+        return result
+
+    def stream_timeseries(self, endpoint: str, params: dict = None) -> Iterator[tuple]:
+        """GET a /values/timeseries page and yield (key, ts, value) while it is received
+
+        Unlike get(), failures raise ThingsBoardError (also if the transfer
+        breaks off halfway, so a partial page is never mistaken for the end).
+        """
+        try:
+            response = self._request('GET', endpoint, params=params, stream=True)
+        except Exception as e:
+            log.error(f"GET {endpoint} failed: {e}")
+            print(f"❌ GET {endpoint} failed: {e}")
+            raise ThingsBoardError(f"GET {endpoint} failed: {e}") from e
+
+        try:
+            with response:
+                yield from iter_timeseries(response.iter_content(chunk_size=STREAM_CHUNK_SIZE))
+        except (requests.RequestException, ValueError) as e:
+            log.error(f"GET {endpoint} failed while reading the response: {e}")
+            print(f"❌ GET {endpoint} failed while reading the response: {e}")
+            raise ThingsBoardError(f"GET {endpoint} failed while reading the response: {e}") from e
+        finally:
+            self.metrics.add_bytes_in('GET', endpoint, wire_bytes(response))
+
+    def _post(self, endpoint: str, data) -> requests.Response:
+        """POST JSON, gzip-compressed if enabled and worth it (falls back to uncompressed)"""
+        body = json.dumps(data, allow_nan=False).encode('utf-8')
+        if not self.gzip_writes or len(body) < TB_GZIP_MIN_SIZE:
+            return self._request('POST', endpoint, data=body)
+
+        try:
+            return self._request('POST', endpoint, data=gzip.compress(body, compresslevel=5, mtime=0),
+                                 headers={'Content-Encoding': 'gzip'})
+        except requests.HTTPError as e:
+            if e.response is None or e.response.status_code not in GZIP_REJECTED_STATUS_CODES:
+                raise
+            response = self._request('POST', endpoint, data=body)
+            # Only the compressed body was rejected
+            if self.gzip_writes:
+                self.gzip_writes = False
+                log.warning(f"Server rejected gzip request body (HTTP {e.response.status_code}), "
+                            f"sending request bodies uncompressed from now on")
+            return response
+
+    def post(self, endpoint: str, data: dict = None) -> Optional[dict]:
+        """POST request, returns None on failure"""
+        try:
+            response = self._post(endpoint, data)
+            self.inflight.forget(written_entity_ids(endpoint, data))
+            self.cache.on_write(endpoint, data)
+            # Handle empty responses (e.g., telemetry upload returns 200 with no body)
+            if response.status_code == 200 and not response.text:
+                return {}
+            return response.json()
+        except requests.exceptions.JSONDecodeError:
+            # Successful but no JSON response
+            return {}
+        except Exception as e:
+            # The write may have been partially applied, drop what we know about the entity
+            self.inflight.forget(written_entity_ids(endpoint, data))
+            self.cache.on_write(endpoint, data, applied=False)
+            log.error(f"POST {endpoint} failed: {e}")
+            print(f"❌ POST {endpoint} failed: {e}")
+            return None
+
+    def delete(self, endpoint: str) -> bool:
+        """DELETE request"""
+        try:
+            self._request('DELETE', endpoint)
+            self.inflight.forget(written_entity_ids(endpoint))
+            self.cache.on_write(endpoint)
+            return True
+        except Exception as e:
+            self.inflight.forget(written_entity_ids(endpoint))
+            self.cache.on_write(endpoint, applied=False)
+            log.error(f"DELETE {endpoint} failed: {e}")
+            print(f"❌ DELETE {endpoint} failed: {e}")
+            return False
+
+
+def write_run_report(api: ThingsBoardAPI, tool: str, command: str) -> Optional[Path]:
+    """Write the metrics report of a command (see tb_metrics.py) and print its summary"""
+    extra = {
+        'cache': api.cache.stats(),
+        'singleflight': {'shared': api.inflight.shared},
+        'rate_limiter': {'rate': round(api.rate_limiter.rate, 1), 'throttled': api.rate_limiter.throttled},
+    }
+    try:
+        path = api.metrics.write_report(tool, command, extra)
+    except OSError as e:
+        log.error(f"Writing metrics report failed: {e}")
+        path = None
+    log.info(f"API cache: {api.cache.summary()}, {api.inflight.shared} GETs shared an in-flight request")
+
+    print(f"\n📈 Request metrics:")
+    for line in api.metrics.summary():
+        print(line)
+    if path:
+        print(f"   Report: {path}")
+        log.info(f"Metrics report: {path}")
+    return path
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+ECO Smart Diagnostics - asyncio ThingsBoard Client
+
+Same surface as ThingsBoardAPI (login, get, post, delete), but awaitable.
+Calls run on a dedicated thread pool of `concurrency` workers on top of the
+synchronous client, so token refresh, rate limiting, retries and the keep-alive
+connection pool behave exactly as in the sequential tools, while up to
+`concurrency` requests are in flight at the same time.
+
+Configuration (.env):
+    TB_CONCURRENCY   Requests in flight (default: 8)
+"""
+
+import os
+import asyncio
+import functools
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from tb_client import ThingsBoardAPI, TB_POOL_SIZE, create_session
+
+TB_CONCURRENCY = int(os.getenv('TB_CONCURRENCY', '8'))
+
+
+class AsyncThingsBoardAPI:
+    """asyncio ThingsBoard API Client"""
+
+    def __init__(self, api: ThingsBoardAPI = None, concurrency: int = TB_CONCURRENCY):
+        self.concurrency = max(1, concurrency)
+        # The connection pool must hold one connection per worker, otherwise
+        # connections are discarded and re-opened under load
+        self.api = api or ThingsBoardAPI(session=create_session(max(TB_POOL_SIZE, self.concurrency)))
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='tb-api')
+
+    @property
+    def base_url(self) -> str:
+        return self.api.base_url
+
+    async def run(self, func, *args, **kwargs):
+        """Run a blocking client call on the worker pool (in the caller's context, e.g. metrics phase)"""
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(self._executor, functools.partial(context.run, func, *args, **kwargs))
+
+    async def login(self) -> bool:
+        """Authenticate and get JWT token"""
+        return await self.run(self.api.login)
+
+    async def get(self, endpoint: str, params: dict = None) -> Optional[dict]:
+        """GET request"""
+        return await self.run(self.api.get, endpoint, params)
+
+    async def post(self, endpoint: str, data: dict = None) -> Optional[dict]:
+        """POST request, returns None on failure"""
+        return await self.run(self.api.post, endpoint, data)
+
+    async def delete(self, endpoint: str) -> bool:
+        """DELETE request"""
+        return await self.run(self.api.delete, endpoint)
+
+    def close(self):
+        """Shut down the worker pool"""
+        self._executor.shutdown(wait=True)
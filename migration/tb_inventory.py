@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+ECO Smart Diagnostics - Tenant-wide inventory of Projects and Measurements
+
+Used by tb_migration.py (scan), copy_telemetry_keys.py and
+fix_telemetry_types.py.
+
+load_inventory() fetches all Project and Measurement assets of the tenant
+with their customer name and selected server attributes through the Entity
+Data Query API (POST /api/entitiesQuery/find), a few large pages for the
+whole tenant instead of 1 + 2 x customers paginated listings.
+
+If the query is not available (HTTP error), it falls back to listing the
+customers and their assets per type. Pages of both are fetched concurrently
+(tb_paging.py). Assets found that way carry no 'attributes' (None), callers
+read attributes themselves then.
+
+Assets are returned in the shape of /api/asset/{id} (id, name, type, label,
+customerId, createdTime) plus 'customerName' and 'attributes', sorted by
+customer name and asset name. Assets owned by the tenant are left out, as in
+the per-customer listings, unless customers_only=False (as /api/tenant/assets).
+
+find_assets() / find_assets_by_names() look up assets of a type by name with
+one paged query (server-side filter on the names' common prefix, exact match
+on the result) and get_assets_by_ids() loads given assets in the same shape,
+so a single project can be loaded without the inventory of the whole tenant.
+
+RelationGraph holds the Project -Owns-> Measurement -Measurement VR-> Device
+relations indexed by source entity id. fetch_relation_tree() loads the tree
+below one project with a single relation query (POST /api/relations), so a
+scan needs one request per project instead of one per asset and relation
+type, and linking projects, measurements and devices is a dict lookup.
+
+Configuration (.env):
+    TB_INVENTORY_PAGE_SIZE   Entities per query page (default: 1000)
+"""
+
+import os
+import logging
+from typing import Optional
+
+from tb_client import ThingsBoardError
+from tb_paging import get_pages, post_pages
+
+log = logging.getLogger('migration')
+
+TB_INVENTORY_PAGE_SIZE = int(os.getenv('TB_INVENTORY_PAGE_SIZE', '1000'))
+
+ASSET_TYPES = ['Project', 'Measurement']
+
+# Server attributes loaded with the inventory
+INVENTORY_ATTRIBUTES = [
+    'installationType',
+    'locationName',
+    'standardOutsideTemperature',
+]
+
+ENTITY_FIELDS = ['name', 'type', 'label', 'createdTime', 'ownerName', 'ownerType', 'ownerId']
+
+
+def asset_type_filter(asset_types: list, name_prefix: str = None) -> dict:
+    """Entity filter for assets of the given types (names starting with name_prefix, case-insensitive)"""
+    entity_filter = {'type': 'assetType', 'assetTypes': list(asset_types)}
+    if name_prefix:
+        entity_filter['assetNameFilter'] = name_prefix
+    return entity_filter
+
+
+def asset_list_filter(asset_ids: list) -> dict:
+    """Entity filter for the given assets"""
+    return {'type': 'entityList', 'entityType': 'ASSET', 'entityList': list(asset_ids)}
+
+
+def entity_data_query(entity_filter: dict, attributes: list, page: int, page_size: int) -> dict:
+    """Body of an /api/entitiesQuery/find request for the assets of the entity filter"""
+    return {
+        'entityFilter': entity_filter,
+        'entityFields': [{'type': 'ENTITY_FIELD', 'key': key} for key in ENTITY_FIELDS],
+        'latestValues': [{'type': 'SERVER_ATTRIBUTE', 'key': key} for key in attributes],
+        'pageLink': {
+            'page': page,
+            'pageSize': page_size,
+            # Stable order, so pages do not overlap while assets are added
+            'sortOrder': {'key': {'type': 'ENTITY_FIELD', 'key': 'createdTime'}, 'direction': 'ASC'},
+        },
+    }
+
+
+def _latest_value(latest: dict, key_type: str, key: str):
+    value = (latest.get(key_type) or {}).get(key)
+    return value.get('value') if isinstance(value, dict) else None
+
+
+def _asset_from_entity_data(item: dict, attributes: list) -> dict:
+    """Asset dict from one EntityData item"""
+    latest = item.get('latest') or {}
+
+    def field(key):
+        return _latest_value(latest, 'ENTITY_FIELD', key)
+
+    created = field('createdTime')
+    owner_id = field('ownerId') if field('ownerType') != 'TENANT' else None
+    return {
+        'id': item['entityId'],
+        'name': field('name'),
+        'type': field('type'),
+        'label': field('label') or None,
+        'customerId': {'entityType': 'CUSTOMER', 'id': owner_id} if owner_id else None,
+        'createdTime': int(created) if created else None,
+        'customerName': field('ownerName'),
+        'attributes': {
+            key: value for key in attributes
+            if (value := _latest_value(latest, 'SERVER_ATTRIBUTE', key)) not in (None, '')
+        },
+    }
+
+
+def _query_assets(api, entity_filter: dict, attributes: list, page_size: int,
+                  customers_only: bool) -> Optional[list]:
+    """All assets of the entity filter via the Entity Data Query API, None if it failed"""
+    items = post_pages(api, "/api/entitiesQuery/find",
+                       lambda page: entity_data_query(entity_filter, attributes, page, page_size))
+    try:
+        return [
+            _asset_from_entity_data(item, attributes) for item in items
+            if not (customers_only
+                    and _latest_value(item.get('latest') or {}, 'ENTITY_FIELD', 'ownerType') == 'TENANT')
+        ]
+    except ThingsBoardError as e:
+        log.warning(f"Entity data query failed: {e}")
+        return None
+
+
+def _list_assets(api, asset_types: list, customers_only: bool) -> list:
+    """All assets of the types via the per-customer (or tenant) listings"""
+    if not customers_only:
+        assets = []
+        for asset_type in asset_types:
+            for asset in get_pages(api, "/api/tenant/assets", {"type": asset_type}):
+                asset['customerName'] = None
+                asset['attributes'] = None
+                assets.append(asset)
+        return assets
+
+    assets = []
+    for customer in get_pages(api, "/api/customers"):
+        customer_id = customer['id']['id']
+        for asset_type in asset_types:
+            for asset in get_pages(api, f"/api/customer/{customer_id}/assets", {"type": asset_type}):
+                asset['customerName'] = customer['name']
+                asset['attributes'] = None
+                assets.append(asset)
+    return assets
+
+
+def load_inventory(api, asset_types: list = ASSET_TYPES, attributes: list = INVENTORY_ATTRIBUTES,
+                   page_size: int = TB_INVENTORY_PAGE_SIZE, customers_only: bool = True) -> list:
+    """All customer assets (or all assets) of the given types with customer name and attributes"""
+    assets = _query_assets(api, asset_type_filter(asset_types), attributes, page_size, customers_only)
+    if assets is None:
+        log.warning("Entity data query failed, listing assets per customer")
+        assets = _list_assets(api, asset_types, customers_only)
+    assets.sort(key=_sort_key)
+    return assets
+
+
+def _sort_key(asset: dict) -> tuple:
+    return asset.get('customerName') or '', asset.get('name') or ''
+
+
+def find_assets_by_names(api, asset_type: str, names: list, attributes: list = INVENTORY_ATTRIBUTES,
+                         customers_only: bool = True) -> Optional[dict]:
+    """{name: [assets]} of the assets of the type with one of the names, None if the query failed
+
+    Names without a match are left out, the assets of a name are sorted as
+    the inventory.
+    """
+    wanted = set(names)
+    assets = _query_assets(api, asset_type_filter([asset_type], os.path.commonprefix(sorted(wanted))), attributes,
+                           TB_INVENTORY_PAGE_SIZE, customers_only)
+    if assets is None:
+        return None
+    index = {}
+    for asset in sorted(assets, key=_sort_key):
+        if asset['name'] in wanted:
+            index.setdefault(asset['name'], []).append(asset)
+    return index
+
+
+def find_assets(api, asset_type: str, name: str, attributes: list = INVENTORY_ATTRIBUTES,
+                customers_only: bool = True) -> Optional[list]:
+    """Assets of the type with exactly this name (sorted as the inventory), None if the query failed"""
+    index = find_assets_by_names(api, asset_type, [name], attributes, customers_only)
+    return None if index is None else index.get(name, [])
+
+
+def get_assets_by_ids(api, asset_ids: list, attributes: list = INVENTORY_ATTRIBUTES) -> list:
+    """The given assets (unknown ids left out), in the order of the ids
+
+    Falls back to one GET /api/asset/{id} per asset, without customer name
+    and attributes (None), if the query failed.
+    """
+    if not asset_ids:
+        return []
+    assets = _query_assets(api, asset_list_filter(asset_ids), attributes, TB_INVENTORY_PAGE_SIZE,
+                           customers_only=False)
+    if assets is None:
+        assets = [asset for asset in (api.get(f"/api/asset/{asset_id}") for asset_id in asset_ids) if asset]
+        for asset in assets:
+            asset['customerName'] = None
+            asset['attributes'] = None
+    position = {asset_id: i for i, asset_id in enumerate(asset_ids)}
+    return sorted(assets, key=lambda a: position.get(a['id']['id'], len(position)))
+
+
+# =============================================================================
+# Relation graph (Project -Owns-> Measurement -Measurement VR-> Device)
+# =============================================================================
+OWNS = 'Owns'
+MEASUREMENT_VR = 'Measurement VR'
+
+
+def relation_tree_query(root_id: str, max_level: int = 2) -> dict:
+    """Body of a POST /api/relations query for the Owns / 'Measurement VR' tree below an asset"""
+    return {
+        'parameters': {
+            'rootId': root_id,
+            'rootType': 'ASSET',
+            'direction': 'FROM',
+            'relationTypeGroup': 'COMMON',
+            'maxLevel': max_level,
+            'fetchLastLevelOnly': False,
+        },
+        'filters': [
+            {'relationType': OWNS, 'entityTypes': ['ASSET']},
+            {'relationType': MEASUREMENT_VR, 'entityTypes': ['DEVICE']},
+        ],
+    }
+
+
+def fetch_relation_tree(api, root_id: str) -> Optional[list]:
+    """Relations of the tree below a project (its measurements and their VR devices), None if it failed"""
+    relations = api.post("/api/relations", relation_tree_query(root_id))
+    return relations if isinstance(relations, list) else None
+
+
+def fetch_relations_from(api, entity_id: str) -> Optional[list]:
+    """All relations from one asset"""
+    return api.get("/api/relations", params={"fromId": entity_id, "fromType": "ASSET"})
+
+
+def fetch_relations_to(api, entity_id: str) -> Optional[list]:
+    """All relations to one asset"""
+    return api.get("/api/relations", params={"toId": entity_id, "toType": "ASSET"})
+
+
+def owners(relations: Optional[list]) -> set:
+    """Ids of the assets owning the target of the relations"""
+    return {
+        rel['from']['id'] for rel in relations or []
+        if rel.get('type') == OWNS and rel.get('from', {}).get('entityType') == 'ASSET'
+    }
+
+
+class RelationGraph:
+    """Relations indexed by source entity id
+
+    An entity is 'loaded' once all its outgoing relations are known: the
+    root of a relation tree and the assets it owns (their relations are the
+    tree's second level), or an entity added with add_from().
+    """
+
+    def __init__(self):
+        self.outgoing = {}  # from id -> [relation]
+        self.loaded = set()
+
+    def _add(self, relations: list):
+        for rel in relations:
+            self.outgoing.setdefault(rel['from']['id'], []).append(rel)
+
+    def add_tree(self, root_id: str, relations: Optional[list]):
+        """Add the result of fetch_relation_tree(); a failed query leaves the root not loaded"""
+        if relations is None:
+            return
+        owned = {
+            rel['to']['id'] for rel in relations
+            if rel['from']['id'] == root_id and rel.get('type') == OWNS and rel['to'].get('entityType') == 'ASSET'
+        }
+        # The tree replaces what was known about its root and the assets it owns
+        self.discard(owned | {root_id})
+        self._add(relations)
+        self.loaded.add(root_id)
+        self.loaded.update(owned)
+
+    def add_from(self, entity_id: str, relations: Optional[list]):
+        """Add all relations from one entity (a failed lookup counts as none)"""
+        if entity_id in self.loaded:
+            return
+        self._add(rel for rel in relations or [] if rel.get('from', {}).get('id') == entity_id)
+        self.loaded.add(entity_id)
+
+    def discard(self, entity_ids: set):
+        """Forget the relations from the entities, they are loaded again"""
+        for entity_id in entity_ids:
+            self.outgoing.pop(entity_id, None)
+            self.loaded.discard(entity_id)
+
+    def is_loaded(self, entity_id: str) -> bool:
+        return entity_id in self.loaded
+
+    def targets(self, from_id: str, relation_type: str, entity_type: str) -> list:
+        """Relations of a type from an entity to entities of a type (first occurrence per target)"""
+        seen = set()
+        result = []
+        for rel in self.outgoing.get(from_id, ()):
+            to = rel.get('to', {})
+            if rel.get('type') == relation_type and to.get('entityType') == entity_type and to['id'] not in seen:
+                seen.add(to['id'])
+                result.append(rel)
+        return result
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+ECO Smart Diagnostics - Request Metrics for ThingsBoard REST calls
+
+Every HTTP exchange of ThingsBoardAPI (including retries) is recorded per
+endpoint template (entity ids replaced by {id}) and per phase:
+- calls, errors (HTTP >= 400 or connection error), bytes in/out
+- latency histogram with p50/p95/p99
+
+Phases are set with `phase()`, as context manager or decorator (also on
+coroutine functions); requests outside of a phase count as 'other'. The phase
+is a context variable, so it follows asyncio tasks and - via
+AsyncThingsBoardAPI - the worker threads that send their requests.
+
+At the end of every command the tools write a JSON report and a Prometheus
+textfile (node_exporter textfile collector format):
+
+    logs/metrics_<tool>_<command>_<timestamp>.json
+    logs/<tool>.prom
+
+Configuration (.env):
+    TB_METRICS_DIR   Output directory (default: logs/, empty = no reports)
+"""
+
+import os
+import re
+import json
+import time
+import bisect
+import inspect
+import functools
+import threading
+import contextvars
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+TB_METRICS_DIR = os.getenv('TB_METRICS_DIR', str(Path(__file__).parent / 'logs'))
+
+# Phases reported even if no request was made in them
+PHASES = ['scan', 'attributes', 'telemetry_read', 'telemetry_write', 'other']
+
+# Latency histogram: 1ms * 1.1^i up to ~5 min (<10% quantile error)
+LATENCY_BUCKETS = [0.001 * 1.1 ** i for i in range(133)]
+
+QUANTILES = [0.5, 0.95, 0.99]
+
+UUID_RE = re.compile(r'[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}')
+
+_current_phase = contextvars.ContextVar('tb_phase', default='other')
+
+
+def endpoint_template(endpoint: str) -> str:
+    """'/api/device/<uuid>' -> '/api/device/{id}'"""
+    return UUID_RE.sub('{id}', endpoint)
+
+
+class phase:
+    """Attribute requests to a phase, as `with phase('scan'):` or `@phase('scan')`"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._tokens = []
+
+    def __enter__(self):
+        self._tokens.append(_current_phase.set(self.name))
+        return self
+
+    def __exit__(self, *exc):
+        _current_phase.reset(self._tokens.pop())
+        return False
+
+    def __call__(self, func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                token = _current_phase.set(self.name)
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    _current_phase.reset(token)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            token = _current_phase.set(self.name)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _current_phase.reset(token)
+        return wrapper
+
+
+def current_phase() -> str:
+    return _current_phase.get()
+
+
+class Stats:
+    """Counters and latency histogram of one endpoint or phase"""
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.seconds = 0.0
+        self.max_latency = 0.0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+
+    def add(self, latency: float, error: bool, bytes_in: int, bytes_out: int):
+        self.calls += 1
+        self.errors += error
+        self.bytes_in += bytes_in
+        self.bytes_out += bytes_out
+        self.seconds += latency
+        self.max_latency = max(self.max_latency, latency)
+        self.buckets[bisect.bisect_left(LATENCY_BUCKETS, latency)] += 1
+
+    def quantile(self, q: float) -> float:
+        """Latency quantile in seconds (upper bound of the histogram bucket)"""
+        if not self.calls:
+            return 0.0
+        rank = q * self.calls
+        seen = 0
+        for i, count in enumerate(self.buckets):
+            seen += count
+            if seen >= rank:
+                upper = LATENCY_BUCKETS[i] if i < len(LATENCY_BUCKETS) else self.max_latency
+                return min(upper, self.max_latency)
+        return self.max_latency
+
+    def to_dict(self) -> dict:
+        return {
+            'calls': self.calls,
+            'errors': self.errors,
+            'bytes_in': self.bytes_in,
+            'bytes_out': self.bytes_out,
+            'seconds': round(self.seconds, 3),
+            'p50_ms': round(self.quantile(0.5) * 1000, 1),
+            'p95_ms': round(self.quantile(0.95) * 1000, 1),
+            'p99_ms': round(self.quantile(0.99) * 1000, 1),
+            'max_ms': round(self.max_latency * 1000, 1),
+        }
+
+
+class RequestMetrics:
+    """Thread-safe per-endpoint and per-phase request metrics"""
+
+    def __init__(self):
+        self.started = time.time()
+        self.endpoints = {}  # (method, template) -> Stats
+        self.phases = {name: Stats() for name in PHASES}
+        self.lock = threading.Lock()
+
+    def record(self, method: str, endpoint: str, latency: float, error: bool = False,
+               bytes_in: int = 0, bytes_out: int = 0):
+        key = (method, endpoint_template(endpoint))
+        phase_name = current_phase()
+        with self.lock:
+            stats = self.endpoints.get(key)
+            if stats is None:
+                stats = self.endpoints[key] = Stats()
+            stats.add(latency, error, bytes_in, bytes_out)
+            self.phases.setdefault(phase_name, Stats()).add(latency, error, bytes_in, bytes_out)
+
+    def add_bytes_in(self, method: str, endpoint: str, bytes_in: int):
+        """Add response bytes read after the request was recorded (streamed responses)"""
+        key = (method, endpoint_template(endpoint))
+        phase_name = current_phase()
+        with self.lock:
+            if key in self.endpoints:
+                self.endpoints[key].bytes_in += bytes_in
+            self.phases.setdefault(phase_name, Stats()).bytes_in += bytes_in
+
+    def report(self, tool: str, command: str, extra: dict = None) -> dict:
+        """Run report as plain dict (endpoints sorted by total request time)"""
+        with self.lock:
+            endpoints = [
+                {'method': method, 'endpoint': template, **stats.to_dict()}
+                for (method, template), stats in self.endpoints.items()
+            ]
+            phases = {name: stats.to_dict() for name, stats in self.phases.items()}
+        endpoints.sort(key=lambda e: e['seconds'], reverse=True)
+        finished = time.time()
+        return {
+            'tool': tool,
+            'command': command,
+            'started_at': datetime.fromtimestamp(self.started).isoformat(),
+            'finished_at': datetime.fromtimestamp(finished).isoformat(),
+            'duration_s': round(finished - self.started, 3),
+            'endpoints': endpoints,
+            'phases': phases,
+            **(extra or {}),
+        }
+
+    def prometheus(self, tool: str, command: str, extra: dict = None) -> str:
+        """Prometheus text exposition format"""
+        labels = f'tool="{tool}",command="{command}"'
+        lines = []
+
+        def family(name: str, kind: str, help_text: str):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        with self.lock:
+            endpoints = sorted(self.endpoints.items())
+            phases = sorted(self.phases.items())
+
+        for prefix, items, label in (('tb_request', endpoints, 'endpoint'), ('tb_phase', phases, 'phase')):
+            def series(key) -> str:
+                if label == 'endpoint':
+                    return f'{labels},method="{key[0]}",endpoint="{key[1]}"'
+                return f'{labels},phase="{key}"'
+
+            for suffix, attr, help_text in (
+                ('requests_total', 'calls', 'HTTP requests sent (including retries)'),
+                ('errors_total', 'errors', 'HTTP requests that failed (HTTP >= 400 or connection error)'),
+                ('received_bytes_total', 'bytes_in', 'Response body bytes received'),
+                ('sent_bytes_total', 'bytes_out', 'Request body bytes sent'),
+            ):
+                family(f"{prefix}_{suffix}", 'counter', help_text)
+                for key, stats in items:
+                    lines.append(f"{prefix}_{suffix}{{{series(key)}}} {getattr(stats, attr)}")
+
+            family(f"{prefix}_duration_seconds", 'summary', 'Request latency')
+            for key, stats in items:
+                for q in QUANTILES:
+                    lines.append(f'{prefix}_duration_seconds{{{series(key)},quantile="{q}"}} {stats.quantile(q):.6f}')
+                lines.append(f"{prefix}_duration_seconds_sum{{{series(key)}}} {stats.seconds:.6f}")
+                lines.append(f"{prefix}_duration_seconds_count{{{series(key)}}} {stats.calls}")
+
+        family('tb_run_duration_seconds', 'gauge', 'Duration of the command')
+        lines.append(f"tb_run_duration_seconds{{{labels}}} {time.time() - self.started:.3f}")
+        family('tb_run_finished_timestamp_seconds', 'gauge', 'Unix time the command finished')
+        lines.append(f"tb_run_finished_timestamp_seconds{{{labels}}} {time.time():.0f}")
+
+        for section, values in (extra or {}).items():
+            for name, value in values.items():
+                if isinstance(value, (int, float)):
+                    metric = f"tb_{section}_{name}"
+                    family(metric, 'gauge', f"{section} {name}")
+                    lines.append(f"{metric}{{{labels}}} {value}")
+
+        return "\n".join(lines) + "\n"
+
+    def write_report(self, tool: str, command: str, extra: dict = None,
+                     directory: str = TB_METRICS_DIR) -> Optional[Path]:
+        """Write JSON report and Prometheus textfile, returns the JSON path"""
+        if not directory:
+            return None
+        out_dir = Path(directory)
+        out_dir.mkdir(parents=True, exist_ok=True)
+
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        json_path = out_dir / f"metrics_{tool}_{command}_{timestamp}.json"
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump(self.report(tool, command, extra), f, indent=2, ensure_ascii=False)
+
+        # Write + rename, so the textfile collector never reads a partial file
+        prom_path = out_dir / f"{tool}.prom"
+        tmp_path = prom_path.with_suffix('.prom.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.prometheus(tool, command, extra))
+        os.replace(tmp_path, prom_path)
+
+        return json_path
+
+    def summary(self, limit: int = 5) -> list:
+        """Lines with the phases and the endpoints that took the most request time"""
+        report = self.report('', '')
+        lines = [f"   {'Phase':<16} {'Calls':>8} {'Errors':>7} {'Time':>9} {'p95':>9}"]
+        for name, stats in report['phases'].items():
+            if stats['calls']:
+                lines.append(f"   {name:<16} {stats['calls']:>8} {stats['errors']:>7} "
+                             f"{stats['seconds']:>8.1f}s {stats['p95_ms']:>7.0f}ms")
+        lines.append(f"   {'Top endpoints':<70} {'Calls':>8} {'Time':>9} {'p95':>9}")
+        for e in report['endpoints'][:limit]:
+            name = f"{e['method']} {e['endpoint']}"
+            lines.append(f"   {name[:70]:<70} {e['calls']:>8} {e['seconds']:>8.1f}s {e['p95_ms']:>7.0f}ms")
+        return lines
+
+
+_metrics = None
+_metrics_lock = threading.Lock()
+
+
+def get_metrics() -> RequestMetrics:
+    """Get the process-wide shared request metrics (created on first use)"""
+    global _metrics
+    with _metrics_lock:
+        if _metrics is None:
+            _metrics = RequestMetrics()
+        return _metrics
@@ -12,35 +12,54 @@ Funktionen:
 
 Usage:
     python tb_migration.py scan                              # Scan alle Projects/Measurements
+    python tb_migration.py scan --full                       # Scan ohne gespeichertes Inventar (inventory.db)
     python tb_migration.py migrate <project_name>            # Dry-Run Migration
     python tb_migration.py migrate <project_name> --execute  # Echte Migration
     python tb_migration.py migrate-all                       # Dry-Run ALLE Projects
     python tb_migration.py migrate-all --execute             # Echte Migration ALLER Projects
+    python tb_migration.py migrate-all --execute --stream    # Migration startet schon während des Scans
     python tb_migration.py resume <project_name>             # Unterbrochene Migration fortsetzen
     python tb_migration.py status <project_name>             # Migrations-Status anzeigen
     python tb_migration.py rollback <project_name>           # Rollback aus Backup
     python tb_migration.py backups                           # Alle Backups auflisten
+    python tb_migration.py sync [<project_name>]             # Dry-Run: neue Punkte alter Keys (seit Migration)
+    python tb_migration.py sync [<project_name>] --execute   # Neue Punkte auf die neuen Keys kopieren
+    python tb_migration.py sync --execute --follow           # ... alle --interval Sekunden wiederholen
+
+Options:
+    --concurrency N    Async engine with N parallel requests (scan, migrate, migrate-all, resume)
+    --compression M    reads (default, responses only), gzip (also request bodies) or off - overrides TB_COMPRESSION
+    --interval S       Seconds between sync runs with --follow - overrides TB_SYNC_INTERVAL
 """
 
 import os
 import sys
 import json
+import time
+import sqlite3
 import logging
+import functools
+import contextvars
 import logging.handlers
-import requests
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from datetime import datetime
 from pathlib import Path
-from typing import Optional
-from dotenv import load_dotenv
-
-# Load .env from parent directory
-load_dotenv(Path(__file__).parent.parent / '.env')
+from typing import Iterator, Optional
+
+from tb_client import ThingsBoardAPI, ThingsBoardError, TB_BASE_URL, write_run_report
+from tb_inventory import (
+    MEASUREMENT_VR, OWNS, RelationGraph, fetch_relation_tree, fetch_relations_from, fetch_relations_to,
+    find_assets, get_assets_by_ids, load_inventory, owners,
+)
+from tb_metrics import phase
+from tb_series import Series
+from tb_store import InventoryStore, TB_INVENTORY_DB
+from tb_sync import TB_SYNC_INTERVAL, WatermarkStore
+from tb_telemetry import TB_TELEMETRY_KEYS_PER_READ, last_timestamps, now_ms, read_telemetry, read_telemetry_keys
+from tb_transforms import device_type, get_key_map
 
 # Configuration
-TB_BASE_URL = os.getenv('TB_BASE_URL', '').rstrip('/')
-TB_USERNAME = os.getenv('TB_USERNAME')
-TB_PASSWORD = os.getenv('TB_PASSWORD')
-
 BACKUP_DIR = Path(__file__).parent / 'backups'
 MIGRATION_LOG = Path(__file__).parent / 'migration_log.json'
 LOG_DIR = Path(__file__).parent / 'logs'
@@ -58,6 +77,10 @@ def setup_logging():
     logger = logging.getLogger('migration')
     logger.setLevel(logging.DEBUG)
 
+    # Already set up (module imported twice, e.g. as __main__ and tb_migration)
+    if any(isinstance(h, logging.handlers.RotatingFileHandler) for h in logger.handlers):
+        return logger
+
     # Rotating file handler (1GB max, 2 backups = max 3GB total)
     file_handler = logging.handlers.RotatingFileHandler(
         LOG_FILE,
@@ -91,135 +114,46 @@ EXCLUDE_MEASUREMENTS = [
 EXCLUDE_PROJECTS = []
 
 # =============================================================================
-# Telemetry Key Mapping (same as normalize_data.tbel)
+# Telemetry Key Mapping (same as normalize_data.tbel) - see tb_transforms.py
 # =============================================================================
-# Base keys that are always mapped
-TELEMETRY_KEY_MAP_BASE = {
-    # Temperature keys
-    'CHC_S_TemperatureFlow': 'T_flow_C',
-    'CHC_S_TemperatureReturn': 'T_return_C',
-    'CHC_S_TemperatureDiff': 'dT_K',
-    # Flow keys
-    'CHC_S_VolumeFlow': 'Vdot_m3h',  # Needs conversion: ÷1000 (l/h → m³/h)
-    'CHC_S_Velocity': 'v_ms',
-    # Volume
-    'CHC_M_Volume': 'V_m3',
-}
-
-# Keys specific to heating installations
-TELEMETRY_KEY_MAP_HEATING = {
-    'CHC_S_Power_Heating': 'P_th_kW',
-    'CHC_M_Energy_Heating': 'E_th_kWh',
-}
-
-# Keys specific to cooling installations
-TELEMETRY_KEY_MAP_COOLING = {
-    'CHC_S_Power_Cooling': 'P_th_kW',
-    'CHC_M_Energy_Cooling': 'E_th_kWh',
-}
-
-
-def get_telemetry_key_map(installation_type: str) -> dict:
-    """Get the telemetry key map based on installation type"""
-    key_map = TELEMETRY_KEY_MAP_BASE.copy()
-    if installation_type == 'cooling':
-        key_map.update(TELEMETRY_KEY_MAP_COOLING)
-    else:
-        # Default to heating
-        key_map.update(TELEMETRY_KEY_MAP_HEATING)
-    return key_map
-
-# Keys that need unit conversion (values come as strings from API!)
-TELEMETRY_CONVERSIONS = {
-    'CHC_S_VolumeFlow': lambda x: float(x) / 1000,  # l/h → m³/h
-}
-
-# Temperature sensor key (mapped based on device name suffix)
-TEMP_SENSOR_KEY = 'temperature'
-
-
-class ThingsBoardAPI:
-    """ThingsBoard API Client"""
-
-    def __init__(self):
-        self.base_url = TB_BASE_URL
-        self.token = None
-        self.refresh_token = None
-
-    def login(self) -> bool:
-        """Authenticate and get JWT token"""
-        url = f"{self.base_url}/api/auth/login"
-        payload = {"username": TB_USERNAME, "password": TB_PASSWORD}
-
-        try:
-            response = requests.post(url, json=payload)
-            response.raise_for_status()
-            data = response.json()
-            self.token = data.get('token')
-            self.refresh_token = data.get('refreshToken')
-            log.info(f"Login successful for {TB_USERNAME}")
-            return True
-        except Exception as e:
-            log.error(f"Login failed: {e}")
-            print(f"❌ Login failed: {e}")
-            return False
+def get_telemetry_key_map(installation_type: str, device_type: str = None) -> dict:
+    """{old key: Transform} for the keys of a measurement, or of a VR device of this type"""
+    return get_key_map(installation_type, device_type)
+
+
+# Measurement attribute migrations (old key → new key)
+ATTRIBUTE_MIGRATIONS = [
+    ('installationTypeOptions', 'systemType'),
+    ('deltaT', 'designDeltaT'),
+    ('deltaTAnalysisFloorVolume', 'flowOnThreshold'),
+    ('dimension', 'pipeDimension'),
+    ('nominalFlow', 'designFlow'),
+    ('sensorLabel1', 'auxSensor1'),
+    ('sensorLabel2', 'auxSensor2'),
+]
 
-    def _headers(self) -> dict:
-        """Get authorization headers"""
-        return {
-            "Authorization": f"Bearer {self.token}",
-            "Content-Type": "application/json"
-        }
+TELEMETRY_WRITE_BATCH_SIZE = 1000  # Points per POST (request size limits)
 
-    def get(self, endpoint: str, params: dict = None) -> Optional[dict]:
-        """GET request"""
-        url = f"{self.base_url}{endpoint}"
-        try:
-            response = requests.get(url, headers=self._headers(), params=params)
-            response.raise_for_status()
-            return response.json()
-        except Exception as e:
-            log.error(f"GET {endpoint} failed: {e}")
-            print(f"❌ GET {endpoint} failed: {e}")
-            return None
+# Device ids per /api/devices?deviceIds=... lookup (keeps the URL well below 8 KB)
+DEVICE_LOOKUP_BATCH_SIZE = 100
 
-    def post(self, endpoint: str, data: dict = None) -> Optional[dict]:
-        """POST request"""
-        url = f"{self.base_url}{endpoint}"
-        try:
-            response = requests.post(url, headers=self._headers(), json=data)
-            response.raise_for_status()
-            # Handle empty responses (e.g., telemetry upload returns 200 with no body)
-            if response.status_code == 200 and not response.text:
-                return {}
-            return response.json()
-        except requests.exceptions.JSONDecodeError:
-            # Successful but no JSON response
-            return {}
-        except Exception as e:
-            log.error(f"POST {endpoint} failed: {e}")
-            print(f"❌ POST {endpoint} failed: {e}")
-            return None
+# Worker threads for scan (relation lookups), 1 = sequential.
+# Keep <= TB_POOL_SIZE, otherwise pooled connections are discarded under load
+SCAN_WORKERS = int(os.getenv('TB_SCAN_WORKERS', '8'))
 
-    def delete(self, endpoint: str) -> bool:
-        """DELETE request"""
-        url = f"{self.base_url}{endpoint}"
-        try:
-            response = requests.delete(url, headers=self._headers())
-            response.raise_for_status()
-            return True
-        except Exception as e:
-            print(f"❌ DELETE {endpoint} failed: {e}")
-            return False
+# Projects resolved ahead of the migration in `migrate-all --stream`
+PIPELINE_DEPTH = int(os.getenv('TB_PIPELINE_DEPTH', '16'))
 
 
 class MigrationTool:
     """Migration Tool for ECO Smart Diagnostics"""
 
-    def __init__(self):
+    def __init__(self, scan_workers: int = SCAN_WORKERS):
         self.api = ThingsBoardAPI()
+        self.scan_workers = max(1, scan_workers)
         self.projects = []
         self.measurements = []
+        self._store = None  # InventoryStore, False if disabled or not usable
 
     def connect(self) -> bool:
         """Connect to ThingsBoard"""
@@ -233,41 +167,27 @@ class MigrationTool:
     # SCAN - Query all Projects and Measurements
     # =========================================================================
 
-    def scan(self):
-        """Scan all Projects and Measurements, detect VR devices"""
+    @phase('scan')
+    def scan(self, full: bool = False):
+        """Scan all Projects and Measurements, detect VR devices
+
+        Relations and VR devices of assets unchanged since the last scan are
+        taken from the inventory store (tb_store.py), unless full is set.
+        """
         print("\n📊 Scanning Projects and Measurements...\n")
 
-        # Get all customers first
-        customers = self._get_all_customers()
-        if not customers:
-            print("❌ No customers found")
+        # All Projects and Measurements of the tenant in a few queries (tb_inventory.py)
+        inventory = load_inventory(self.api)
+        if not inventory:
+            print("❌ No projects or measurements found")
             return
 
-        all_projects = []
-        all_measurements = []
-        total_customers = len(customers)
-
-        for i, customer in enumerate(customers, 1):
-            customer_id = customer['id']['id']
-            customer_name = customer['name']
-
-            # Progress bar for customers
-            self._print_progress(i, total_customers, f"Customer: {customer_name[:30]:<30}")
-
-            # Get projects for this customer
-            projects = self._get_assets_by_type(customer_id, 'Project')
-            measurements = self._get_assets_by_type(customer_id, 'Measurement')
-
-            for j, project in enumerate(projects, 1):
-                project['customerName'] = customer_name
-                project['vr_devices'] = self._find_vr_devices(project)
-                project['measurements'] = self._get_project_measurements(project['id']['id'], measurements)
-                all_projects.append(project)
-
-            for measurement in measurements:
-                measurement['customerName'] = customer_name
-                measurement['vr_devices'] = self._find_vr_devices(measurement)
-                all_measurements.append(measurement)
+        all_projects = [a for a in inventory if a['type'] == 'Project']
+        all_measurements = [a for a in inventory if a['type'] == 'Measurement']
+        total_customers = len({a['customerName'] for a in inventory})
+        graph, devices, changed = self._restore_scan(inventory, full)
+        graph, devices = self._link_assets(all_projects, all_measurements, graph, devices, changed)
+        self._save_scan(inventory, graph, devices)
 
         # Clear progress line
         print("\r" + " " * 80 + "\r", end="")
@@ -279,6 +199,231 @@ class MigrationTool:
         # Print summary
         self._print_scan_summary()
 
+    def _inventory_store(self) -> Optional[InventoryStore]:
+        """The inventory store, opened on first use (None if disabled or not usable)"""
+        if self._store is None:
+            self._store = False
+            if TB_INVENTORY_DB:
+                try:
+                    self._store = InventoryStore(TB_INVENTORY_DB)
+                except sqlite3.Error as e:
+                    log.warning(f"Inventory store {TB_INVENTORY_DB} not usable: {e}")
+        return self._store or None
+
+    def _restore_scan(self, inventory: list, full: bool = False) -> tuple:
+        """(graph, devices, changed ids) of the last scan for the unchanged assets
+
+        Relations from new or changed assets, and from the projects that owned
+        them, are left out, so they are fetched again. Without a fresh stored
+        scan (or with full) everything is fetched: empty graph, no devices.
+
+        A relation added to an unchanged asset (e.g. a new 'Measurement VR'
+        device) is not seen this way, so the write paths (migrate --execute,
+        migrate-all --execute, resume, sync) scan with full; the stored scan
+        is for dry runs and listings.
+        """
+        store = self._inventory_store()
+        if not store or full or not store.is_fresh(TB_BASE_URL):
+            return RelationGraph(), {}, set()
+
+        new, changed = store.changed_ids(inventory)
+        stale = new | changed
+        graph = store.relation_graph(exclude=stale | store.owners_of(stale))
+        print(f"♻️  Inventory from {datetime.fromtimestamp(store.last_scan()):%Y-%m-%d %H:%M}: "
+              f"{len(inventory) - len(stale)} assets unchanged, {len(new)} new, {len(changed)} changed")
+        log.info(f"Inventory store: {len(stale)} of {len(inventory)} assets new or changed")
+        return graph, store.devices(), stale
+
+    def _save_scan(self, inventory: list, graph: RelationGraph, devices: dict):
+        """Store the scan for the next one"""
+        store = self._inventory_store()
+        if store:
+            try:
+                store.save(TB_BASE_URL, inventory, graph, devices)
+            except sqlite3.Error as e:
+                log.warning(f"Inventory store {TB_INVENTORY_DB} not saved: {e}")
+
+    def _link_assets(self, projects: list, measurements: list, graph: RelationGraph = None,
+                     devices: dict = None, changed: set = frozenset()) -> tuple:
+        """Set 'vr_devices' on all assets and 'measurements' on projects, returns (graph, devices)
+
+        The Owns / 'Measurement VR' tree below each project is loaded with one
+        relation query into a RelationGraph (tb_inventory.py), on a bounded
+        worker pool; assets outside of all trees get one relation lookup each.
+        The VR devices of all assets are resolved in bulk at the end.
+
+        Projects and devices already in the given graph / devices (restored
+        from the inventory store) are not fetched again; the current owners
+        of changed measurements are looked up, as they may have moved.
+        """
+        assets = projects + measurements
+        graph = RelationGraph() if graph is None else graph
+        devices = dict(devices or {})
+
+        with ThreadPoolExecutor(max_workers=self.scan_workers, thread_name_prefix='tb-scan') as pool:
+            stale_owners = set()
+            self._run_scan_jobs(pool, [
+                (lambda relations: stale_owners.update(owners(relations)), fetch_relations_to, self.api, m['id']['id'])
+                for m in measurements if m['id']['id'] in changed
+            ])
+            graph.discard(stale_owners)
+
+            self._run_scan_jobs(pool, [
+                (functools.partial(graph.add_tree, p['id']['id']), fetch_relation_tree, self.api, p['id']['id'])
+                for p in projects if not graph.is_loaded(p['id']['id'])
+            ])
+            self._run_scan_jobs(pool, [
+                (functools.partial(graph.add_from, a['id']['id']), fetch_relations_from, self.api, a['id']['id'])
+                for a in assets if not graph.is_loaded(a['id']['id'])
+            ])
+
+            device_ids = list(dict.fromkeys(
+                rel['to']['id'] for a in assets for rel in graph.targets(a['id']['id'], MEASUREMENT_VR, 'DEVICE')
+                if rel['to']['id'] not in devices
+            ))
+            for future in [
+                pool.submit(contextvars.copy_context().run, self._get_devices, device_ids[i:i + DEVICE_LOOKUP_BATCH_SIZE])
+                for i in range(0, len(device_ids), DEVICE_LOOKUP_BATCH_SIZE)
+            ]:
+                devices.update(future.result())
+
+        self._apply_relation_graph(projects, measurements, graph, devices)
+        return graph, devices
+
+    def scan_projects(self, full: bool = False) -> Iterator[dict]:
+        """Scan, yielding each project as soon as its measurements and VR devices are resolved
+
+        Projects come in scan order. The relation trees and VR devices of the
+        next PIPELINE_DEPTH projects are fetched on the scan pool (a bounded
+        queue of pending lookups) while the caller works on the current one.
+        self.projects grows with the yielded projects; the inventory store is
+        updated once all projects were consumed. With full, no relations are
+        taken from the inventory store (see _restore_scan).
+        """
+        print("\n📊 Scanning Projects and Measurements (streaming)...\n")
+
+        with phase('scan'):
+            inventory = load_inventory(self.api)
+            graph, devices, changed = self._restore_scan(inventory, full)
+        if not inventory:
+            print("❌ No projects or measurements found")
+            return
+
+        projects = [a for a in inventory if a['type'] == 'Project']
+        self.measurements = [a for a in inventory if a['type'] == 'Measurement']
+        self.projects = []
+        measurements_by_id = {m['id']['id']: m for m in self.measurements}
+        position = {m_id: i for i, m_id in enumerate(measurements_by_id)}
+
+        with ThreadPoolExecutor(max_workers=self.scan_workers, thread_name_prefix='tb-scan') as pool:
+            with phase('scan'):
+                stale_owners = set()
+                self._run_scan_jobs(pool, [
+                    (lambda relations: stale_owners.update(owners(relations)), fetch_relations_to, self.api, m['id']['id'])
+                    for m in self.measurements if m['id']['id'] in changed
+                ])
+                graph.discard(stale_owners)
+
+            upcoming = iter(projects)
+            pending = deque()  # (project, future of _fetch_project_relations or None if restored)
+
+            def submit_next():
+                project = next(upcoming, None)
+                if project is not None:
+                    future = None
+                    if not graph.is_loaded(project['id']['id']):
+                        future = pool.submit(contextvars.copy_context().run,
+                                             self._fetch_project_relations, project['id']['id'], devices)
+                    pending.append((project, future))
+
+            for _ in range(max(1, PIPELINE_DEPTH)):
+                submit_next()
+
+            while pending:
+                project, future = pending.popleft()
+                submit_next()
+                self._resolve_project(project, future.result() if future else None, graph, devices,
+                                      measurements_by_id, position)
+                self.projects.append(project)
+                yield project
+
+        log.info(f"Streaming scan: {len(self.projects)} projects, {len(self.measurements)} measurements")
+        self._save_scan(inventory, graph, devices)
+
+    @phase('scan')
+    def _fetch_project_relations(self, project_id: str, known_devices: dict) -> Optional[tuple]:
+        """(relation tree, {device_id: device} not yet known) of a project, None if the tree query failed"""
+        relations = fetch_relation_tree(self.api, project_id)
+        if relations is None:
+            return None
+        device_ids = list(dict.fromkeys(
+            rel['to']['id'] for rel in relations
+            if rel.get('type') == MEASUREMENT_VR and rel['to'].get('entityType') == 'DEVICE'
+            and rel['to']['id'] not in known_devices
+        ))
+        return relations, self._get_devices(device_ids)
+
+    @phase('scan')
+    def _resolve_project(self, project: dict, fetched: Optional[tuple], graph: RelationGraph, devices: dict,
+                         measurements_by_id: dict, position: dict):
+        """Add a project's fetched relations and devices, set its 'measurements' and 'vr_devices'"""
+        project_id = project['id']['id']
+        if fetched:
+            relations, found = fetched
+            graph.add_tree(project_id, relations)
+            devices.update(found)
+        if not graph.is_loaded(project_id):
+            graph.add_from(project_id, fetch_relations_from(self.api, project_id))
+
+        owned = {rel['to']['id'] for rel in graph.targets(project_id, OWNS, 'ASSET')}
+        measurements = [measurements_by_id[m_id] for m_id in sorted(owned & measurements_by_id.keys(), key=position.get)]
+        for m in measurements:
+            if not graph.is_loaded(m['id']['id']):
+                graph.add_from(m['id']['id'], fetch_relations_from(self.api, m['id']['id']))
+
+        unknown = list(dict.fromkeys(
+            rel['to']['id'] for a in [project] + measurements
+            for rel in graph.targets(a['id']['id'], MEASUREMENT_VR, 'DEVICE') if rel['to']['id'] not in devices
+        ))
+        if unknown:
+            devices.update(self._get_devices(unknown))
+        self._apply_relation_graph([project], measurements, graph, devices)
+
+    def _run_scan_jobs(self, pool: ThreadPoolExecutor, jobs: list):
+        """Run (apply, func, *args) jobs on the pool, apply each result in this thread"""
+        futures = {}  # future -> apply result
+        for apply, func, *args in jobs:
+            # Workers run in a copy of the caller's context (metrics phase)
+            futures[pool.submit(contextvars.copy_context().run, func, *args)] = apply
+
+        total = len(futures)
+        done = 0
+        try:
+            while futures:
+                finished, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    futures.pop(future)(future.result())
+                    done += 1
+                self._print_progress(done, total, "Relations")
+        except BaseException:
+            for future in futures:
+                future.cancel()
+            raise
+
+    def _apply_relation_graph(self, projects: list, measurements: list, graph: RelationGraph, devices: dict):
+        """Link projects to their measurements and assets to their VR devices (dict lookups only)"""
+        measurements_by_id = {m['id']['id']: m for m in measurements}
+        position = {m_id: i for i, m_id in enumerate(measurements_by_id)}
+
+        for project in projects:
+            owned = {rel['to']['id'] for rel in graph.targets(project['id']['id'], OWNS, 'ASSET')}
+            project['measurements'] = [
+                measurements_by_id[m_id] for m_id in sorted(owned & measurements_by_id.keys(), key=position.get)
+            ]
+
+        for asset in projects + measurements:
+            asset['vr_devices'] = self._vr_devices(graph.targets(asset['id']['id'], MEASUREMENT_VR, 'DEVICE'), devices)
+
     def _print_progress(self, current: int, total: int, label: str = ""):
         """Print a progress bar"""
         bar_length = 30
@@ -288,99 +433,30 @@ class MigrationTool:
         percent = int(progress * 100)
         print(f"\r[{bar}] {percent:3d}% ({current}/{total}) {label}", end="", flush=True)
 
-    def _get_all_customers(self) -> list:
-        """Get all customers"""
-        customers = []
-        page = 0
-        page_size = 100
-
-        while True:
-            result = self.api.get(f"/api/customers", params={
-                "pageSize": page_size,
-                "page": page
-            })
-            if not result or not result.get('data'):
-                break
-
-            customers.extend(result['data'])
-
-            if not result.get('hasNext', False):
-                break
-            page += 1
-
-        return customers
-
-    def _get_assets_by_type(self, customer_id: str, asset_type: str) -> list:
-        """Get assets by type for a customer"""
-        assets = []
-        page = 0
-        page_size = 100
-
-        while True:
-            result = self.api.get(f"/api/customer/{customer_id}/assets", params={
-                "pageSize": page_size,
-                "page": page,
-                "type": asset_type
-            })
-            if not result or not result.get('data'):
-                break
-
-            assets.extend(result['data'])
-
-            if not result.get('hasNext', False):
-                break
-            page += 1
-
-        return assets
-
-    def _find_vr_devices(self, asset: dict) -> list:
-        """Find VR devices related to an asset via 'Measurement VR' relation type"""
-        asset_id = asset['id']['id']
-        vr_devices = []
-
-        # Get relations FROM this asset with type "Measurement VR"
-        relations = self.api.get(f"/api/relations", params={
-            "fromId": asset_id,
-            "fromType": "ASSET",
-            "relationType": "Measurement VR"
-        })
-
-        if relations:
-            for rel in relations:
-                if rel.get('to', {}).get('entityType') == 'DEVICE':
-                    device_id = rel['to']['id']
-                    device = self.api.get(f"/api/device/{device_id}")
-                    if device:
-                        vr_devices.append({
-                            'id': device_id,
-                            'name': device.get('name'),
-                            'relation_type': rel.get('type')
-                        })
-
-        return vr_devices
-
-    def _get_project_measurements(self, project_id: str, all_measurements: list) -> list:
-        """Get measurements that belong to a project"""
-        project_measurements = []
-
-        # Get relations FROM this project (Owns -> Measurement)
-        relations = self.api.get(f"/api/relations", params={
-            "fromId": project_id,
-            "fromType": "ASSET"
-        })
-
-        if relations:
-            measurement_ids = [
-                rel['to']['id'] for rel in relations
-                if rel.get('to', {}).get('entityType') == 'ASSET'
-                and rel.get('type') == 'Owns'
-            ]
-
-            for m in all_measurements:
-                if m['id']['id'] in measurement_ids:
-                    project_measurements.append(m)
-
-        return project_measurements
+    def _get_devices(self, device_ids: list) -> dict:
+        """Resolve device ids in bulk, returns {device_id: device} (unknown ids left out)"""
+        devices = {}
+        for i in range(0, len(device_ids), DEVICE_LOOKUP_BATCH_SIZE):
+            batch = device_ids[i:i + DEVICE_LOOKUP_BATCH_SIZE]
+            result = self.api.get("/api/devices", params={"deviceIds": ",".join(batch)})
+            if result is None:
+                # Multi-id lookup not available, fall back to one GET per device
+                result = [device for device in (self.api.get(f"/api/device/{d}") for d in batch) if device]
+            devices.update((device['id']['id'], device) for device in result)
+        return devices
+
+    @staticmethod
+    def _vr_devices(relations: list, devices: dict) -> list:
+        """VR device entries for the relations whose device was found"""
+        return [
+            {
+                'id': rel['to']['id'],
+                'name': devices[rel['to']['id']].get('name'),
+                'relation_type': rel.get('type')
+            }
+            for rel in relations
+            if rel['to']['id'] in devices
+        ]
 
     def _print_scan_summary(self):
         """Print scan summary"""
@@ -459,9 +535,8 @@ class MigrationTool:
         # Get measurements
         measurements = project.get('measurements', [])
         if not measurements:
-            # Re-fetch if not in cache
-            self.scan()
-            project = self._find_project_by_name(project_name)
+            # Re-fetch the project's relations, the stored inventory may be outdated
+            self._load_project(project)
             measurements = project.get('measurements', [])
 
         # Backup measurements
@@ -492,16 +567,58 @@ class MigrationTool:
 
         return True
 
-    def _find_project_by_name(self, name: str) -> Optional[dict]:
-        """Find project by name"""
+    def _find_project_by_name(self, name: str, full: bool = False) -> Optional[dict]:
+        """Find project by name
+
+        Without a scan in this run, the project is looked up directly by name
+        and only its measurements and VR devices are loaded. A full scan is
+        the fallback if the lookup query is not available (with full, without
+        relations from the inventory store).
+        """
         if not self.projects:
-            self.scan()
+            found = find_assets(self.api, 'Project', name)
+            if found is not None:
+                if not found:
+                    return None
+                if len(found) > 1:
+                    log.warning(f"{len(found)} projects named '{name}', using the one of {found[0]['customerName']}")
+                return self._load_project(found[0])
+            self.scan(full=full)
 
         for project in self.projects:
             if project['name'] == name:
                 return project
         return None
 
+    @phase('scan')
+    def _load_project(self, project: dict) -> dict:
+        """Set 'measurements' and 'vr_devices' on one project (no tenant scan)"""
+        project_id = project['id']['id']
+        graph = RelationGraph()
+        graph.add_tree(project_id, fetch_relation_tree(self.api, project_id))
+        if not graph.is_loaded(project_id):
+            graph.add_from(project_id, fetch_relations_from(self.api, project_id))
+
+        measurements = [
+            m for m in get_assets_by_ids(self.api, [rel['to']['id'] for rel in graph.targets(project_id, OWNS, 'ASSET')])
+            if m['type'] == 'Measurement'
+        ]
+        measurements.sort(key=lambda m: (m.get('customerName') or '', m.get('name') or ''))
+        for m in measurements:
+            if not graph.is_loaded(m['id']['id']):
+                graph.add_from(m['id']['id'], fetch_relations_from(self.api, m['id']['id']))
+
+        device_ids = list(dict.fromkeys(
+            rel['to']['id'] for a in [project] + measurements
+            for rel in graph.targets(a['id']['id'], MEASUREMENT_VR, 'DEVICE')
+        ))
+        self._apply_relation_graph([project], measurements, graph, self._get_devices(device_ids))
+
+        vr_count = sum(len(a['vr_devices']) for a in [project] + measurements)
+        print(f"🔎 [{project['customerName']}] {project['name']}: "
+              f"{len(measurements)} measurements, {vr_count} VR devices\n")
+        return project
+
     def _backup_entity(self, entity_id: str, entity_type: str) -> dict:
         """Backup an entity (attributes, relations)"""
         backup = {
@@ -573,7 +690,7 @@ class MigrationTool:
         print(f"\n🚀 {'[DRY RUN] ' if dry_run else ''}Migrating project: {project_name}\n")
 
         # Find project
-        project = self._find_project_by_name(project_name)
+        project = self._find_project_by_name(project_name, full=not dry_run)
         if not project:
             print(f"❌ Project '{project_name}' not found")
             return False
@@ -619,38 +736,7 @@ class MigrationTool:
         backup_data['project'] = self._migrate_project_attributes(project, dry_run)
 
         # Migrate Measurements (with backup)
-        measurements = project.get('measurements', [])
-        total_measurements = len(measurements)
-
-        for i, m in enumerate(measurements, 1):
-            m_name = m['name']
-            print(f"\n📦 [{i}/{total_measurements}] Measurement: {m_name}")
-
-            # Update state: current measurement
-            state['current_measurement'] = m_name
-            self._save_state(state_file, state)
-
-            try:
-                # Migrate attributes and telemetry, collect backup data
-                m_backup, telemetry_backup = self._migrate_measurement_with_backup(
-                    m, dry_run, state, state_file
-                )
-                backup_data['measurements'].append(m_backup)
-                if telemetry_backup:
-                    backup_data['telemetry_backup'][m_name] = telemetry_backup
-
-                # Mark measurement as completed
-                state['completed_measurements'].append(m_name)
-                state['current_measurement'] = None
-                self._save_state(state_file, state)
-
-            except Exception as e:
-                error_msg = f"Error migrating {m_name}: {str(e)}"
-                log.error(error_msg, exc_info=True)
-                print(f"   ❌ {error_msg}")
-                state['errors'].append(error_msg)
-                self._save_state(state_file, state)
-                # Continue with next measurement
+        self._migrate_measurements(project.get('measurements', []), dry_run, state, state_file, backup_data)
 
         # Save backup file
         backup_file = backup_path / 'backup.json'
@@ -676,91 +762,23 @@ class MigrationTool:
     # MIGRATE ALL - Batch migration of all projects
     # =========================================================================
 
-    def migrate_all(self, dry_run: bool = True):
-        """Migrate ALL projects (excluding configured exclusions)"""
+    def migrate_all(self, dry_run: bool = True, stream: bool = False):
+        """Migrate ALL projects (excluding configured exclusions)
+
+        With stream, projects are migrated while the scan is still running
+        (see scan_projects()), filtered one by one as they arrive.
+        """
         log.info("=" * 70)
-        log.info(f"BATCH MIGRATION STARTED - dry_run={dry_run}")
+        log.info(f"BATCH MIGRATION STARTED - dry_run={dry_run}, stream={stream}")
         log.info("=" * 70)
 
         print(f"\n{'='*70}")
         print(f"{'[DRY RUN] ' if dry_run else ''}BATCH MIGRATION - ALL PROJECTS")
         print(f"{'='*70}\n")
 
-        # First, scan to get all projects
-        self.scan()
-
-        if not self.projects:
-            print("❌ No projects found")
-            return False
-
         # Load migration log to check already completed projects
         migration_log = self._load_migration_log()
 
-        # Filter projects
-        projects_to_migrate = []
-        skipped_excluded = []
-        skipped_completed = []
-        skipped_no_vr = []
-
-        for project in self.projects:
-            project_name = project['name']
-
-            # Check exclusions
-            if project_name in EXCLUDE_PROJECTS:
-                skipped_excluded.append(project_name)
-                continue
-
-            # Check if all measurements are excluded
-            measurements = project.get('measurements', [])
-            non_excluded_measurements = [
-                m for m in measurements
-                if m['name'] not in EXCLUDE_MEASUREMENTS
-            ]
-
-            if not non_excluded_measurements:
-                skipped_excluded.append(f"{project_name} (all measurements excluded)")
-                continue
-
-            # Check if already migrated (only in execute mode)
-            if not dry_run and project_name in migration_log.get('completed_projects', []):
-                skipped_completed.append(project_name)
-                continue
-
-            # Count VR devices for info display
-            has_vr = any(m.get('vr_devices') for m in non_excluded_measurements)
-            if not has_vr:
-                skipped_no_vr.append(project_name)
-                # Note: Still migrate! Attributes need migration, telemetry keys may need renaming
-
-            projects_to_migrate.append(project)
-
-        # Print summary before starting
-        print(f"📊 Migration Summary:")
-        print(f"   Total projects scanned: {len(self.projects)}")
-        print(f"   Projects to migrate: {len(projects_to_migrate)}")
-        print(f"   Skipped (excluded): {len(skipped_excluded)}")
-        print(f"   Skipped (already done): {len(skipped_completed)}")
-        print(f"   Without VR devices (will rename keys): {len(skipped_no_vr)}")
-        print()
-
-        if skipped_excluded:
-            print(f"   ⏭️  Excluded: {', '.join(skipped_excluded)}")
-        if skipped_completed:
-            print(f"   ✅ Already done: {', '.join(skipped_completed)}")
-        if skipped_no_vr:
-            print(f"   🔄 No VR (direct copy): {', '.join(skipped_no_vr)}")
-
-        if not projects_to_migrate:
-            print("\n✅ Nothing to migrate!")
-            return True
-
-        print(f"\n📋 Projects to migrate:")
-        for i, p in enumerate(projects_to_migrate, 1):
-            vr_count = sum(len(m.get('vr_devices', [])) for m in p.get('measurements', []))
-            print(f"   {i}. {p['name']} ({len(p.get('measurements', []))} measurements, {vr_count} VR devices)")
-
-        print()
-
         # Track results
         results = {
             'started_at': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
@@ -770,59 +788,11 @@ class MigrationTool:
             'skipped_measurements': []
         }
 
-        # Migrate each project
-        total_projects = len(projects_to_migrate)
-        for i, project in enumerate(projects_to_migrate, 1):
-            project_name = project['name']
-            print(f"\n{'='*70}")
-            print(f"[{i}/{total_projects}] PROJECT: {project_name}")
-            print(f"{'='*70}")
-
-            try:
-                # Filter out excluded measurements before migration
-                original_measurements = project.get('measurements', [])
-                filtered_measurements = [
-                    m for m in original_measurements
-                    if m['name'] not in EXCLUDE_MEASUREMENTS
-                ]
-
-                # Track skipped measurements
-                for m in original_measurements:
-                    if m['name'] in EXCLUDE_MEASUREMENTS:
-                        results['skipped_measurements'].append({
-                            'project': project_name,
-                            'measurement': m['name'],
-                            'reason': 'excluded'
-                        })
-                        print(f"   ⏭️  Skipping measurement: {m['name']} (excluded)")
-
-                # Temporarily replace measurements list
-                project['measurements'] = filtered_measurements
-
-                # Run migration
-                success = self.migrate(project_name, dry_run=dry_run)
-
-                # Restore original measurements
-                project['measurements'] = original_measurements
-
-                if success:
-                    results['successful'].append(project_name)
-                    log.info(f"SUCCESS: {project_name}")
-                    if not dry_run:
-                        # Update migration log
-                        if project_name not in migration_log.get('completed_projects', []):
-                            migration_log.setdefault('completed_projects', []).append(project_name)
-                            self._save_migration_log(migration_log)
-                else:
-                    log.error(f"FAILED: {project_name} - Migration returned False")
-                    results['failed'].append({'project': project_name, 'error': 'Migration returned False'})
-
-            except Exception as e:
-                error_msg = str(e)
-                log.error(f"FAILED: {project_name} - {error_msg}", exc_info=True)
-                print(f"\n❌ ERROR migrating {project_name}: {error_msg}")
-                results['failed'].append({'project': project_name, 'error': error_msg})
-                # Continue with next project
+        if stream:
+            self._migrate_all_streaming(dry_run, migration_log, results)
+        elif not self._migrate_all_scanned(dry_run, migration_log, results):
+            # No projects found is a failure, nothing left to migrate is not
+            return bool(self.projects)
 
         # Print final summary
         results['completed_at'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -867,6 +837,233 @@ class MigrationTool:
 
         return len(results['failed']) == 0
 
+    def _migrate_all_scanned(self, dry_run: bool, migration_log: dict, results: dict) -> bool:
+        """Scan first, then migrate the projects; False if there was nothing to migrate"""
+        # First, scan to get all projects (fresh relations when writing, see _restore_scan)
+        self.scan(full=not dry_run)
+
+        if not self.projects:
+            print("❌ No projects found")
+            return False
+
+        # Filter projects
+        projects_to_migrate = []
+        skipped = {'excluded': [], 'completed': [], 'no_vr': []}
+
+        for project in self.projects:
+            reason = self._batch_skip_reason(project, dry_run, migration_log)
+            if reason:
+                skipped[reason].append(self._batch_skip_label(project, reason))
+                if reason != 'no_vr':
+                    # Note: no_vr is still migrated! Attributes need migration, telemetry keys may need renaming
+                    continue
+            projects_to_migrate.append(project)
+
+        # Print summary before starting
+        print(f"📊 Migration Summary:")
+        print(f"   Total projects scanned: {len(self.projects)}")
+        print(f"   Projects to migrate: {len(projects_to_migrate)}")
+        print(f"   Skipped (excluded): {len(skipped['excluded'])}")
+        print(f"   Skipped (already done): {len(skipped['completed'])}")
+        print(f"   Without VR devices (will rename keys): {len(skipped['no_vr'])}")
+        print()
+
+        if skipped['excluded']:
+            print(f"   ⏭️  Excluded: {', '.join(skipped['excluded'])}")
+        if skipped['completed']:
+            print(f"   ✅ Already done: {', '.join(skipped['completed'])}")
+        if skipped['no_vr']:
+            print(f"   🔄 No VR (direct copy): {', '.join(skipped['no_vr'])}")
+
+        if not projects_to_migrate:
+            print("\n✅ Nothing to migrate!")
+            return False
+
+        print(f"\n📋 Projects to migrate:")
+        for i, p in enumerate(projects_to_migrate, 1):
+            vr_count = sum(len(m.get('vr_devices', [])) for m in p.get('measurements', []))
+            print(f"   {i}. {p['name']} ({len(p.get('measurements', []))} measurements, {vr_count} VR devices)")
+
+        print()
+
+        # Migrate each project
+        total_projects = len(projects_to_migrate)
+        for i, project in enumerate(projects_to_migrate, 1):
+            print(f"\n{'='*70}")
+            print(f"[{i}/{total_projects}] PROJECT: {project['name']}")
+            print(f"{'='*70}")
+            self._migrate_batch_project(project, dry_run, migration_log, results)
+        return True
+
+    def _migrate_all_streaming(self, dry_run: bool, migration_log: dict, results: dict):
+        """Migrate each project as soon as the scan has resolved it"""
+        skipped = {'excluded': 0, 'completed': 0, 'no_vr': 0}
+        migrated = 0
+
+        for project in self.scan_projects(full=not dry_run):
+            reason = self._batch_skip_reason(project, dry_run, migration_log)
+            if reason:
+                skipped[reason] += 1
+                label = self._batch_skip_label(project, reason)
+                if reason == 'excluded':
+                    print(f"   ⏭️  Excluded: {label}")
+                    continue
+                if reason == 'completed':
+                    print(f"   ✅ Already done: {label}")
+                    continue
+
+            migrated += 1
+            print(f"\n{'='*70}")
+            print(f"[{migrated}/{len(self.projects)} scanned] PROJECT: {project['name']}")
+            print(f"{'='*70}")
+            self._migrate_batch_project(project, dry_run, migration_log, results)
+
+        print(f"\n📊 Migration Summary:")
+        print(f"   Total projects scanned: {len(self.projects)}")
+        print(f"   Projects migrated: {migrated}")
+        print(f"   Skipped (excluded): {skipped['excluded']}")
+        print(f"   Skipped (already done): {skipped['completed']}")
+        print(f"   Without VR devices (renamed keys): {skipped['no_vr']}")
+
+    @staticmethod
+    def _batch_skip_reason(project: dict, dry_run: bool, migration_log: dict) -> Optional[str]:
+        """'excluded', 'completed' or 'no_vr' (still migrated) for migrate-all, None otherwise"""
+        # Check exclusions
+        if project['name'] in EXCLUDE_PROJECTS:
+            return 'excluded'
+
+        # Check if all measurements are excluded
+        non_excluded_measurements = [
+            m for m in project.get('measurements', [])
+            if m['name'] not in EXCLUDE_MEASUREMENTS
+        ]
+        if not non_excluded_measurements:
+            return 'excluded'
+
+        # Check if already migrated (only in execute mode)
+        if not dry_run and project['name'] in migration_log.get('completed_projects', []):
+            return 'completed'
+
+        # VR devices only for info display
+        if not any(m.get('vr_devices') for m in non_excluded_measurements):
+            return 'no_vr'
+        return None
+
+    @staticmethod
+    def _batch_skip_label(project: dict, reason: str) -> str:
+        if reason == 'excluded' and project['name'] not in EXCLUDE_PROJECTS:
+            return f"{project['name']} (all measurements excluded)"
+        return project['name']
+
+    def _migrate_batch_project(self, project: dict, dry_run: bool, migration_log: dict, results: dict):
+        """Migrate one project of migrate-all, record the outcome in results and the migration log"""
+        project_name = project['name']
+        try:
+            # Filter out excluded measurements before migration
+            original_measurements = project.get('measurements', [])
+            filtered_measurements = [
+                m for m in original_measurements
+                if m['name'] not in EXCLUDE_MEASUREMENTS
+            ]
+
+            # Track skipped measurements
+            for m in original_measurements:
+                if m['name'] in EXCLUDE_MEASUREMENTS:
+                    results['skipped_measurements'].append({
+                        'project': project_name,
+                        'measurement': m['name'],
+                        'reason': 'excluded'
+                    })
+                    print(f"   ⏭️  Skipping measurement: {m['name']} (excluded)")
+
+            # Temporarily replace measurements list
+            project['measurements'] = filtered_measurements
+
+            # Run migration
+            success = self.migrate(project_name, dry_run=dry_run)
+
+            # Restore original measurements
+            project['measurements'] = original_measurements
+
+            if success:
+                results['successful'].append(project_name)
+                log.info(f"SUCCESS: {project_name}")
+                if not dry_run:
+                    # Update migration log
+                    if project_name not in migration_log.get('completed_projects', []):
+                        migration_log.setdefault('completed_projects', []).append(project_name)
+                        self._save_migration_log(migration_log)
+            else:
+                log.error(f"FAILED: {project_name} - Migration returned False")
+                results['failed'].append({'project': project_name, 'error': 'Migration returned False'})
+
+        except Exception as e:
+            error_msg = str(e)
+            log.error(f"FAILED: {project_name} - {error_msg}", exc_info=True)
+            print(f"\n❌ ERROR migrating {project_name}: {error_msg}")
+            results['failed'].append({'project': project_name, 'error': error_msg})
+            # Continue with next project
+
+    def _migrate_measurements(self, measurements: list, dry_run: bool, state: dict,
+                              state_file: Path, backup_data: dict):
+        """Migrate measurements one by one, skipping those already completed in state"""
+        total_measurements = len(measurements)
+        completed = state.get('completed_measurements', [])
+
+        for i, m in enumerate(measurements, 1):
+            m_name = m['name']
+
+            # Skip already completed (for resume)
+            if m_name in completed:
+                print(f"\n📦 [{i}/{total_measurements}] Measurement: {m_name} ⏭️  (already completed)")
+                continue
+
+            print(f"\n📦 [{i}/{total_measurements}] Measurement: {m_name}")
+
+            # Update state: current measurement
+            state['current_measurement'] = m_name
+            self._save_state(state_file, state)
+
+            try:
+                # Migrate attributes and telemetry, collect backup data
+                m_backup, telemetry_backup = self._migrate_measurement_with_backup(
+                    m, dry_run, state, state_file
+                )
+                self._complete_measurement(m_name, m_backup, telemetry_backup, state, state_file, backup_data)
+
+            except Exception as e:
+                self._fail_measurement(m_name, e, state, state_file)
+                # Continue with next measurement
+
+    def _complete_measurement(self, m_name: str, m_backup: dict, telemetry_backup: dict,
+                              state: dict, state_file: Path, backup_data: dict):
+        """Record a migrated measurement in backup data and state"""
+        backup_data['measurements'].append(m_backup)
+        if telemetry_backup:
+            backup_data['telemetry_backup'][m_name] = telemetry_backup
+
+        # Mark measurement as completed
+        state['completed_measurements'].append(m_name)
+        if state.get('current_measurement') == m_name:
+            state['current_measurement'] = None
+        self._leave_measurement(m_name, state)
+        self._save_state(state_file, state)
+
+    def _fail_measurement(self, m_name: str, error: Exception, state: dict, state_file: Path):
+        """Record a failed measurement in state"""
+        error_msg = f"Error migrating {m_name}: {str(error)}"
+        log.error(error_msg, exc_info=error)
+        print(f"   ❌ {error_msg}")
+        state['errors'].append(error_msg)
+        self._leave_measurement(m_name, state)
+        self._save_state(state_file, state)
+
+    @staticmethod
+    def _leave_measurement(m_name: str, state: dict):
+        """Drop a finished measurement from the in-flight list of the async engine"""
+        if m_name in state.get('current_measurements', []):
+            state['current_measurements'].remove(m_name)
+
     def _load_migration_log(self) -> dict:
         """Load migration log (tracks completed projects)"""
         if MIGRATION_LOG.exists():
@@ -886,11 +1083,7 @@ class MigrationTool:
         print(f"\n📦 Project: {project['name']}")
 
         # Get current attributes (this is our backup)
-        attrs = self.api.get(
-            f"/api/plugins/telemetry/ASSET/{project_id}/values/attributes/SERVER_SCOPE"
-        )
-        if not attrs:
-            attrs = []
+        attrs = self._get_attributes(project_id, 'ASSET')
 
         backup = {
             'id': project_id,
@@ -915,11 +1108,7 @@ class MigrationTool:
         m_name = measurement['name']
 
         # Get current attributes (this is our backup)
-        attrs = self.api.get(
-            f"/api/plugins/telemetry/ASSET/{m_id}/values/attributes/SERVER_SCOPE"
-        )
-        if not attrs:
-            attrs = []
+        attrs = self._get_attributes(m_id, 'ASSET')
 
         backup = {
             'id': m_id,
@@ -930,29 +1119,11 @@ class MigrationTool:
         attr_dict = {a['key']: a['value'] for a in attrs}
 
         # Attribute migrations
-        migrations = [
-            ('installationTypeOptions', 'systemType'),
-            ('deltaT', 'designDeltaT'),
-            ('deltaTAnalysisFloorVolume', 'flowOnThreshold'),
-            ('dimension', 'pipeDimension'),
-            ('nominalFlow', 'designFlow'),
-            ('sensorLabel1', 'auxSensor1'),
-            ('sensorLabel2', 'auxSensor2'),
-        ]
-
-        migrated_attrs = []
-        for old_key, new_key in migrations:
-            if old_key in attr_dict:
-                value = attr_dict[old_key]
-
-                # Special handling for sensorLabel → auxSensor (JSON)
-                if old_key.startswith('sensorLabel') and isinstance(value, str):
-                    value = {'label': value, 'location': 'custom'}
-
-                print(f"   📝 {old_key} → {new_key}: {value}")
-                migrated_attrs.append({'old': old_key, 'new': new_key, 'value': value})
-                if not dry_run:
-                    self._save_attribute(m_id, 'ASSET', new_key, value)
+        migrated_attrs = self._plan_attribute_migrations(attr_dict)
+        for attr in migrated_attrs:
+            print(f"   📝 {attr['old']} → {attr['new']}: {attr['value']}")
+            if not dry_run:
+                self._save_attribute(m_id, 'ASSET', attr['new'], attr['value'])
 
         # locationName → Entity Label (NOT name!)
         if 'locationName' in attr_dict and attr_dict['locationName']:
@@ -969,6 +1140,28 @@ class MigrationTool:
 
         return backup, telemetry_backup
 
+    def _plan_attribute_migrations(self, attr_dict: dict) -> list:
+        """List attribute migrations for a measurement: [{'old', 'new', 'value'}, ...]"""
+        migrated_attrs = []
+        for old_key, new_key in ATTRIBUTE_MIGRATIONS:
+            if old_key in attr_dict:
+                value = attr_dict[old_key]
+
+                # Special handling for sensorLabel → auxSensor (JSON)
+                if old_key.startswith('sensorLabel') and isinstance(value, str):
+                    value = {'label': value, 'location': 'custom'}
+
+                migrated_attrs.append({'old': old_key, 'new': new_key, 'value': value})
+        return migrated_attrs
+
+    @phase('attributes')
+    def _get_attributes(self, entity_id: str, entity_type: str) -> list:
+        """SERVER_SCOPE attributes of an entity ([] if there are none)"""
+        return self.api.get(
+            f"/api/plugins/telemetry/{entity_type}/{entity_id}/values/attributes/SERVER_SCOPE"
+        ) or []
+
+    @phase('attributes')
     def _save_attribute(self, entity_id: str, entity_type: str, key: str, value):
         """Save an attribute"""
         self.api.post(
@@ -976,6 +1169,7 @@ class MigrationTool:
             {key: value}
         )
 
+    @phase('attributes')
     def _set_entity_label(self, entity_id: str, entity_type: str, label: str):
         """Set entity label (NOT the name!)"""
         if entity_type == 'ASSET':
@@ -1003,17 +1197,10 @@ class MigrationTool:
         telemetry_backup = {}
 
         # Get installationType from measurement attributes to determine Power/Energy keys
-        attrs = self.api.get(
-            f"/api/plugins/telemetry/ASSET/{m_id}/values/attributes/SERVER_SCOPE"
-        )
-        installation_type = 'heating'  # Default
-        if attrs:
-            for attr in attrs:
-                if attr.get('key') == 'installationType':
-                    installation_type = attr.get('value', 'heating')
-                    break
+        attrs = self._get_attributes(m_id, 'ASSET')
+        installation_type = self._get_installation_type(attrs)
 
-        # Get the correct key map based on installation type
+        # Get the correct key map based on installation type (keys on the measurement)
         telemetry_key_map = get_telemetry_key_map(installation_type)
 
         # Initialize state tracking for this measurement
@@ -1041,13 +1228,14 @@ class MigrationTool:
                 print(f"      [{vr_idx}/{total_vr}] 🔄 {vr_name} ({device_type})")
 
                 # Get telemetry keys from VR device
-                keys = self.api.get(f"/api/plugins/telemetry/DEVICE/{vr_id}/keys/timeseries")
+                keys = self._get_telemetry_keys(vr_id, 'DEVICE')
                 if not keys:
                     print(f"         ⚠️  No telemetry keys found")
                     continue
 
-                # Filter only relevant keys based on installation type
-                relevant_keys = [k for k in keys if self._map_telemetry_key(k, device_type, telemetry_key_map)]
+                # Filter only relevant keys based on installation and device type
+                device_key_map = get_telemetry_key_map(installation_type, device_type)
+                relevant_keys = [k for k in keys if k in device_key_map]
                 if not relevant_keys:
                     print(f"         ⚠️  No relevant telemetry keys found")
                     continue
@@ -1055,13 +1243,15 @@ class MigrationTool:
                 telemetry_backup[vr_id] = {'device_name': vr_name, 'device_type': device_type, 'keys': {}}
 
                 # Read and transform telemetry for each relevant key
+                # (keys are read together, see _read_telemetry_keys)
                 total_keys = len(relevant_keys)
-                for key_idx, old_key in enumerate(relevant_keys, 1):
-                    new_key = self._map_telemetry_key(old_key, device_type, telemetry_key_map)
+                for key_idx, (old_key, telemetry) in enumerate(
+                        self._read_telemetry_keys(vr_id, 'DEVICE', relevant_keys), 1):
+                    transform = device_key_map[old_key]
+                    new_key = transform.target
 
-                    # Read telemetry data (this is our backup!)
+                    # Telemetry data read (this is our backup!)
                     print(f"         [{key_idx}/{total_keys}] Reading {old_key}...", end="", flush=True)
-                    telemetry = self._read_telemetry(vr_id, 'DEVICE', old_key)
 
                     if not telemetry:
                         print(" (empty)")
@@ -1077,9 +1267,7 @@ class MigrationTool:
                     }
 
                     # Apply conversion if needed for migration
-                    if old_key in TELEMETRY_CONVERSIONS:
-                        converter = TELEMETRY_CONVERSIONS[old_key]
-                        telemetry = [(ts, converter(val)) for ts, val in telemetry]
+                    telemetry = transform.apply(telemetry)
 
                     print(f" → {new_key}: {points} points")
 
@@ -1101,7 +1289,7 @@ class MigrationTool:
                 return telemetry_backup
 
             # Get telemetry keys from Measurement
-            keys = self.api.get(f"/api/plugins/telemetry/ASSET/{m_id}/keys/timeseries")
+            keys = self._get_telemetry_keys(m_id, 'ASSET')
             if not keys:
                 print(f"      ℹ️  No telemetry keys found on Measurement")
                 return telemetry_backup
@@ -1122,12 +1310,13 @@ class MigrationTool:
             telemetry_backup['measurement_direct'] = {'keys': {}}
 
             total_keys = len(old_keys_to_rename)
-            for key_idx, old_key in enumerate(old_keys_to_rename, 1):
-                new_key = telemetry_key_map[old_key]
+            for key_idx, (old_key, telemetry) in enumerate(
+                    self._read_telemetry_keys(m_id, 'ASSET', old_keys_to_rename), 1):
+                transform = telemetry_key_map[old_key]
+                new_key = transform.target
 
-                # Read telemetry data from Measurement
+                # Telemetry data read from Measurement
                 print(f"      [{key_idx}/{total_keys}] Reading {old_key}...", end="", flush=True)
-                telemetry = self._read_telemetry(m_id, 'ASSET', old_key)
 
                 if not telemetry:
                     print(" (empty)")
@@ -1143,9 +1332,7 @@ class MigrationTool:
                 }
 
                 # Apply conversion if needed
-                if old_key in TELEMETRY_CONVERSIONS:
-                    converter = TELEMETRY_CONVERSIONS[old_key]
-                    telemetry = [(ts, converter(val)) for ts, val in telemetry]
+                telemetry = transform.apply(telemetry)
 
                 print(f" → {new_key}: {points} points")
 
@@ -1167,110 +1354,57 @@ class MigrationTool:
 
         return telemetry_backup
 
+    def _get_installation_type(self, attrs: Optional[list]) -> str:
+        """Read installationType from SERVER_SCOPE attributes (default: heating)"""
+        for attr in attrs or []:
+            if attr.get('key') == 'installationType':
+                return attr.get('value', 'heating')
+        return 'heating'
+
     def _get_device_type(self, device_name: str) -> str:
         """Determine device type from name suffix"""
-        if device_name.endswith('_TS1'):
-            return 'TS1'
-        elif device_name.endswith('_TS2'):
-            return 'TS2'
-        elif device_name.endswith('_TS3'):
-            return 'TS3'
-        elif '_PF' in device_name or device_name.endswith('_PF1') or device_name.endswith('_PF2'):
-            return 'PFLOW'
-        elif device_name.endswith('_gw'):
-            return 'GATEWAY'
-        elif 'pflow' in device_name.lower() or 'p-flow' in device_name.lower():
-            return 'PFLOW'
-        else:
-            return 'UNKNOWN'
-
-    def _map_telemetry_key(self, old_key: str, device_type: str,
-                           telemetry_key_map: dict = None) -> Optional[str]:
-        """Map old telemetry key to new canonical name"""
-        # Temperature sensor: map 'temperature' based on device type
-        if old_key == TEMP_SENSOR_KEY:
-            if device_type == 'TS1':
-                return 'auxT1_C'
-            elif device_type == 'TS2':
-                return 'auxT2_C'
-            elif device_type == 'TS3':
-                return 'auxT3_C'
-            else:
-                return None  # Skip unmapped temperature sensors
-
-        # Use provided key map or default to heating
-        if telemetry_key_map is None:
-            telemetry_key_map = get_telemetry_key_map('heating')
-
-        # Standard key mapping
-        if old_key in telemetry_key_map:
-            return telemetry_key_map[old_key]
+        return device_type(device_name)
 
-        # Pass through already normalized keys
-        normalized_keys = ['T_flow_C', 'T_return_C', 'dT_K', 'Vdot_m3h', 'v_ms',
-                          'P_th_kW', 'E_th_kWh', 'V_m3', 'auxT1_C', 'auxT2_C', 'auxT3_C']
-        if old_key in normalized_keys:
-            return old_key
-
-        return None
+    @phase('telemetry_read')
+    def _get_telemetry_keys(self, entity_id: str, entity_type: str) -> list:
+        """Timeseries keys of an entity ([] if there are none)"""
+        return self.api.get(f"/api/plugins/telemetry/{entity_type}/{entity_id}/keys/timeseries") or []
 
+    @phase('telemetry_read')
     def _read_telemetry(self, entity_id: str, entity_type: str, key: str,
-                        start_ts: int = None, end_ts: int = None) -> list:
-        """Read telemetry data from entity, returns list of (timestamp, value) tuples"""
-        # Default: read all data (from epoch to now)
-        if start_ts is None:
-            start_ts = 0
-        if end_ts is None:
-            end_ts = int(datetime.now().timestamp() * 1000)
-
-        all_data = []
-        limit = 10000  # ThingsBoard page size limit
-
-        while True:
-            result = self.api.get(
-                f"/api/plugins/telemetry/{entity_type}/{entity_id}/values/timeseries",
-                params={
-                    'keys': key,
-                    'startTs': start_ts,
-                    'endTs': end_ts,
-                    'limit': limit,
-                    'orderBy': 'ASC'
-                }
-            )
-
-            if not result or key not in result:
-                break
-
-            data = result[key]
-            if not data:
-                break
-
-            # Convert to (timestamp, value) tuples - values come as strings!
-            for point in data:
-                val = point['value']
-                # Try to convert to number if possible
-                try:
-                    val = float(val)
-                except (ValueError, TypeError):
-                    pass  # Keep as string if not numeric
-                all_data.append((point['ts'], val))
-
-            # Check if we got all data (less than limit means no more)
-            if len(data) < limit:
-                break
-
-            # Update start_ts for next page (exclusive of last timestamp)
-            start_ts = data[-1]['ts'] + 1
-
-        return all_data
-
+                        start_ts: int = None, end_ts: int = None) -> Series:
+        """Read telemetry data from entity, returns a Series of (timestamp, value) points
+
+        Longer series are read in monthly windows concurrently (tb_telemetry.py).
+        """
+        return read_telemetry(self.api, entity_type, entity_id, key, start_ts, end_ts)
+
+    @phase('telemetry_read')
+    def _read_telemetry_batch(self, entity_id: str, entity_type: str, keys: list,
+                              start_ts: int = None, end_ts: int = None) -> dict:
+        """Read several keys of an entity together, returns {key: Series}"""
+        return read_telemetry_keys(self.api, entity_type, entity_id, keys, start_ts, end_ts)
+
+    def _read_telemetry_keys(self, entity_id: str, entity_type: str, keys: list) -> Iterator[tuple]:
+        """(key, points) for each key in order, TB_TELEMETRY_KEYS_PER_READ keys per read
+
+        Keys of one read share their requests (one per page), only the series
+        of one read are held in memory at a time.
+        """
+        for start in range(0, len(keys), TB_TELEMETRY_KEYS_PER_READ):
+            chunk = keys[start:start + TB_TELEMETRY_KEYS_PER_READ]
+            series = self._read_telemetry_batch(entity_id, entity_type, chunk)
+            for key in chunk:
+                yield key, series.pop(key)
+
+    @phase('telemetry_write')
     def _write_telemetry(self, entity_id: str, entity_type: str, key: str, data: list):
-        """Write telemetry data to entity, data is list of (timestamp, value) tuples"""
+        """Write telemetry data to entity, data is a Series or list of (timestamp, value) tuples"""
         if not data:
             return
 
         # Write in batches to avoid request size limits
-        batch_size = 1000
+        batch_size = TELEMETRY_WRITE_BATCH_SIZE
         for i in range(0, len(data), batch_size):
             batch = data[i:i + batch_size]
 
@@ -1280,10 +1414,152 @@ class MigrationTool:
                 for ts, val in batch
             ]
 
-            self.api.post(
+            if self.api.post(
                 f"/api/plugins/telemetry/{entity_type}/{entity_id}/timeseries/ANY",
                 telemetry_batch
-            )
+            ) is None:
+                raise ThingsBoardError(f"Writing {key} to {entity_type} {entity_id} failed at batch {i // batch_size + 1}")
+
+    # =========================================================================
+    # SYNC - Copy telemetry that arrived after the migration
+    # =========================================================================
+
+    def sync(self, project_name: str = None, dry_run: bool = True, follow: bool = False,
+             interval: float = TB_SYNC_INTERVAL):
+        """Copy new points of old telemetry keys to the new keys (all migrated projects, or one)
+
+        Only points newer than the stored watermark of each key pair are read
+        (tb_sync.py). With follow, this is repeated every `interval` seconds
+        until interrupted; the key pairs are determined once per run. A source
+        that fails is logged and skipped, its watermarks stay where they are
+        and the next cycle retries it.
+        """
+        print(f"\n🔁 {'[DRY RUN] ' if dry_run else ''}Sync of old telemetry keys"
+              f"{f' - {project_name}' if project_name else ''}\n")
+
+        if project_name:
+            project = self._find_project_by_name(project_name, full=True)
+            if not project:
+                print(f"❌ Project '{project_name}' not found")
+                return False
+            projects = [project]
+        else:
+            completed = set(self._load_migration_log().get('completed_projects', []))
+            if not self.projects:
+                # Fresh relations: a VR device linked since the last scan must be synced too
+                self.scan(full=True)
+            projects = [p for p in self.projects if p['name'] in completed]
+            if not projects:
+                print("ℹ️  No migrated projects to sync (see migration_log.json)")
+                return False
+
+        plan = [
+            (measurement, source)
+            for project in projects
+            for measurement in project.get('measurements', [])
+            for source in self._sync_sources(measurement)
+        ]
+        pair_count = sum(len(source[2]) for _, source in plan)
+        print(f"📋 {pair_count} key pair(s) on {len({m['id']['id'] for m, _ in plan})} measurement(s)")
+        if not plan:
+            return True
+
+        store = WatermarkStore()
+        errors = 0
+        try:
+            while True:
+                started = datetime.now()
+                points = errors = 0
+                for measurement, source in plan:
+                    try:
+                        points += self._sync_source(measurement, source, store, dry_run)
+                    except Exception as e:
+                        # Watermarks only advance after a successful write, the next cycle retries
+                        errors += 1
+                        log.error(f"Sync of {source[0]} {source[1]} ({measurement['name']}) failed: {e}", exc_info=e)
+                        print(f"   ❌ {measurement['name']}: {e}")
+                log.info(f"Sync: {points} new points, {errors} failed sources "
+                         f"({pair_count} key pairs, dry_run={dry_run})")
+                print(f"{'⚠️ ' if errors else '✅'} {started.strftime('%H:%M:%S')} {points} new point(s) "
+                      f"{'to copy' if dry_run else 'copied'}{f', {errors} source(s) failed' if errors else ''}")
+                if not follow:
+                    break
+                print(f"💤 Next sync in {interval:g}s (Ctrl+C to stop)")
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            print("\n⏹️  Sync stopped")
+        finally:
+            store.close()
+
+        if dry_run:
+            print("\n⚠️  This was a DRY RUN. No changes were made to ThingsBoard.")
+        return errors == 0
+
+    def _sync_sources(self, measurement: dict) -> list:
+        """[(entity_type, entity_id, [Transform])] of a measurement, keys mapped as by `migrate`"""
+        m_id = measurement['id']['id']
+        attrs = self._get_attributes(m_id, 'ASSET')
+        installation_type = self._get_installation_type(attrs)
+
+        sources = []
+        vr_devices = measurement.get('vr_devices', [])
+        for vr in vr_devices:
+            key_map = get_telemetry_key_map(installation_type, self._get_device_type(vr['name']))
+            keys = self._get_telemetry_keys(vr['id'], 'DEVICE')
+            pairs = [key_map[key] for key in keys if key in key_map]
+            if pairs:
+                sources.append(('DEVICE', vr['id'], pairs))
+
+        if not vr_devices:
+            key_map = get_telemetry_key_map(installation_type)
+            keys = self._get_telemetry_keys(m_id, 'ASSET')
+            pairs = [key_map[key] for key in keys if key in key_map]
+            if pairs:
+                sources.append(('ASSET', m_id, pairs))
+        return sources
+
+    def _sync_source(self, measurement: dict, source: tuple, store: WatermarkStore, dry_run: bool) -> int:
+        """Copy the points newer than their watermarks of one source entity, returns the point count"""
+        m_id = measurement['id']['id']
+        source_type, source_id, transforms = source
+        end_ts = now_ms()
+
+        marks = {t.source: store.get(source_id, t.source, m_id, t.target) for t in transforms}
+        unknown = [t.target for t in transforms if marks[t.source] is None]
+        if unknown:
+            # First sync: the migration copied everything up to the target's last point
+            with phase('telemetry_read'):
+                target_last = last_timestamps(self.api, 'ASSET', m_id, unknown, 0, end_ts)
+            for t in transforms:
+                if marks[t.source] is None and t.target in target_last:
+                    marks[t.source] = target_last[t.target]
+                    if not dry_run:
+                        store.set(source_id, t.source, m_id, t.target, marks[t.source])
+
+        # Keys with a watermark share one read from the oldest of them, keys
+        # without one (empty target) are read completely
+        series = {}
+        tracked = [t.source for t in transforms if marks[t.source] is not None]
+        if tracked:
+            series.update(self._read_telemetry_batch(source_id, source_type, tracked,
+                                                     min(marks[key] for key in tracked) + 1, end_ts))
+        untracked = [t.source for t in transforms if marks[t.source] is None]
+        if untracked:
+            series.update(self._read_telemetry_batch(source_id, source_type, untracked, None, end_ts))
+
+        total = 0
+        for t in transforms:
+            mark = marks[t.source]
+            telemetry = series[t.source] if mark is None else series[t.source].after(mark)
+            if not telemetry:
+                continue
+            print(f"   🔄 {measurement['name']}: {t.source} → {t.target}: +{len(telemetry)} points")
+            total += len(telemetry)
+            if dry_run:
+                continue
+            self._write_telemetry(m_id, 'ASSET', t.target, t.apply(telemetry))
+            store.set(source_id, t.source, m_id, t.target, telemetry[-1][0])
+        return total
 
     # =========================================================================
     # ROLLBACK - Restore from backup
@@ -1343,6 +1619,7 @@ class MigrationTool:
         print(f"\n✅ Rollback completed")
         return True
 
+    @phase('attributes')
     def _restore_attributes(self, entity_id: str, entity_type: str, attributes: dict):
         """Restore attributes from backup"""
         for scope, attrs in attributes.items():
@@ -1388,7 +1665,10 @@ class MigrationTool:
         print(f"📁 Found interrupted migration: {backup_path.name}")
         print(f"   Started: {state_data.get('started_at')}")
         print(f"   Completed measurements: {len(state_data.get('completed_measurements', []))}")
-        print(f"   Current measurement: {state_data.get('current_measurement')}")
+        if 'current_measurements' in state_data:
+            print(f"   Current measurements: {', '.join(state_data['current_measurements']) or None}")
+        else:
+            print(f"   Current measurement: {state_data.get('current_measurement')}")
         print(f"   Errors so far: {len(state_data.get('errors', []))}")
 
         # Resume using the existing state
@@ -1405,7 +1685,7 @@ class MigrationTool:
         print(f"\n🚀 Resuming migration for project: {project_name}\n")
 
         # Find project
-        project = self._find_project_by_name(project_name)
+        project = self._find_project_by_name(project_name, full=True)
         if not project:
             print(f"❌ Project '{project_name}' not found")
             return False
@@ -1429,42 +1709,8 @@ class MigrationTool:
                 'telemetry_backup': {}
             }
 
-        # Continue with measurements
-        measurements = project.get('measurements', [])
-        total_measurements = len(measurements)
-        completed = state.get('completed_measurements', [])
-
-        for i, m in enumerate(measurements, 1):
-            m_name = m['name']
-
-            # Skip already completed
-            if m_name in completed:
-                print(f"\n📦 [{i}/{total_measurements}] Measurement: {m_name} ⏭️  (already completed)")
-                continue
-
-            print(f"\n📦 [{i}/{total_measurements}] Measurement: {m_name}")
-
-            state['current_measurement'] = m_name
-            self._save_state(state_file, state)
-
-            try:
-                m_backup, telemetry_backup = self._migrate_measurement_with_backup(
-                    m, dry_run, state, state_file
-                )
-                backup_data['measurements'].append(m_backup)
-                if telemetry_backup:
-                    backup_data['telemetry_backup'][m_name] = telemetry_backup
-
-                state['completed_measurements'].append(m_name)
-                state['current_measurement'] = None
-                self._save_state(state_file, state)
-
-            except Exception as e:
-                error_msg = f"Error migrating {m_name}: {str(e)}"
-                log.error(error_msg, exc_info=True)
-                print(f"   ❌ {error_msg}")
-                state['errors'].append(error_msg)
-                self._save_state(state_file, state)
+        # Continue with measurements (skips completed ones)
+        self._migrate_measurements(project.get('measurements', []), dry_run, state, state_file, backup_data)
 
         # Save backup file
         with open(backup_file, 'w', encoding='utf-8') as f:
@@ -1540,20 +1786,19 @@ class MigrationTool:
                     print()
 
 
-def main():
-    """Main entry point"""
-    if len(sys.argv) < 2:
-        print(__doc__)
-        sys.exit(1)
+def _get_option(name: str) -> Optional[str]:
+    """Get the value of a `--name value` command line option"""
+    if name in sys.argv:
+        index = sys.argv.index(name)
+        if index + 1 < len(sys.argv):
+            return sys.argv[index + 1]
+    return None
 
-    command = sys.argv[1].lower()
-
-    tool = MigrationTool()
-    if not tool.connect():
-        sys.exit(1)
 
+def _run_command(tool: MigrationTool, command: str):
+    """Dispatch a command line command"""
     if command == 'scan':
-        tool.scan()
+        tool.scan(full='--full' in sys.argv)
 
     elif command == 'backup':
         if len(sys.argv) < 3:
@@ -1572,7 +1817,7 @@ def main():
 
     elif command == 'migrate-all':
         dry_run = '--execute' not in sys.argv
-        tool.migrate_all(dry_run=dry_run)
+        tool.migrate_all(dry_run=dry_run, stream='--stream' in sys.argv)
 
     elif command == 'rollback':
         if len(sys.argv) < 3:
@@ -1591,6 +1836,12 @@ def main():
         project_name = sys.argv[2]
         tool.resume_migration(project_name)
 
+    elif command == 'sync':
+        project_name = sys.argv[2] if len(sys.argv) > 2 and not sys.argv[2].startswith('--') else None
+        interval = _get_option('--interval')
+        tool.sync(project_name, dry_run='--execute' not in sys.argv, follow='--follow' in sys.argv,
+                  interval=float(interval) if interval else TB_SYNC_INTERVAL)
+
     elif command == 'status':
         if len(sys.argv) < 3:
             print("Usage: python tb_migration.py status <project_name>")
@@ -1604,5 +1855,37 @@ def main():
         sys.exit(1)
 
 
+def main():
+    """Main entry point"""
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+
+    command = sys.argv[1].lower()
+
+    concurrency = _get_option('--concurrency')
+    if concurrency:
+        from tb_migration_async import AsyncMigrationTool
+        tool = AsyncMigrationTool(concurrency=int(concurrency))
+    else:
+        tool = MigrationTool()
+
+    compression = _get_option('--compression')
+    if compression:
+        try:
+            tool.api.set_compression(compression.lower())
+        except ValueError as e:
+            print(f"❌ {e}")
+            sys.exit(1)
+
+    if not tool.connect():
+        sys.exit(1)
+
+    try:
+        _run_command(tool, command)
+    finally:
+        write_run_report(tool.api, 'tb_migration', command)
+
+
 if __name__ == '__main__':
     main()
@@ -0,0 +1,393 @@
+#!/usr/bin/env python3
+"""
+ECO Smart Diagnostics - Async Migration Engine
+
+asyncio execution path for tb_migration.py, enabled with `--concurrency N`:
+
+    python tb_migration.py scan --concurrency 8
+    python tb_migration.py migrate <project_name> --execute --concurrency 8
+    python tb_migration.py migrate-all --execute --concurrency 8
+
+Produces the same backups, state files and results as MigrationTool, but keeps
+up to N requests in flight:
+- scan: relation lookups and bulk device lookups run concurrently
+- migrate: measurements of a project, VR devices and telemetry keys run
+  concurrently, write batches are posted concurrently
+
+At most N telemetry series are held in memory at the same time. Pagination of
+a single key stays sequential (each page starts after the previous page's last
+timestamp). Projects in migrate-all are still processed one after another.
+"""
+
+import asyncio
+import functools
+from pathlib import Path
+
+from tb_client import ThingsBoardError
+from tb_client_async import AsyncThingsBoardAPI, TB_CONCURRENCY
+from tb_inventory import (
+    MEASUREMENT_VR, fetch_relation_tree, fetch_relations_from, fetch_relations_to, load_inventory, owners,
+)
+from tb_metrics import phase
+from tb_migration import (
+    MigrationTool, get_telemetry_key_map,
+    DEVICE_LOOKUP_BATCH_SIZE, TELEMETRY_WRITE_BATCH_SIZE,
+)
+from tb_series import Series
+from tb_telemetry import data_range, merge_windows, new_points, range_params, read_keys_page, read_keys_range, shard_windows
+from tb_transforms import Transform
+
+
+class AsyncMigrationTool(MigrationTool):
+    """Migration Tool with concurrent (asyncio) scan and migration"""
+
+    def __init__(self, concurrency: int = TB_CONCURRENCY):
+        super().__init__()
+        self.aapi = AsyncThingsBoardAPI(concurrency=concurrency)
+        self.api = self.aapi.api
+        self.concurrency = self.aapi.concurrency
+        self._series_slots = None
+
+    # =========================================================================
+    # SCAN
+    # =========================================================================
+
+    @phase('scan')
+    def scan(self, full: bool = False):
+        """Scan all Projects and Measurements, detect VR devices (concurrent)"""
+        asyncio.run(self._scan_async(full))
+
+    async def _scan_async(self, full: bool = False):
+        print(f"\n📊 Scanning Projects and Measurements ({self.concurrency} concurrent requests)...\n")
+
+        inventory = await self.aapi.run(load_inventory, self.api)
+        if not inventory:
+            print("❌ No projects or measurements found")
+            return
+
+        projects = [a for a in inventory if a['type'] == 'Project']
+        measurements = [a for a in inventory if a['type'] == 'Measurement']
+        assets = projects + measurements
+        graph, devices, changed = self._restore_scan(inventory, full)
+
+        async def load(apply, func, *args):
+            apply(await self.aapi.run(func, self.api, *args))
+
+        async def load_all(jobs: list):
+            done = 0
+            for finished in asyncio.as_completed([load(*job) for job in jobs]):
+                await finished
+                done += 1
+                self._print_progress(done, len(jobs), "Relations")
+
+        # Current owners of changed measurements, then the relation tree per project
+        # not restored from the inventory store, then single lookups for assets outside of all trees
+        stale_owners = set()
+        await load_all([
+            (lambda relations: stale_owners.update(owners(relations)), fetch_relations_to, m['id']['id'])
+            for m in measurements if m['id']['id'] in changed
+        ])
+        graph.discard(stale_owners)
+        await load_all([
+            (functools.partial(graph.add_tree, p['id']['id']), fetch_relation_tree, p['id']['id'])
+            for p in projects if not graph.is_loaded(p['id']['id'])
+        ])
+        await load_all([
+            (functools.partial(graph.add_from, a['id']['id']), fetch_relations_from, a['id']['id'])
+            for a in assets if not graph.is_loaded(a['id']['id'])
+        ])
+
+        # VR devices of all assets in bulk, DEVICE_LOOKUP_BATCH_SIZE ids per request
+        device_ids = list(dict.fromkeys(
+            rel['to']['id'] for a in assets for rel in graph.targets(a['id']['id'], MEASUREMENT_VR, 'DEVICE')
+            if rel['to']['id'] not in devices
+        ))
+        for batch in await asyncio.gather(*(
+            self.aapi.run(self._get_devices, device_ids[i:i + DEVICE_LOOKUP_BATCH_SIZE])
+            for i in range(0, len(device_ids), DEVICE_LOOKUP_BATCH_SIZE)
+        )):
+            devices.update(batch)
+        self._apply_relation_graph(projects, measurements, graph, devices)
+        self._save_scan(inventory, graph, devices)
+
+        self.projects = projects
+        self.measurements = measurements
+
+        # Clear progress line
+        print("\r" + " " * 80 + "\r", end="")
+        print(f"✅ Scanned {len({a['customerName'] for a in inventory})} customers, "
+              f"{len(self.projects)} projects, {len(self.measurements)} measurements\n")
+
+        self._print_scan_summary()
+
+    # =========================================================================
+    # MIGRATE
+    # =========================================================================
+
+    def _migrate_measurements(self, measurements: list, dry_run: bool, state: dict,
+                              state_file: Path, backup_data: dict):
+        """Migrate measurements concurrently, skipping those already completed in state"""
+        asyncio.run(self._migrate_measurements_async(measurements, dry_run, state, state_file, backup_data))
+
+    async def _migrate_measurements_async(self, measurements: list, dry_run: bool, state: dict,
+                                          state_file: Path, backup_data: dict):
+        total_measurements = len(measurements)
+        completed = state.get('completed_measurements', [])
+        measurement_slots = asyncio.Semaphore(self.concurrency)
+        # Bounds memory: each slot holds one telemetry series being copied
+        self._series_slots = asyncio.Semaphore(self.concurrency)
+
+        async def migrate_one(i: int, m: dict):
+            m_name = m['name']
+            if m_name in completed:
+                print(f"\n📦 [{i}/{total_measurements}] Measurement: {m_name} ⏭️  (already completed)")
+                return
+
+            async with measurement_slots:
+                print(f"\n📦 [{i}/{total_measurements}] Measurement: {m_name}")
+                # Several measurements run at once: track all of them, not 'current_measurement'
+                state.setdefault('current_measurements', []).append(m_name)
+                self._save_state(state_file, state)
+
+                try:
+                    m_backup, telemetry_backup = await self._migrate_measurement_async(m, dry_run, state, state_file)
+                    self._complete_measurement(m_name, m_backup, telemetry_backup, state, state_file, backup_data)
+                except Exception as e:
+                    self._fail_measurement(m_name, e, state, state_file)
+
+        await asyncio.gather(*(migrate_one(i, m) for i, m in enumerate(measurements, 1)))
+
+        # Keep project order in the backup file (measurements finish in any order)
+        order = {m['id']['id']: i for i, m in enumerate(measurements)}
+        backup_data['measurements'].sort(key=lambda b: order.get(b.get('id'), len(order)))
+
+    async def _migrate_measurement_async(self, measurement: dict, dry_run: bool,
+                                         state: dict = None, state_file: Path = None) -> tuple:
+        """Migrate a measurement with backup, returns (attribute_backup, telemetry_backup)"""
+        m_id = measurement['id']['id']
+        m_name = measurement['name']
+
+        # Get current attributes (this is our backup)
+        attrs = await self._get_attributes_async(m_id, 'ASSET')
+
+        backup = {
+            'id': m_id,
+            'name': m_name,
+            'attributes_backup': attrs
+        }
+
+        attr_dict = {a['key']: a['value'] for a in attrs}
+
+        migrated_attrs = self._plan_attribute_migrations(attr_dict)
+        for attr in migrated_attrs:
+            print(f"   📝 [{m_name}] {attr['old']} → {attr['new']}: {attr['value']}")
+
+        label = attr_dict.get('locationName')
+        if label:
+            print(f"   📝 [{m_name}] locationName → Entity Label: {label}")
+
+        if not dry_run:
+            await self._save_attributes_async(m_id, migrated_attrs, label)
+
+        backup['migrated_attributes'] = migrated_attrs
+
+        telemetry_backup = await self._migrate_telemetry_async(measurement, dry_run, state, state_file)
+
+        return backup, telemetry_backup
+
+    @phase('attributes')
+    async def _get_attributes_async(self, entity_id: str, entity_type: str) -> list:
+        """SERVER_SCOPE attributes of an entity ([] if there are none)"""
+        return await self.aapi.get(
+            f"/api/plugins/telemetry/{entity_type}/{entity_id}/values/attributes/SERVER_SCOPE"
+        ) or []
+
+    @phase('attributes')
+    async def _save_attributes_async(self, m_id: str, migrated_attrs: list, label: str = None):
+        """Write the migrated attributes (concurrently) and the entity label of a measurement"""
+        await asyncio.gather(*(
+            self.aapi.post(f"/api/plugins/telemetry/ASSET/{m_id}/attributes/SERVER_SCOPE",
+                           {attr['new']: attr['value']})
+            for attr in migrated_attrs
+        ))
+        if label:
+            entity = await self.aapi.get(f"/api/asset/{m_id}")
+            if entity:
+                entity['label'] = label  # IMPORTANT: Set label, NOT name!
+                await self.aapi.post("/api/asset", entity)
+
+    @phase('telemetry_read')
+    async def _get_telemetry_keys_async(self, entity_id: str, entity_type: str) -> list:
+        """Timeseries keys of an entity ([] if there are none)"""
+        return await self.aapi.get(f"/api/plugins/telemetry/{entity_type}/{entity_id}/keys/timeseries") or []
+
+    async def _migrate_telemetry_async(self, measurement: dict, dry_run: bool,
+                                       state: dict = None, state_file: Path = None) -> dict:
+        """Migrate telemetry - either from VR devices or rename keys on Measurement directly"""
+        m_id = measurement['id']['id']
+        m_name = measurement['name']
+        vr_devices = measurement.get('vr_devices', [])
+
+        telemetry_backup = {}
+
+        # Get installationType from measurement attributes to determine Power/Energy keys
+        attrs = await self._get_attributes_async(m_id, 'ASSET')
+        installation_type = self._get_installation_type(attrs)
+        telemetry_key_map = get_telemetry_key_map(installation_type)
+
+        # Initialize state tracking for this measurement
+        if state is not None and m_name not in state.get('completed_vr_devices', {}):
+            state.setdefault('completed_vr_devices', {})[m_name] = []
+
+        if vr_devices:
+            # === SCENARIO 1: VR Devices exist - copy telemetry from VR to Measurement ===
+            print(f"   📊 [{m_name}] Migrating telemetry ({installation_type}) from {len(vr_devices)} VR device(s)...")
+
+            async def migrate_vr(vr: dict) -> int:
+                vr_id = vr['id']
+                vr_name = vr['name']
+                label = f"{m_name}/{vr_name}"
+
+                # Skip if already completed (for resume)
+                if state is not None and vr_id in state['completed_vr_devices'].get(m_name, []):
+                    print(f"      [{label}] ⏭️  already migrated")
+                    return 0
+
+                device_type = self._get_device_type(vr_name)
+                keys = await self._get_telemetry_keys_async(vr_id, 'DEVICE')
+                if not keys:
+                    print(f"      [{label}] ⚠️  No telemetry keys found")
+                    return 0
+
+                device_key_map = get_telemetry_key_map(installation_type, device_type)
+                relevant_keys = [k for k in keys if k in device_key_map]
+                if not relevant_keys:
+                    print(f"      [{label}] ⚠️  No relevant telemetry keys found")
+                    return 0
+
+                telemetry_backup[vr_id] = {'device_name': vr_name, 'device_type': device_type, 'keys': {}}
+                points = await asyncio.gather(*(
+                    self._copy_key_async(label, vr_id, 'DEVICE', m_id, device_key_map[old_key],
+                                         telemetry_backup[vr_id]['keys'], dry_run)
+                    for old_key in relevant_keys
+                ))
+
+                # Mark VR device as completed in state
+                if state is not None and state_file is not None:
+                    state['completed_vr_devices'][m_name].append(vr_id)
+                    self._save_state(state_file, state)
+                return sum(points)
+
+            total_points = sum(await asyncio.gather(*(migrate_vr(vr) for vr in vr_devices)))
+
+        else:
+            # === SCENARIO 2: No VR Devices - copy telemetry to new keys on Measurement ===
+            print(f"   📊 [{m_name}] Copying telemetry to new keys ({installation_type}) on Measurement...")
+
+            # Check if already completed (for resume)
+            if state is not None and 'direct_copy' in state['completed_vr_devices'].get(m_name, []):
+                print(f"      [{m_name}] ⏭️  Already completed")
+                return telemetry_backup
+
+            keys = await self._get_telemetry_keys_async(m_id, 'ASSET')
+            if not keys:
+                print(f"      [{m_name}] ℹ️  No telemetry keys found on Measurement")
+                return telemetry_backup
+
+            # Filter only OLD keys that need renaming (don't process already normalized keys)
+            old_keys_to_rename = [k for k in keys if k in telemetry_key_map]
+
+            if not old_keys_to_rename:
+                new_keys = ['T_flow_C', 'T_return_C', 'dT_K', 'Vdot_m3h', 'v_ms', 'P_th_kW', 'E_th_kWh', 'V_m3']
+                if any(k in keys for k in new_keys):
+                    print(f"      [{m_name}] ✅ Already using new telemetry keys")
+                else:
+                    print(f"      [{m_name}] ℹ️  No old telemetry keys to rename")
+                return telemetry_backup
+
+            telemetry_backup['measurement_direct'] = {'keys': {}}
+            total_points = sum(await asyncio.gather(*(
+                self._copy_key_async(m_name, m_id, 'ASSET', m_id, telemetry_key_map[old_key],
+                                     telemetry_backup['measurement_direct']['keys'], dry_run)
+                for old_key in old_keys_to_rename
+            )))
+
+            # Mark direct rename as completed in state
+            if state is not None and state_file is not None:
+                state['completed_vr_devices'][m_name].append('direct_copy')
+                self._save_state(state_file, state)
+
+        if total_points > 0:
+            print(f"   ✅ [{m_name}] Total: {total_points} data points {'to migrate' if dry_run else 'migrated'}")
+        else:
+            print(f"   ℹ️  [{m_name}] No telemetry data to migrate")
+
+        return telemetry_backup
+
+    async def _copy_key_async(self, label: str, source_id: str, source_type: str, target_id: str,
+                              transform: Transform, key_backup: dict, dry_run: bool) -> int:
+        """Read one key, convert it and write it under its new name, returns point count"""
+        old_key, new_key = transform.source, transform.target
+        async with self._series_slots:
+            telemetry = await self._read_telemetry_async(source_id, source_type, old_key)
+            if not telemetry:
+                print(f"      [{label}] {old_key} (empty)")
+                return 0
+
+            points = len(telemetry)
+
+            # Save to backup (metadata only - original data stays in ThingsBoard)
+            key_backup[old_key] = {'new_key': new_key, 'points': points}
+
+            # Apply conversion if needed for migration
+            telemetry = transform.apply(telemetry)
+
+            print(f"      [{label}] {old_key} → {new_key}: {points} points")
+
+            if not dry_run:
+                await self._write_telemetry_async(target_id, 'ASSET', new_key, telemetry)
+            return points
+
+    @phase('telemetry_read')
+    async def _read_telemetry_async(self, entity_id: str, entity_type: str, key: str,
+                                    start_ts: int = None, end_ts: int = None) -> Series:
+        """Read telemetry data from entity, returns a Series of (timestamp, value) points
+
+        Longer series are read in monthly windows (tb_telemetry.py), all
+        windows concurrently within the engine's request limit.
+        """
+        start_ts, end_ts, keys = await self.aapi.run(data_range, self.api, entity_type, entity_id, [key],
+                                                     start_ts, end_ts)
+        if not keys:
+            return new_points()
+        # Streamed and decoded on the worker threads
+        first_pages = await self.aapi.run(read_keys_page, self.api, entity_type, entity_id, keys,
+                                          range_params(key, start_ts, end_ts))
+        plan = await self.aapi.run(shard_windows, self.api, entity_type, entity_id, keys, first_pages, end_ts)
+        if plan is None:
+            series = await self.aapi.run(read_keys_range, self.api, entity_type, entity_id, keys, start_ts, end_ts,
+                                         True, first_pages)
+            return series[key]
+
+        full, windows = plan
+        return merge_windows(keys, first_pages, full, await asyncio.gather(*(
+            self.aapi.run(read_keys_range, self.api, entity_type, entity_id, full, start, end)
+            for start, end in windows
+        )))[key]
+
+    @phase('telemetry_write')
+    async def _write_telemetry_async(self, entity_id: str, entity_type: str, key: str, data: list):
+        """Write telemetry data to entity, up to `concurrency` batches are posted concurrently"""
+        endpoint = f"/api/plugins/telemetry/{entity_type}/{entity_id}/timeseries/ANY"
+        # Bounds memory: a batch's payload is only built once it holds a slot
+        batch_slots = asyncio.Semaphore(self.concurrency)
+
+        async def post_batch(start: int):
+            async with batch_slots:
+                batch = data[start:start + TELEMETRY_WRITE_BATCH_SIZE]
+                if await self.aapi.post(endpoint, [{'ts': ts, 'values': {key: val}} for ts, val in batch]) is None:
+                    raise ThingsBoardError(
+                        f"Writing {key} to {entity_type} {entity_id} failed at batch {start // TELEMETRY_WRITE_BATCH_SIZE + 1}"
+                    )
+
+        await asyncio.gather(*(post_batch(i) for i in range(0, len(data), TELEMETRY_WRITE_BATCH_SIZE)))
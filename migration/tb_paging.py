@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+ECO Smart Diagnostics - Concurrent pagination of ThingsBoard page data
+
+Listings (customers, assets, entity data queries, ...) answer with PageData:
+{'data': [...], 'totalPages': n, 'totalElements': n, 'hasNext': bool}.
+
+paginate() reads the first page, takes 'totalPages' from it and fetches the
+remaining pages concurrently on TB_PAGE_WORKERS threads, yielding the items
+in page order while later pages are still loading. At most 2 x workers pages
+are requested ahead of the consumer, so memory stays bounded for long
+listings. Without 'totalPages' in the response, pages are read one after
+another until 'hasNext' is false.
+
+A failed page (no PageData) raises ThingsBoardError, a listing is never
+silently cut short in the middle.
+
+    for customer in get_pages(api, "/api/customers"):
+        ...
+
+Configuration (.env):
+    TB_PAGE_SIZE     Items per listing page (default: 100)
+    TB_PAGE_WORKERS  Pages fetched in parallel (default: 4, 1 = sequential)
+"""
+
+import os
+import contextvars
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterator, Optional
+
+from tb_client import ThingsBoardError
+
+TB_PAGE_SIZE = int(os.getenv('TB_PAGE_SIZE', '100'))
+TB_PAGE_WORKERS = int(os.getenv('TB_PAGE_WORKERS', '4'))
+
+
+def _checked(result, page: int, what: str) -> dict:
+    if not isinstance(result, dict) or not isinstance(result.get('data'), list):
+        raise ThingsBoardError(f"{what}: page {page} failed")
+    return result
+
+
+def paginate(fetch_page: Callable[[int], Optional[dict]], workers: int = TB_PAGE_WORKERS,
+             what: str = 'listing') -> Iterator:
+    """Items of all pages, fetch_page(page) returns the PageData of one page (None on failure)"""
+    first = _checked(fetch_page(0), 0, what)
+    yield from first['data']
+
+    total_pages = first.get('totalPages')
+    if not isinstance(total_pages, int):
+        # No page count, follow hasNext
+        page = 0
+        result = first
+        while result.get('hasNext', False):
+            page += 1
+            result = _checked(fetch_page(page), page, what)
+            yield from result['data']
+        return
+
+    if total_pages <= 1:
+        return
+    workers = max(1, min(workers, total_pages - 1))
+    if workers == 1:
+        for page in range(1, total_pages):
+            yield from _checked(fetch_page(page), page, what)['data']
+        return
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='tb-page') as pool:
+        pages = iter(range(1, total_pages))
+        pending = deque()  # (page, future) in page order
+
+        def submit_next():
+            page = next(pages, None)
+            if page is not None:
+                # Workers run in a copy of the caller's context (metrics phase)
+                pending.append((page, pool.submit(contextvars.copy_context().run, fetch_page, page)))
+
+        for _ in range(2 * workers):
+            submit_next()
+        try:
+            while pending:
+                page, future = pending.popleft()
+                result = _checked(future.result(), page, what)
+                submit_next()
+                yield from result['data']
+        finally:
+            for _, future in pending:
+                future.cancel()
+
+
+def get_pages(api, endpoint: str, params: dict = None, page_size: int = TB_PAGE_SIZE,
+              workers: int = TB_PAGE_WORKERS) -> Iterator:
+    """Items of a paginated GET listing"""
+    return paginate(
+        lambda page: api.get(endpoint, params={**(params or {}), 'pageSize': page_size, 'page': page}),
+        workers, f"GET {endpoint}",
+    )
+
+
+def post_pages(api, endpoint: str, body: Callable[[int], dict], workers: int = TB_PAGE_WORKERS) -> Iterator:
+    """Items of a paginated POST query, body(page) builds the request of one page"""
+    return paginate(lambda page: api.post(endpoint, body(page)), workers, f"POST {endpoint}")
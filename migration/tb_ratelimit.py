@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+ECO Smart Diagnostics - Adaptive Rate Limiter for ThingsBoard REST calls
+
+Token bucket whose rate adapts AIMD-style (additive increase, multiplicative
+decrease) to the health of the server:
+- every healthy response raises the rate by ~`increase` requests/s per second
+- 429/5xx, connection errors and latency above `latency_target` cut the rate
+  by `decrease` (at most once per `cooldown` seconds)
+- a Retry-After header pauses all requests until the given time
+
+Configuration (.env):
+    TB_RATE_LIMIT        Initial requests/s (default: 20, 0 = unlimited)
+    TB_RATE_LIMIT_MIN    Lower bound requests/s (default: 1)
+    TB_RATE_LIMIT_MAX    Upper bound requests/s (default: 200)
+    TB_LATENCY_TARGET    Latency in seconds treated as overload (default: 5)
+"""
+
+import os
+import time
+import logging
+import threading
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+TB_RATE_LIMIT = float(os.getenv('TB_RATE_LIMIT', '20'))
+TB_RATE_LIMIT_MIN = float(os.getenv('TB_RATE_LIMIT_MIN', '1'))
+TB_RATE_LIMIT_MAX = float(os.getenv('TB_RATE_LIMIT_MAX', '200'))
+TB_LATENCY_TARGET = float(os.getenv('TB_LATENCY_TARGET', '5'))
+
+log = logging.getLogger('migration')
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header (seconds or HTTP date) into seconds to wait"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+        return max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
+
+
+class AdaptiveRateLimiter:
+    """Thread-safe token bucket with AIMD rate adaptation"""
+
+    def __init__(self, rate: float = TB_RATE_LIMIT, min_rate: float = TB_RATE_LIMIT_MIN,
+                 max_rate: float = TB_RATE_LIMIT_MAX, latency_target: float = TB_LATENCY_TARGET,
+                 increase: float = 1.0, decrease: float = 0.5, cooldown: float = 1.0):
+        self.enabled = rate > 0
+        self.rate = min(max(rate, min_rate), max_rate)
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.latency_target = latency_target
+        self.increase = increase
+        self.decrease = decrease
+        self.cooldown = cooldown
+
+        # Bucket holds at most one second worth of requests
+        self.tokens = 1.0
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.last_decrease = 0.0
+        self.throttled = 0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a request may be sent (Retry-After applies even when disabled)"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                if now < self.blocked_until:
+                    wait = self.blocked_until - now
+                elif not self.enabled:
+                    return
+                else:
+                    self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+                    self.updated = now
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def on_success(self, latency: float):
+        """Feed back a successful response"""
+        if not self.enabled:
+            return
+        if latency > self.latency_target:
+            self._slow_down(f"latency {latency:.1f}s")
+            return
+        with self.lock:
+            # +increase/rate per response ≈ +increase requests/s per second
+            self.rate = min(self.max_rate, self.rate + self.increase / self.rate)
+
+    def on_throttle(self, reason: str, retry_after: float = None):
+        """Feed back a throttled/failed response (429, 5xx, connection error)"""
+        with self.lock:
+            self.throttled += 1
+            if retry_after:
+                self.blocked_until = max(self.blocked_until, time.monotonic() + retry_after)
+        if self.enabled:
+            self._slow_down(reason)
+
+    def _slow_down(self, reason: str):
+        with self.lock:
+            now = time.monotonic()
+            if now - self.last_decrease < self.cooldown:
+                return
+            self.last_decrease = now
+            self.rate = max(self.min_rate, self.rate * self.decrease)
+            self.tokens = min(self.tokens, self.rate)
+        log.warning(f"Rate limit reduced to {self.rate:.1f} req/s ({reason})")
+
+
+_rate_limiter = None
+_rate_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> AdaptiveRateLimiter:
+    """Get the process-wide shared rate limiter (created on first use)"""
+    global _rate_limiter
+    with _rate_limiter_lock:
+        if _rate_limiter is None:
+            _rate_limiter = AdaptiveRateLimiter()
+        return _rate_limiter
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+ECO Smart Diagnostics - Columnar telemetry series
+
+A series read with numeric values (tb_telemetry.py) is kept in contiguous
+arrays instead of a list of (ts, value) tuples: timestamps as int64 (array
+'q'), values as float64 (array 'd') and one kind byte per point, 17 bytes
+per point instead of about 100 for a tuple with a boxed float. Readers
+append page by page, writers slice batches from it, conversions map over the
+value array.
+
+Every finite number goes into the value array, like float() parses it:
+numeric text as ThingsBoard sends it ('21.5', '1.0E-4') and also text that
+is not in canonical form ('1500.50', ' 7 '). The kind byte keeps the type
+for the write-back: integer text below 2**53 ('123', kind INT) is read back
+as int, so a LONG key is written as LONG again, decimal text as float.
+Only values float64 cannot hold go into `other` ({index: value}) with NaN at
+their position in the value array: larger integers (exact, as int), 'NaN'
+and 'Infinity' (JSON cannot carry them), text, booleans as text and JSON.
+Reads with numeric=False (fix_telemetry_types.py) keep returning plain
+lists.
+
+A Series behaves like the list it replaces: len(), iteration and indexing
+yield (ts, value) tuples, slices are Series, and it compares equal to a list
+with the same points.
+
+    series = Series()
+    series.append(1704067200000, '21.5')
+    for ts, value in series[0:1000]:
+        ...
+"""
+
+import bisect
+import math
+from array import array
+from typing import Callable, Iterator
+
+NAN = float('nan')
+
+# Kind byte per point
+FLOAT = 0
+INT = 1
+
+# Integers below this are exact in float64 (also when parsed from text)
+MAX_EXACT_INT = 2 ** 53
+
+
+def _is_integer_text(value: str) -> bool:
+    """Numeric text without decimal point or exponent (float() has parsed it already)"""
+    return '.' not in value and 'e' not in value and 'E' not in value
+
+
+def number_kind(value) -> tuple:
+    """(float64 value, FLOAT or INT) of a finite number or numeric text, else None
+
+    None also for integers from 2**53 on, which float64 may round.
+    """
+    if isinstance(value, str):
+        try:
+            number = float(value)
+        except ValueError:
+            return None
+        if not math.isfinite(number):
+            return None
+        if _is_integer_text(value):
+            return (number, INT) if abs(number) < MAX_EXACT_INT else None
+        return number, FLOAT
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return (float(value), INT) if abs(value) < MAX_EXACT_INT else None
+    if isinstance(value, float) and math.isfinite(value):
+        return value, FLOAT
+    return None
+
+
+def _exact(value):
+    """The value kept in `other`: integer text beyond 2**53 as int, anything else unchanged"""
+    if isinstance(value, str) and _is_integer_text(value):
+        try:
+            return int(value)
+        except ValueError:
+            pass
+    return value
+
+
+class Series:
+    """Points of one key in ascending time order, timestamps int64, values float64"""
+
+    __slots__ = ('ts', 'values', 'kinds', 'other')
+
+    def __init__(self, points=()):
+        self.ts = array('q')
+        self.values = array('d')
+        self.kinds = bytearray()  # FLOAT or INT per point
+        self.other = {}  # index -> value float64 cannot hold
+        for ts, value in points:
+            self.append(ts, value)
+
+    def append(self, ts: int, value):
+        """Add a point, numeric strings (as ThingsBoard sends them) become float64"""
+        parsed = number_kind(value)
+        if parsed is None:
+            self.other[len(self.ts)] = _exact(value)
+            parsed = NAN, FLOAT
+        self.ts.append(ts)
+        self.values.append(parsed[0])
+        self.kinds.append(parsed[1])
+
+    def extend(self, series: 'Series'):
+        offset = len(self.ts)
+        self.ts.extend(series.ts)
+        self.values.extend(series.values)
+        self.kinds.extend(series.kinds)
+        for index, value in series.other.items():
+            self.other[offset + index] = value
+
+    def _value(self, index: int):
+        if index in self.other:
+            return self.other[index]
+        value = self.values[index]
+        return int(value) if self.kinds[index] == INT else value
+
+    def __len__(self) -> int:
+        return len(self.ts)
+
+    def __iter__(self) -> Iterator[tuple]:
+        if not self.other and INT not in self.kinds:
+            return zip(self.ts, self.values)
+        return ((ts, self._value(i)) for i, ts in enumerate(self.ts))
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self.ts))
+            if step != 1:
+                raise ValueError("Series slices must be contiguous")
+            return self._slice(start, stop)
+        if index < 0:
+            index += len(self.ts)
+        return self.ts[index], self._value(index)
+
+    def _slice(self, start: int, stop: int) -> 'Series':
+        part = Series()
+        part.ts = self.ts[start:stop]
+        part.values = self.values[start:stop]
+        part.kinds = self.kinds[start:stop]
+        part.other = {i - start: value for i, value in self.other.items() if start <= i < stop}
+        return part
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (Series, list)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"Series({len(self)} points)"
+
+    def nbytes(self) -> int:
+        """Memory of the arrays (without the values in `other`)"""
+        return self.ts.itemsize * len(self.ts) + self.values.itemsize * len(self.values) + len(self.kinds)
+
+    def after(self, ts: int) -> 'Series':
+        """Points with a timestamp > ts"""
+        return self._slice(bisect.bisect_right(self.ts, ts), len(self.ts))
+
+    def truncate_after(self, ts: int):
+        """Drop the points with a timestamp > ts (in place)"""
+        stop = bisect.bisect_right(self.ts, ts)
+        if stop < len(self.ts):
+            del self.ts[stop:]
+            del self.values[stop:]
+            del self.kinds[stop:]
+            self.other = {i: value for i, value in self.other.items() if i < stop}
+
+    def map(self, func: Callable) -> 'Series':
+        """New series with func applied to every value"""
+        mapped = Series()
+        mapped.ts = array('q', self.ts)
+        for i, ts in enumerate(self.ts):
+            value = func(self._value(i))
+            parsed = number_kind(value) if not isinstance(value, str) else None
+            if parsed is None:
+                mapped.other[i] = value
+                parsed = NAN, FLOAT
+            mapped.values.append(parsed[0])
+            mapped.kinds.append(parsed[1])
+        return mapped
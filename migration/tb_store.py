@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+ECO Smart Diagnostics - Persistent scan inventory (SQLite)
+
+Keeps the result of a scan - customers, projects, measurements, VR devices,
+relations and when each was last seen - in a local SQLite file, so later
+commands (migrate, backup, resume, migrate-all) do not fetch the relations of
+the whole tenant again.
+
+A scan still re-reads the inventory (a few entity data queries, see
+tb_inventory.py) and compares it with the stored one. Relations are only
+re-fetched for assets that are new or changed (name, label, customer,
+attributes) and for the projects that own them; stored relations and VR
+device names are reused for everything else. After TB_INVENTORY_MAX_AGE
+hours, for another ThingsBoard URL, or with `scan --full`, everything is
+fetched again.
+
+Configuration (.env):
+    TB_INVENTORY_DB       SQLite file (default: inventory.db, empty = disabled)
+    TB_INVENTORY_MAX_AGE  Hours until a full scan (default: 24)
+"""
+
+import os
+import json
+import time
+import sqlite3
+from pathlib import Path
+from typing import Optional
+
+from tb_inventory import OWNS, RelationGraph
+
+TB_INVENTORY_DB = os.getenv('TB_INVENTORY_DB', str(Path(__file__).parent / 'inventory.db'))
+TB_INVENTORY_MAX_AGE = float(os.getenv('TB_INVENTORY_MAX_AGE', '24'))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS customers (
+    name TEXT PRIMARY KEY,
+    id TEXT,
+    last_seen INTEGER
+);
+CREATE TABLE IF NOT EXISTS assets (
+    id TEXT PRIMARY KEY,
+    type TEXT,
+    name TEXT,
+    customer_name TEXT,
+    fingerprint TEXT,
+    data TEXT,
+    last_seen INTEGER
+);
+CREATE INDEX IF NOT EXISTS assets_type_name ON assets (type, name);
+CREATE TABLE IF NOT EXISTS devices (
+    id TEXT PRIMARY KEY,
+    name TEXT,
+    data TEXT,
+    last_seen INTEGER
+);
+CREATE TABLE IF NOT EXISTS relations (
+    from_id TEXT,
+    from_type TEXT,
+    to_id TEXT,
+    to_type TEXT,
+    type TEXT,
+    last_seen INTEGER,
+    PRIMARY KEY (from_id, to_id, type)
+);
+CREATE TABLE IF NOT EXISTS loaded (
+    id TEXT PRIMARY KEY
+);
+"""
+
+# Keys added by the scan, not part of the stored asset
+SCAN_KEYS = ('measurements', 'vr_devices')
+
+
+def fingerprint(asset: dict) -> str:
+    """What a change of the asset is detected by"""
+    return json.dumps([
+        asset.get('name'), asset.get('type'), asset.get('label'),
+        asset.get('customerName'), asset.get('attributes'),
+    ], sort_keys=True, default=str)
+
+
+class InventoryStore:
+    """Scan results in SQLite, used from the main thread only"""
+
+    def __init__(self, path: str = TB_INVENTORY_DB, max_age_hours: float = TB_INVENTORY_MAX_AGE):
+        self.path = path
+        self.max_age = max_age_hours * 3600
+        self.db = sqlite3.connect(path)
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def _meta(self, key: str) -> Optional[str]:
+        row = self.db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def is_fresh(self, base_url: str) -> bool:
+        """Stored scan of this ThingsBoard, younger than the max. age"""
+        last_scan = self._meta('last_scan')
+        return (self._meta('base_url') == base_url and last_scan is not None
+                and time.time() - float(last_scan) < self.max_age)
+
+    def last_scan(self) -> Optional[float]:
+        last_scan = self._meta('last_scan')
+        return float(last_scan) if last_scan else None
+
+    def changed_ids(self, inventory: list) -> tuple:
+        """(new ids, changed ids) of the inventory compared with the stored assets"""
+        stored = dict(self.db.execute("SELECT id, fingerprint FROM assets"))
+        new, changed = set(), set()
+        for asset in inventory:
+            asset_id = asset['id']['id']
+            if asset_id not in stored:
+                new.add(asset_id)
+            elif stored[asset_id] != fingerprint(asset):
+                changed.add(asset_id)
+        return new, changed
+
+    def owners_of(self, entity_ids: set) -> set:
+        """Stored assets with an Owns relation to one of the entities"""
+        return {
+            from_id for from_id, to_id in self.db.execute("SELECT from_id, to_id FROM relations WHERE type = ?", (OWNS,))
+            if to_id in entity_ids
+        }
+
+    def relation_graph(self, exclude: set = frozenset()) -> RelationGraph:
+        """Stored relations, without those from the excluded (stale) entities"""
+        graph = RelationGraph()
+        graph._add(
+            {
+                'from': {'entityType': from_type, 'id': from_id},
+                'to': {'entityType': to_type, 'id': to_id},
+                'type': relation_type,
+                'typeGroup': 'COMMON',
+            }
+            for from_id, from_type, to_id, to_type, relation_type in self.db.execute(
+                "SELECT from_id, from_type, to_id, to_type, type FROM relations ORDER BY rowid")
+            if from_id not in exclude
+        )
+        graph.loaded.update(entity_id for (entity_id,) in self.db.execute("SELECT id FROM loaded")
+                            if entity_id not in exclude)
+        return graph
+
+    def devices(self) -> dict:
+        """{device_id: device} of all stored VR devices"""
+        return {device_id: json.loads(data) for device_id, data in self.db.execute("SELECT id, data FROM devices")}
+
+    def save(self, base_url: str, inventory: list, graph: RelationGraph, devices: dict):
+        """Replace the stored scan with this one"""
+        now = int(time.time())
+        asset_ids = {asset['id']['id'] for asset in inventory}
+        relations = [
+            rel for from_id, rels in graph.outgoing.items() if from_id in asset_ids and from_id in graph.loaded
+            for rel in rels
+        ]
+        device_ids = {rel['to']['id'] for rel in relations if rel['to'].get('entityType') == 'DEVICE'}
+        customers = {}
+        for asset in inventory:
+            customer_id = (asset.get('customerId') or {}).get('id')
+            customers.setdefault(asset.get('customerName') or '', customer_id)
+
+        with self.db:
+            for table in ('customers', 'assets', 'devices', 'relations', 'loaded'):
+                self.db.execute(f"DELETE FROM {table}")
+            self.db.executemany("INSERT INTO customers VALUES (?, ?, ?)",
+                                [(name, customer_id, now) for name, customer_id in customers.items()])
+            self.db.executemany("INSERT INTO assets VALUES (?, ?, ?, ?, ?, ?, ?)", [
+                (asset['id']['id'], asset.get('type'), asset.get('name'), asset.get('customerName'), fingerprint(asset),
+                 json.dumps({k: v for k, v in asset.items() if k not in SCAN_KEYS}), now)
+                for asset in inventory
+            ])
+            self.db.executemany("INSERT INTO devices VALUES (?, ?, ?, ?)", [
+                (device_id, device.get('name'), json.dumps(device), now)
+                for device_id, device in devices.items() if device_id in device_ids
+            ])
+            self.db.executemany("INSERT OR IGNORE INTO relations VALUES (?, ?, ?, ?, ?, ?)", [
+                (rel['from']['id'], rel['from'].get('entityType'), rel['to']['id'], rel['to'].get('entityType'),
+                 rel.get('type'), now)
+                for rel in relations
+            ])
+            self.db.executemany("INSERT INTO loaded VALUES (?)",
+                                [(asset_id,) for asset_id in asset_ids if asset_id in graph.loaded])
+            self.db.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)",
+                                [('base_url', base_url), ('last_scan', str(time.time()))])
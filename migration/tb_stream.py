@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+ECO Smart Diagnostics - Streaming decoder for ThingsBoard timeseries responses
+
+/api/plugins/telemetry/{type}/{id}/values/timeseries returns
+
+    {"key1": [{"ts": 1700000000000, "value": "21.5"}, ...], "key2": [...]}
+
+iter_timeseries() decodes this incrementally from the received chunks and
+yields (key, ts, value) per point, so a page never exists as a complete JSON
+document or as a list of dicts in memory. Values are returned as sent
+(ThingsBoard sends strings), converting them is up to the caller.
+"""
+
+import json
+import codecs
+import itertools
+from typing import Iterable, Iterator
+
+_decoder = json.JSONDecoder()
+
+WHITESPACE = ' \t\n\r'
+
+
+class _NeedMore(Exception):
+    """The buffer ends before the next complete token"""
+
+
+def iter_timeseries(chunks: Iterable[bytes]) -> Iterator[tuple]:
+    """Yield (key, ts, value) from the byte chunks of a timeseries response
+
+    Raises ValueError if the response is not a complete timeseries object.
+    """
+    text = codecs.getincrementaldecoder('utf-8')()
+    buf = ''
+    pos = 0
+    state = 'start'
+    key = None
+
+    def token(expected: str) -> str:
+        """Consume the next non-whitespace character if it is one of `expected`"""
+        nonlocal pos
+        while pos < len(buf) and buf[pos] in WHITESPACE:
+            pos += 1
+        if pos >= len(buf):
+            raise _NeedMore
+        char = buf[pos]
+        if char not in expected:
+            raise ValueError(f"Unexpected {char!r} at offset {pos} in timeseries response")
+        pos += 1
+        return char
+
+    def value():
+        """Decode the next JSON value (string key or point object)"""
+        nonlocal pos
+        while pos < len(buf) and buf[pos] in WHITESPACE:
+            pos += 1
+        try:
+            result, pos = _decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            # Incomplete value - or invalid, which is detected at the end of the stream
+            raise _NeedMore
+        return result
+
+    for chunk in itertools.chain(chunks, [None]):
+        if chunk is None:
+            buf = buf[pos:] + text.decode(b'', final=True)
+        else:
+            buf = buf[pos:] + text.decode(chunk)
+        pos = 0
+
+        try:
+            while True:
+                if state == 'start':
+                    token('{')
+                    state = 'first_key'
+                elif state == 'first_key':
+                    if token('"}') == '}':
+                        state = 'end'
+                    else:
+                        pos -= 1
+                        state = 'key'
+                elif state == 'key':
+                    start = pos
+                    key = value()
+                    if not isinstance(key, str):
+                        raise ValueError(f"Expected key at offset {start} in timeseries response")
+                    state = 'colon'
+                elif state == 'colon':
+                    token(':')
+                    state = 'array'
+                elif state == 'array':
+                    token('[')
+                    state = 'first_point'
+                elif state == 'first_point':
+                    if token('{]') == ']':
+                        state = 'after_array'
+                    else:
+                        pos -= 1
+                        state = 'point'
+                elif state == 'point':
+                    # Decode all complete points of this array in the buffer at once
+                    # (C decoder). A cut inside a string leaves it unterminated, so
+                    # the batch only decodes if it ends on a point boundary.
+                    end = buf.find(']', pos)
+                    cut = buf.rfind('}', pos, len(buf) if end < 0 else end)
+                    try:
+                        points = json.loads('[' + buf[pos:cut + 1] + ']') if cut > pos else None
+                    except json.JSONDecodeError:
+                        points = None
+                    if points:
+                        pos = cut + 1
+                    else:
+                        points = [value()]
+                    for point in points:
+                        yield key, point['ts'], point.get('value')
+                    state = 'after_point'
+                elif state == 'after_point':
+                    state = 'point' if token(',]') == ',' else 'after_array'
+                elif state == 'after_array':
+                    state = 'key' if token(',}') == ',' else 'end'
+                else:
+                    # end: only whitespace may follow
+                    if buf[pos:].strip(WHITESPACE):
+                        raise ValueError(f"Unexpected data after timeseries response at offset {pos}")
+                    pos = len(buf)
+                    raise _NeedMore
+        except _NeedMore:
+            pass
+
+    if state != 'end':
+        raise ValueError(f"Incomplete timeseries response (stopped in state '{state}')")
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+ECO Smart Diagnostics - Watermarks of the incremental telemetry sync
+
+`tb_migration.py sync` copies points of old keys (VR devices, CHC_* keys on
+measurements) that arrived after the migration to the new keys. For every
+(source entity, source key, target entity, target key) the timestamp of the
+last copied point - the watermark - is stored here, so each run only reads
+points newer than it.
+
+Without a watermark, the last point of the target key is taken (the
+migration copied everything up to there); a target key without data gets
+the whole source key.
+
+Points that arrive later with a timestamp older than the watermark are not
+picked up - re-run `migrate` (or `resume`) for those.
+
+Configuration (.env):
+    TB_SYNC_DB        SQLite file (default: sync_state.db)
+    TB_SYNC_INTERVAL  Seconds between runs of `sync --follow` (default: 60)
+"""
+
+import os
+import time
+import sqlite3
+from pathlib import Path
+from typing import Optional
+
+TB_SYNC_DB = os.getenv('TB_SYNC_DB', str(Path(__file__).parent / 'sync_state.db'))
+TB_SYNC_INTERVAL = float(os.getenv('TB_SYNC_INTERVAL', '60'))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS watermarks (
+    source_id TEXT,
+    source_key TEXT,
+    target_id TEXT,
+    target_key TEXT,
+    ts INTEGER,
+    updated_at INTEGER,
+    PRIMARY KEY (source_id, source_key, target_id, target_key)
+);
+"""
+
+
+class WatermarkStore:
+    """Last copied timestamp per key pair in SQLite, used from the main thread only"""
+
+    def __init__(self, path: str = TB_SYNC_DB):
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def get(self, source_id: str, source_key: str, target_id: str, target_key: str) -> Optional[int]:
+        row = self.db.execute(
+            "SELECT ts FROM watermarks WHERE source_id = ? AND source_key = ? AND target_id = ? AND target_key = ?",
+            (source_id, source_key, target_id, target_key)
+        ).fetchone()
+        return row[0] if row else None
+
+    def set(self, source_id: str, source_key: str, target_id: str, target_key: str, ts: int):
+        with self.db:
+            self.db.execute("INSERT OR REPLACE INTO watermarks VALUES (?, ?, ?, ?, ?, ?)",
+                            (source_id, source_key, target_id, target_key, ts, int(time.time())))
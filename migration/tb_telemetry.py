@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""
+ECO Smart Diagnostics - Telemetry reads (paged, time-sharded)
+
+Used by tb_migration.py, copy_telemetry_keys.py and fix_telemetry_types.py.
+
+A telemetry key is read in ascending pages of TB_TELEMETRY_PAGE_SIZE points;
+each page starts after the previous page's last timestamp, so the pages of
+one time range can only be read one after another.
+
+read_telemetry() therefore splits longer series by time: if the first page
+is full, the last timestamp of the key is probed (two points, descending,
+since the range is requested up to end + 1) and the rest of the range is cut
+into windows aligned to calendar months (UTC) - the partitions ThingsBoard
+stores telemetry in - of TB_TELEMETRY_SHARD_MONTHS months each. The windows
+are read concurrently on TB_TELEMETRY_SHARD_WORKERS threads (each paged as
+above) and put back together in order. Series that fit into one page cost
+one request, as before.
+
+Several keys of one entity are read together with read_telemetry_keys():
+all keys go into one request (keys=a,b,c), ThingsBoard applies the limit
+per key and the response is split into one series per key. Each key is
+paged on its own; keys whose next page starts at the same timestamp share
+the request. tb_migration.py reads TB_TELEMETRY_KEYS_PER_READ keys at a
+time, which also bounds how many series are held in memory.
+
+Reads never start at epoch 0: without a start, the first timestamp of the
+keys is probed first (one point per key, ascending) and keys without data
+are not read at all. key_bounds() returns first and last timestamp of keys
+in two such requests, for overlap checks without reading the series.
+
+Pages are decoded while they are received (tb_stream.py). Numeric series
+are columnar (tb_series.py): int64 timestamps and float64 values, filled
+page by page. A failed page raises ThingsBoardError, it is never taken as
+the end of the data.
+
+Configuration (.env):
+    TB_TELEMETRY_PAGE_SIZE      Points per page (default: 10000)
+    TB_TELEMETRY_SHARD_MONTHS   Months per window (default: 1, 0 = no sharding)
+    TB_TELEMETRY_SHARD_WORKERS  Windows read in parallel (default: 4, 1 = no sharding)
+    TB_TELEMETRY_KEYS_PER_READ  Keys read together in one request (default: 8, 1 = per key)
+"""
+
+import os
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Optional
+
+from tb_client import ThingsBoardError
+from tb_series import Series
+
+TB_TELEMETRY_PAGE_SIZE = int(os.getenv('TB_TELEMETRY_PAGE_SIZE', '10000'))
+TB_TELEMETRY_SHARD_MONTHS = int(os.getenv('TB_TELEMETRY_SHARD_MONTHS', '1'))
+TB_TELEMETRY_SHARD_WORKERS = int(os.getenv('TB_TELEMETRY_SHARD_WORKERS', '4'))
+TB_TELEMETRY_KEYS_PER_READ = max(1, int(os.getenv('TB_TELEMETRY_KEYS_PER_READ', '8')))
+
+
+def now_ms() -> int:
+    return int(datetime.now().timestamp() * 1000)
+
+
+def read_params(key: str, start_ts: int, end_ts: int, limit: int = TB_TELEMETRY_PAGE_SIZE,
+                order: str = 'ASC') -> dict:
+    """Query parameters of one telemetry page"""
+    return {
+        'keys': key,
+        'startTs': start_ts,
+        'endTs': end_ts,
+        'limit': limit,
+        'orderBy': order
+    }
+
+
+def new_points(numeric: bool = True):
+    """Empty series: columnar for numeric reads, a list of (timestamp, value) tuples otherwise"""
+    return Series() if numeric else []
+
+
+def _copy(points):
+    copy = new_points(isinstance(points, Series))
+    copy.extend(points)
+    return copy
+
+
+def _after(points, ts: int):
+    """Points with a timestamp > ts"""
+    if isinstance(points, Series):
+        return points.after(ts)
+    return [point for point in points if point[0] > ts]
+
+
+def _truncate(points, end_ts: int):
+    """Drop points after end_ts (in place)"""
+    if isinstance(points, Series):
+        points.truncate_after(end_ts)
+        return
+    while points and points[-1][0] > end_ts:
+        points.pop()
+
+
+def read_keys_page(api, entity_type: str, entity_id: str, keys: list, params: dict,
+                   numeric: bool = True) -> dict:
+    """Read one page of several keys in one request, returns {key: points}
+
+    ThingsBoard applies the limit per key, every key gets its own page.
+    The response is decoded while it is received, points never exist as dicts.
+    Numeric pages are Series (tb_series.py), with numeric=False lists of
+    (timestamp, value) tuples with the values as sent.
+    """
+    pages = {key: new_points(numeric) for key in keys}
+    try:
+        for point_key, ts, val in api.stream_timeseries(
+            f"/api/plugins/telemetry/{entity_type}/{entity_id}/values/timeseries",
+            params={**params, 'keys': ','.join(keys)}
+        ):
+            page = pages.get(point_key)
+            if page is None:
+                continue
+            if numeric:
+                page.append(ts, val)
+            else:
+                page.append((ts, val))
+    except ThingsBoardError as e:
+        # Request failed even after retries - never treat as end of data
+        raise ThingsBoardError(
+            f"Reading {','.join(keys)} of {entity_type} {entity_id} failed at startTs={params['startTs']}: {e}"
+        ) from e
+    return pages
+
+
+def read_page(api, entity_type: str, entity_id: str, key: str, params: dict, numeric: bool = True):
+    """Read one page of telemetry (Series, or list of (timestamp, value) tuples if not numeric)"""
+    return read_keys_page(api, entity_type, entity_id, [key], params, numeric)[key]
+
+
+def range_params(key: str, start_ts: int, end_ts: int, limit: int = TB_TELEMETRY_PAGE_SIZE,
+                 order: str = 'ASC') -> dict:
+    """Query parameters of a page of the points in [start_ts, end_ts]
+
+    Whether endTs itself is included differs between backends: one ms more is
+    requested, points after end_ts are dropped by the caller.
+    """
+    return read_params(key, start_ts, end_ts + 1, limit, order)
+
+
+def _is_full(page: list, limit: int, end_ts: int) -> bool:
+    """More data may follow the page (less than limit means no more)"""
+    return len(page) >= limit and page[-1][0] < end_ts
+
+
+def read_keys_range(api, entity_type: str, entity_id: str, keys: list, start_ts: int, end_ts: int,
+                    numeric: bool = True, first_pages: dict = None) -> dict:
+    """All points of the keys in [start_ts, end_ts], {key: points} (first_pages: their first pages, if read)
+
+    Keys are paged independently: each next page starts after the key's own
+    last timestamp. Keys at the same position share one request.
+    """
+    limit = TB_TELEMETRY_PAGE_SIZE
+    if first_pages is None:
+        first_pages = read_keys_page(api, entity_type, entity_id, keys, range_params('', start_ts, end_ts), numeric)
+    series = {key: _copy(first_pages[key]) for key in keys}
+    # Next page starts after the last timestamp
+    cursors = {key: page[-1][0] + 1 for key, page in first_pages.items() if _is_full(page, limit, end_ts)}
+
+    while cursors:
+        by_start = {}
+        for key, cursor in cursors.items():
+            by_start.setdefault(cursor, []).append(key)
+        cursors = {}
+        for cursor, group in by_start.items():
+            pages = read_keys_page(api, entity_type, entity_id, group, range_params('', cursor, end_ts), numeric)
+            for key, page in pages.items():
+                series[key].extend(page)
+                if _is_full(page, limit, end_ts):
+                    cursors[key] = page[-1][0] + 1
+
+    for points in series.values():
+        _truncate(points, end_ts)
+    return series
+
+
+def read_range(api, entity_type: str, entity_id: str, key: str, start_ts: int, end_ts: int,
+               numeric: bool = True, first_page=None):
+    """All points in [start_ts, end_ts], page after page (first_page: its first page, if already read)"""
+    return read_keys_range(api, entity_type, entity_id, [key], start_ts, end_ts, numeric,
+                           None if first_page is None else {key: first_page})[key]
+
+
+def _probe(api, entity_type: str, entity_id: str, keys: list, start_ts: int, end_ts: int, order: str) -> dict:
+    """{key: timestamp of its first (ASC) or latest (DESC) point in [start_ts, end_ts]}
+
+    One request for all keys; keys without points in the range are left out.
+    Ascending, one point per key is read. Descending, two: the first may be
+    the one at end_ts + 1.
+    """
+    limit = 1 if order == 'ASC' else 2
+    pages = read_keys_page(api, entity_type, entity_id, keys, range_params('', start_ts, end_ts, limit, order),
+                           numeric=False)
+    found = {}
+    for key, page in pages.items():
+        in_range = [ts for ts, _ in page if start_ts <= ts <= end_ts]
+        if in_range:
+            found[key] = min(in_range) if order == 'ASC' else max(in_range)
+    return found
+
+
+def first_timestamps(api, entity_type: str, entity_id: str, keys: list, start_ts: int, end_ts: int) -> dict:
+    """{key: timestamp of its first point in [start_ts, end_ts]} (one point per key, ascending)"""
+    return _probe(api, entity_type, entity_id, keys, start_ts, end_ts, 'ASC')
+
+
+def last_timestamps(api, entity_type: str, entity_id: str, keys: list, start_ts: int, end_ts: int) -> dict:
+    """{key: timestamp of its latest point in [start_ts, end_ts]} (two points per key, descending)"""
+    return _probe(api, entity_type, entity_id, keys, start_ts, end_ts, 'DESC')
+
+
+def key_bounds(api, entity_type: str, entity_id: str, keys: list, start_ts: int = 0,
+               end_ts: int = None) -> dict:
+    """{key: (first timestamp, last timestamp)} of the keys with data, two requests for all keys"""
+    end_ts = now_ms() if end_ts is None else end_ts
+    first = first_timestamps(api, entity_type, entity_id, keys, start_ts, end_ts)
+    if not first:
+        return {}
+    last = last_timestamps(api, entity_type, entity_id, list(first), start_ts, end_ts)
+    return {key: (first[key], last[key]) for key in first if key in last}
+
+
+def last_ts(api, entity_type: str, entity_id: str, key: str, start_ts: int, end_ts: int) -> Optional[int]:
+    """Timestamp of the latest point in [start_ts, end_ts] (two points, descending), None if there is none"""
+    return last_timestamps(api, entity_type, entity_id, [key], start_ts, end_ts).get(key)
+
+
+def _add_months(dt: datetime, months: int) -> datetime:
+    month = dt.month - 1 + months
+    return dt.replace(year=dt.year + month // 12, month=month % 12 + 1)
+
+
+def month_windows(start_ts: int, end_ts: int, months: int = TB_TELEMETRY_SHARD_MONTHS) -> list:
+    """[(start, end)] windows covering [start_ts, end_ts], cut at UTC month starts every `months` months
+
+    Windows are inclusive on both ends and do not overlap.
+    """
+    windows = []
+    start = start_ts
+    month_start = datetime.fromtimestamp(start_ts / 1000, tz=timezone.utc).replace(
+        day=1, hour=0, minute=0, second=0, microsecond=0)
+    while start <= end_ts:
+        month_start = _add_months(month_start, max(1, months))
+        end = min(end_ts, int(month_start.timestamp() * 1000) - 1)
+        windows.append((start, end))
+        start = end + 1
+    return windows
+
+
+def data_range(api, entity_type: str, entity_id: str, keys: list, start_ts: int = None,
+               end_ts: int = None) -> tuple:
+    """(start_ts, end_ts, keys with data) to read, by default all data (up to now)
+
+    Without start_ts the first point of each key is probed (one request), the
+    read starts there instead of at epoch 0 and keys without data are skipped.
+    """
+    end_ts = now_ms() if end_ts is None else end_ts
+    if start_ts is not None:
+        return start_ts, end_ts, list(keys)
+    first = first_timestamps(api, entity_type, entity_id, keys, 0, end_ts)
+    return min(first.values(), default=end_ts), end_ts, [key for key in keys if key in first]
+
+
+def shard_windows(api, entity_type: str, entity_id: str, keys: list, first_pages: dict, end_ts: int,
+                  workers: int = TB_TELEMETRY_SHARD_WORKERS,
+                  shard_months: int = TB_TELEMETRY_SHARD_MONTHS) -> Optional[tuple]:
+    """(keys, windows) for the rest of a range after the keys' first pages, None if read page after page
+
+    Only keys with a full first page have more data; their last timestamps
+    are probed, so the windows cover the keys' actual data, not up to end_ts.
+    """
+    full = [key for key in keys if _is_full(first_pages[key], TB_TELEMETRY_PAGE_SIZE, end_ts)]
+    if not full or workers <= 1 or shard_months <= 0:
+        return None
+    rest_start = min(first_pages[key][-1][0] for key in full) + 1
+    last = last_timestamps(api, entity_type, entity_id, full, rest_start, end_ts)
+    if not last:
+        return full, []
+    return full, month_windows(rest_start, max(last.values()), shard_months)
+
+
+def merge_windows(keys: list, first_pages: dict, full: list, windows: list) -> dict:
+    """{key: points} from the first pages and the windows' {key: points}, in order
+
+    Windows start after the earliest first page, points a key's first page
+    already has are skipped.
+    """
+    series = {key: _copy(first_pages[key]) for key in keys}
+    for key in full:
+        after = first_pages[key][-1][0]
+        for window in windows:
+            points = window[key]
+            if points and points[0][0] <= after:
+                points = _after(points, after)
+            series[key].extend(points)
+    return series
+
+
+def read_telemetry_keys(api, entity_type: str, entity_id: str, keys: list, start_ts: int = None,
+                        end_ts: int = None, numeric: bool = True, workers: int = TB_TELEMETRY_SHARD_WORKERS,
+                        shard_months: int = TB_TELEMETRY_SHARD_MONTHS) -> dict:
+    """Read several keys in [start_ts, end_ts] (default: all) together, returns {key: points}"""
+    start_ts, end_ts, found = data_range(api, entity_type, entity_id, keys, start_ts, end_ts)
+    if not found:
+        return {key: new_points(numeric) for key in keys}
+    first_pages = read_keys_page(api, entity_type, entity_id, found, range_params('', start_ts, end_ts), numeric)
+    first_pages.update((key, new_points(numeric)) for key in keys if key not in first_pages)
+    plan = shard_windows(api, entity_type, entity_id, found, first_pages, end_ts, workers, shard_months)
+    if plan is None:
+        return read_keys_range(api, entity_type, entity_id, keys, start_ts, end_ts, numeric, first_pages)
+
+    full, windows = plan
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(windows))), thread_name_prefix='tb-shard') as pool:
+        futures = [
+            # Workers run in a copy of the caller's context (metrics phase)
+            pool.submit(contextvars.copy_context().run, read_keys_range, api, entity_type, entity_id, full,
+                        start, end, numeric)
+            for start, end in windows
+        ]
+        return merge_windows(keys, first_pages, full, [future.result() for future in futures])
+
+
+def read_telemetry(api, entity_type: str, entity_id: str, key: str, start_ts: int = None, end_ts: int = None,
+                   numeric: bool = True, workers: int = TB_TELEMETRY_SHARD_WORKERS,
+                   shard_months: int = TB_TELEMETRY_SHARD_MONTHS):
+    """Read telemetry data in [start_ts, end_ts] (default: all)
+
+    Returns a Series (tb_series.py), or a list of (timestamp, value) tuples
+    with the values as sent if numeric is False.
+    """
+    return read_telemetry_keys(api, entity_type, entity_id, [key], start_ts, end_ts, numeric, workers,
+                               shard_months)[key]
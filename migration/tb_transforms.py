@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+ECO Smart Diagnostics - Telemetry key transforms (old → new keys)
+
+The mapping of old telemetry keys to the normalized keys (same as
+normalize_data.tbel) is one declarative table, TELEMETRY_TRANSFORMS, used by
+tb_migration.py (migrate, sync, async engine) and copy_telemetry_keys.py.
+Each rule maps a source key to a target key and may be restricted to an
+installation type and/or a VR device type:
+
+    source        old key
+    target        new key
+    installation  'heating' or 'cooling' (default: both). Measurements
+                  without installationType count as heating
+    device        VR device type (TS1, PFLOW, ... see device_type()), '*' for
+                  any VR device (default: any source, also the measurement)
+    scale         value * scale
+    divisor       value / divisor - exact decimal unit steps: 1234.5 / 1000
+                  gives 1.2345, 1234.5 * 0.001 gives 1.2345000000000002
+    offset        value + offset
+    abs           absolute value
+    round         round to this many decimals
+
+The table is compiled once into one key map per (installation type, device
+type), {source key: Transform}. A transform is applied to a whole Series
+(tb_series.py) as NumPy operations on its float64 value array, without a
+Python call per point. Converted values are floats. Numbers kept in the
+Series' `other` (integers from 2**53 on) are converted one by one; 'NaN' and
+'Infinity' cannot be converted and are passed through with a warning, text,
+booleans and JSON unchanged.
+
+    transform = get_key_map('heating')['CHC_S_VolumeFlow']
+    transform.target              # 'Vdot_m3h'
+    transform.apply(series)       # l/h → m³/h
+"""
+
+import math
+import logging
+from array import array
+from typing import Optional
+
+import numpy as np
+
+from tb_series import Series
+
+log = logging.getLogger('migration')
+
+TELEMETRY_TRANSFORMS = [
+    # Temperature keys
+    {'source': 'CHC_S_TemperatureFlow', 'target': 'T_flow_C'},
+    {'source': 'CHC_S_TemperatureReturn', 'target': 'T_return_C'},
+    {'source': 'CHC_S_TemperatureDiff', 'target': 'dT_K'},
+    # Flow keys
+    {'source': 'CHC_S_VolumeFlow', 'target': 'Vdot_m3h', 'divisor': 1000},  # l/h → m³/h
+    {'source': 'CHC_S_Velocity', 'target': 'v_ms'},
+    # Volume
+    {'source': 'CHC_M_Volume', 'target': 'V_m3'},
+    # Power/Energy by installation type
+    {'source': 'CHC_S_Power_Heating', 'target': 'P_th_kW', 'installation': 'heating'},
+    {'source': 'CHC_M_Energy_Heating', 'target': 'E_th_kWh', 'installation': 'heating'},
+    {'source': 'CHC_S_Power_Cooling', 'target': 'P_th_kW', 'installation': 'cooling'},
+    {'source': 'CHC_M_Energy_Cooling', 'target': 'E_th_kWh', 'installation': 'cooling'},
+    # Temperature sensors: 'temperature' by device type (other sensors are skipped)
+    {'source': 'temperature', 'target': 'auxT1_C', 'device': 'TS1'},
+    {'source': 'temperature', 'target': 'auxT2_C', 'device': 'TS2'},
+    {'source': 'temperature', 'target': 'auxT3_C', 'device': 'TS3'},
+]
+
+# Already normalized keys, copied unchanged from VR devices
+NORMALIZED_KEYS = ['T_flow_C', 'T_return_C', 'dT_K', 'Vdot_m3h', 'v_ms',
+                   'P_th_kW', 'E_th_kWh', 'V_m3', 'auxT1_C', 'auxT2_C', 'auxT3_C']
+
+TELEMETRY_TRANSFORMS += [{'source': key, 'target': key, 'device': '*'} for key in NORMALIZED_KEYS]
+
+INSTALLATION_TYPES = ('heating', 'cooling')
+
+
+def device_type(device_name: str) -> str:
+    """VR device type from the device name suffix"""
+    if device_name.endswith('_TS1'):
+        return 'TS1'
+    elif device_name.endswith('_TS2'):
+        return 'TS2'
+    elif device_name.endswith('_TS3'):
+        return 'TS3'
+    elif '_PF' in device_name or device_name.endswith('_PF1') or device_name.endswith('_PF2'):
+        return 'PFLOW'
+    elif device_name.endswith('_gw'):
+        return 'GATEWAY'
+    elif 'pflow' in device_name.lower() or 'p-flow' in device_name.lower():
+        return 'PFLOW'
+    else:
+        return 'UNKNOWN'
+
+
+def _number(value) -> Optional[float]:
+    """float of a number or numeric text (also NaN/Infinity), None for anything else"""
+    if isinstance(value, bool):
+        return None
+    try:
+        return float(value)
+    except (ValueError, TypeError, OverflowError):
+        return None
+
+
+class Transform:
+    """One compiled rule: target key and the value operations"""
+
+    __slots__ = ('source', 'target', 'scale', 'divisor', 'offset', 'abs', 'round')
+
+    def __init__(self, rule: dict):
+        self.source = rule['source']
+        self.target = rule['target']
+        self.scale = rule.get('scale')
+        self.divisor = rule.get('divisor')
+        self.offset = rule.get('offset')
+        self.abs = rule.get('abs', False)
+        self.round = rule.get('round')
+
+    @property
+    def is_identity(self) -> bool:
+        return (self.scale is None and self.divisor is None and self.offset is None
+                and not self.abs and self.round is None)
+
+    def __repr__(self) -> str:
+        return f"Transform({self.source} → {self.target})"
+
+    def apply_array(self, values: np.ndarray) -> np.ndarray:
+        """The value operations on a float64 array (new array)"""
+        result = values.copy()
+        if self.scale is not None:
+            result *= self.scale
+        if self.divisor is not None:
+            result /= self.divisor
+        if self.offset is not None:
+            result += self.offset
+        if self.abs:
+            np.abs(result, out=result)
+        if self.round is not None:
+            np.round(result, self.round, out=result)
+        return result
+
+    def apply(self, series):
+        """Converted copy of a Series (lists of (ts, value) tuples are converted point by point)"""
+        if self.is_identity:
+            return series
+        if not isinstance(series, Series):
+            return [(ts, self._apply_value(value)) for ts, value in series]
+
+        converted = Series()
+        converted.ts = array('q', series.ts)
+        if len(series):
+            # Zero-copy view of the value array
+            converted.values.frombytes(self.apply_array(np.frombuffer(series.values, dtype=np.float64)).tobytes())
+        converted.kinds = bytearray(len(series))  # all FLOAT
+        not_converted = 0
+        for index, value in series.other.items():
+            number = _number(value)
+            if number is not None and math.isfinite(number):
+                converted.values[index] = self._apply_number(number)
+                continue
+            if number is not None:
+                not_converted += 1
+            converted.other[index] = value
+        if not_converted:
+            log.warning(f"{self}: {not_converted} NaN/Infinity value(s) not converted")
+        return converted
+
+    def _apply_number(self, number: float) -> float:
+        return float(self.apply_array(np.array([number]))[0])
+
+    def _apply_value(self, value):
+        number = _number(value)
+        if number is None or not math.isfinite(number):
+            return value
+        return self._apply_number(number)
+
+
+class TransformTable:
+    """TELEMETRY_TRANSFORMS compiled into key maps per (installation type, device type)"""
+
+    def __init__(self, rules: list):
+        self.rules = [(rule, Transform(rule)) for rule in rules]
+        self._maps = {}
+
+    def key_map(self, installation_type: str = 'heating', device: str = None) -> dict:
+        """{source key: Transform} for keys of a measurement (device None) or of a VR device type"""
+        installation_type = 'cooling' if installation_type == 'cooling' else 'heating'
+        key = (installation_type, device)
+        key_map = self._maps.get(key)
+        if key_map is None:
+            key_map = {}
+            for rule, transform in self.rules:
+                if rule.get('installation', installation_type) != installation_type:
+                    continue
+                rule_device = rule.get('device')
+                if rule_device is not None and (device is None or rule_device not in ('*', device)):
+                    continue
+                key_map.setdefault(transform.source, transform)
+            self._maps[key] = key_map
+        return key_map
+
+    def target(self, source_key: str, installation_type: str = 'heating', device: str = None) -> Optional[str]:
+        transform = self.key_map(installation_type, device).get(source_key)
+        return transform.target if transform else None
+
+
+TRANSFORMS = TransformTable(TELEMETRY_TRANSFORMS)
+
+
+def get_key_map(installation_type: str = 'heating', device: str = None) -> dict:
+    """{source key: Transform} of the compiled table (see TransformTable.key_map)"""
+    return TRANSFORMS.key_map(installation_type, device)